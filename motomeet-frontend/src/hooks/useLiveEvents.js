@@ -0,0 +1,65 @@
+import { useEffect, useRef, useState } from "react";
+
+// Matches the Retry-After the server sends when it's at its live stream cap
+const RETRY_MIN_MS = 30000;
+const RETRY_MAX_MS = 5 * 60000;
+
+// Subscribes to the backend's live event stream (RSVP counts, created/updated/removed events).
+// handlers: { rsvp, created, updated, removed, resync }, each called with the parsed event data.
+// resync is also called whenever updates may have been missed (the stream dropped or was refused),
+// so the page can refetch. Returns whether the stream is connected; while it isn't, pages should
+// refetch after their own writes.
+export default function useLiveEvents(handlers) {
+    const handlersRef = useRef(handlers);
+    handlersRef.current = handlers;
+    const [connected, setConnected] = useState(false);
+
+    useEffect(() => {
+        let source = null;
+        let retryTimer = null;
+        let retryDelay = RETRY_MIN_MS;
+        let missed = false;
+
+        const resync = () => {
+            const handler = handlersRef.current.resync;
+            if (handler) handler({});
+        };
+
+        const connect = () => {
+            source = new EventSource("https://motomeet.onrender.com/api/live", { withCredentials: true });
+            ["rsvp", "created", "updated", "removed", "resync"].forEach((kind) => {
+                source.addEventListener(kind, (e) => {
+                    const handler = handlersRef.current[kind];
+                    if (handler) handler(JSON.parse(e.data));
+                });
+            });
+            source.onopen = () => {
+                setConnected(true);
+                retryDelay = RETRY_MIN_MS;
+                if (missed) {
+                    missed = false;
+                    resync();
+                }
+            };
+            source.onerror = () => {
+                setConnected(false);
+                missed = true;
+                if (source.readyState !== EventSource.CLOSED) return; // the browser is already reconnecting
+                // A non-200 answer (503 at the stream cap, a deploy) stops EventSource for good:
+                // refetch now, then try the stream again later
+                source.close();
+                resync();
+                retryTimer = setTimeout(connect, retryDelay);
+                retryDelay = Math.min(retryDelay * 2, RETRY_MAX_MS);
+            };
+        };
+
+        connect();
+        return () => {
+            clearTimeout(retryTimer);
+            source.close();
+        };
+    }, []);
+
+    return connected;
+}
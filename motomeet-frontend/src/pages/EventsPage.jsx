@@ -5,9 +5,21 @@ import CreateEditEvent from "../components/CreateEditEvent";
 import React from 'react';
 import EventCard from "../components/EventCard";
 import { useUser } from "../context/UserContext";
+import useLiveEvents from "../hooks/useLiveEvents";
 import { useNavigate, Navigate } from "react-router-dom";
 axios.defaults.withCredentials = true;
 
+const PAGE_SIZE = 20;
+// Sorting and filtering happen on the server; these map the dropdown to its sort names
+const SORTS = {
+    upcoming: "time",
+    most_rsvps: "popularity",
+    least_rsvps: "least_popular",
+    closest: "distance",
+    mine: "mine",
+};
+const NO_FILTERS = { q: "", from: "", to: "", max_distance: "", min_rsvps: "" };
+
 export default function EventsPage() {
     const { user, setUser } = useUser();
     const [events, setEvents] = useState([]);
@@ -15,15 +27,68 @@ export default function EventsPage() {
     const [showModal, setShowModal] = useState(false);
     const [selectedEvent, setSelectedEvent] = useState(null);
     const [formMode, setFormMode] = useState("create");
-    const [sortedEvents, setSortedEvents] = useState([]);
     const [sortMethod, setSortMethod] = useState("upcoming");
+    const [filters, setFilters] = useState(NO_FILTERS);
+    const [nextCursor, setNextCursor] = useState(null);
     console.log("Work")
     const navigate = useNavigate();
+
+    const feedParams = (after) => {
+        const params = { sort: SORTS[sortMethod], limit: PAGE_SIZE };
+        for (const [key, value] of Object.entries(filters)) {
+            if (value !== "") params[key] = value;
+        }
+        if (after) params.after = after;
+        return params;
+    };
+
+    const refreshFeed = async () => {
+        const refreshed = await axios.get("https://motomeet.onrender.com/api/home", {
+            params: feedParams(),
+            withCredentials: true,
+        });
+        setEvents(refreshed.data.events);
+        setEventsGoing(refreshed.data.events_going);
+        setNextCursor(refreshed.data.next_cursor);
+    };
+
+    const loadMore = async () => {
+        try {
+            const res = await axios.get("https://motomeet.onrender.com/api/home", {
+                params: feedParams(nextCursor),
+                withCredentials: true,
+            });
+            setEvents((prev) => [...prev, ...res.data.events.filter((e) => !prev.some((p) => p.event_uuid === e.event_uuid))]);
+            setNextCursor(res.data.next_cursor);
+        } catch (err) {
+            console.error("Failed to load more events:", err);
+        }
+    };
+
+    // Counts and event changes arrive over the live stream instead of refetching the feed
+    const updateEvent = (eventId, changes) => {
+        setEvents((prev) => prev.map((e) => (e.event_uuid === eventId ? { ...e, ...changes } : e)));
+    };
+    const live = useLiveEvents({
+        rsvp: ({ event_id, rsvp_count }) => updateEvent(event_id, { rsvp_count }),
+        created: ({ event_id, event }) =>
+            setEvents((prev) => (prev.some((e) => e.event_uuid === event_id) ? prev : [...prev, event])),
+        updated: ({ event_id, event }) =>
+            setEvents((prev) =>
+                prev.some((e) => e.event_uuid === event_id)
+                    ? prev.map((e) => (e.event_uuid === event_id ? event : e))
+                    : [...prev, event]
+            ),
+        removed: ({ event_id }) => setEvents((prev) => prev.filter((e) => e.event_uuid !== event_id)),
+        resync: () => refreshFeed().catch((err) => console.error("Feed refresh failed:", err)),
+    });
+
     useEffect(() => {
         const fetchData = async () => {
             try {
                 const API = process.env.REACT_APP_API_URL;
                 const res = await axios.get("https://motomeet.onrender.com/api/home", {
+                    params: feedParams(),
                     withCredentials: true,
                 });
                 setUser({
@@ -32,11 +97,9 @@ export default function EventsPage() {
                     city: res.data.city,
                     radius: res.data.radius,
                 });
-                const fetchedEvents = res.data.events;
-                setEvents(fetchedEvents);
+                setEvents(res.data.events);
                 setEventsGoing(res.data.events_going);
-
-                setSortedEvents(sortEvents(fetchedEvents, sortMethod, res.data.email));
+                setNextCursor(res.data.next_cursor);
 
 
             } catch (err) {
@@ -46,8 +109,10 @@ export default function EventsPage() {
                 }
             }
         };
-        fetchData();
-    }, []);
+        // Wait for the rider to stop typing before asking again
+        const timer = setTimeout(fetchData, filters === NO_FILTERS ? 0 : 300);
+        return () => clearTimeout(timer);
+    }, [sortMethod, filters]);
 
 
     const handleCancel = async (eventId) => {
@@ -56,11 +121,10 @@ export default function EventsPage() {
             await axios.post("https://motomeet.onrender.com/api/cancel_event", { event_id: eventId }, {
                 withCredentials: true,
             });
-            const refreshed = await axios.get("https://motomeet.onrender.com/api/home", {
-                withCredentials: true,
-            });
-            setEvents(refreshed.data.events);
-            setEventsGoing(refreshed.data.events_going);
+            setEvents((prev) => prev.filter((e) => e.event_uuid !== eventId));
+            setEventsGoing((prev) => prev.filter((id) => id !== eventId));
+            // Without the stream nothing else would bring in other riders' changes
+            if (!live) await refreshFeed();
         } catch (err) {
             console.error("Failed to cancel event:", err);
         }
@@ -75,13 +139,11 @@ export default function EventsPage() {
             }, {
                 withCredentials: true
             });
-            console.log(res.data.message);
-            console.log(res.data);
-            const refreshed = await axios.get("https://motomeet.onrender.com/api/home", {
-                withCredentials: true,
-            });
-            setEvents(refreshed.data.events);
-            setEventsGoing(refreshed.data.events_going);
+            updateEvent(eventId, { rsvp_count: res.data.rsvp_count });
+            setEventsGoing((prev) =>
+                state ? [...prev.filter((id) => id !== eventId), eventId] : prev.filter((id) => id !== eventId)
+            );
+            if (!live) await refreshFeed();
         } catch (error) {
             console.error("RSVP error:", error);
         }
@@ -92,30 +154,12 @@ export default function EventsPage() {
         setSelectedEvent(event);
         setShowModal(true);
     };
-    const sortEvents = (eventsList, method, userEmail) => {
-        const createdEvents = eventsList.filter(e => e.host_email === userEmail);
-        const otherEvents = eventsList.filter(e => e.host_email !== userEmail);
-
-        let sortedOthers = [...otherEvents];
-
-        if (method === "most_rsvps") {
-            sortedOthers.sort((a, b) => b.rsvp_count - a.rsvp_count);
-        } else if (method === "least_rsvps") {
-            sortedOthers.sort((a, b) => a.rsvp_count - b.rsvp_count);
-        } else if (method === "closest") {
-            sortedOthers.sort((a, b) => a.distance - b.distance);
-        } else if (method === "upcoming") {
-            sortedOthers.sort((a, b) =>
-                new Date(a.event_time).getTime() - new Date(b.event_time).getTime()
-            );
-        }
-
-        return [...createdEvents, ...sortedOthers];
+    const handleSort = (e) => {
+        setSortMethod(e.target.value);
     };
 
-    const handleSort = (e) => {
-        const sortType = e.target.value;
-        setSortedEvents(sortEvents(events, sortType, user.email));
+    const handleFilter = (e) => {
+        setFilters((prev) => ({ ...prev, [e.target.name]: e.target.value }));
     };
 
 
@@ -142,17 +186,25 @@ export default function EventsPage() {
                 <div className="flex justify-between items-center mb-4">
                     <h2 className="text-xl">Events within {user.radius} miles near {user.city}</h2>
                 </div>
-                <select onChange={handleSort}>
-                    <option value="upcoming">Upcoming</option>
-                    <option value="most_rsvps">Most RSVPs</option>
-                    <option value="least_rsvps">Least RSVPs</option>
-                    <option value="closest">Closest</option>
-                </select>
+                <div className="flex flex-wrap gap-2 mb-4">
+                    <select onChange={handleSort}>
+                        <option value="upcoming">Upcoming</option>
+                        <option value="mine">Hosted by me</option>
+                        <option value="most_rsvps">Most RSVPs</option>
+                        <option value="least_rsvps">Least RSVPs</option>
+                        <option value="closest">Closest</option>
+                    </select>
+                    <input className="border rounded px-2" name="q" placeholder="Search" value={filters.q} onChange={handleFilter} />
+                    <input className="border rounded px-2" name="from" type="date" value={filters.from} onChange={handleFilter} />
+                    <input className="border rounded px-2" name="to" type="date" value={filters.to} onChange={handleFilter} />
+                    <input className="border rounded px-2 w-32" name="max_distance" type="number" min="1" placeholder="Max miles" value={filters.max_distance} onChange={handleFilter} />
+                    <input className="border rounded px-2 w-32" name="min_rsvps" type="number" min="0" placeholder="Min RSVPs" value={filters.min_rsvps} onChange={handleFilter} />
+                </div>
                 {events.length === 0 ? (
                     <p className="text-gray-500">No events found within your selected radius.</p>
                 ) : (
 
-                    sortedEvents
+                    events
                         .filter(
                             (event) =>
                                 !eventsGoing.includes(event.event_uuid) ||
@@ -170,6 +222,11 @@ export default function EventsPage() {
                             />
                         ))
                 )}
+                {nextCursor && (
+                    <button className="mt-4 px-4 py-2 rounded-lg border hover:bg-gray-100" onClick={loadMore}>
+                        Load more
+                    </button>
+                )}
             </div>
 
             {selectedEvent && (
@@ -235,10 +292,8 @@ export default function EventsPage() {
                                             withCredentials: true, // Only needed if using cookies (you may remove)
                                         });
                                     }
-                                    const refreshed = await axios.get("https://motomeet.onrender.com/api/home", { withCredentials: true });
-
-                                    setEvents(refreshed.data.events);
-                                    setEventsGoing(refreshed.data.events_going);
+                                    // The live stream only reaches riders in range, so pick up our own edit directly
+                                    await refreshFeed();
 
                                     setShowModal(false);
                                     setSelectedEvent(null); // optional: clear selected event on close
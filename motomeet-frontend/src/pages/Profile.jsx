@@ -7,6 +7,7 @@ import axios from "axios";
 import CreateEditEvent from "../components/CreateEditEvent";
 import EventCard from "../components/EventCard"; // adjust path if needed
 import { useNavigate, Navigate } from "react-router-dom";
+import useLiveEvents from "../hooks/useLiveEvents";
 export default function Profile() {
   const [userData, setUserData] = useState(null);
   const [events, setEvents] = useState([]);
@@ -22,6 +23,16 @@ export default function Profile() {
     fetchProfile();
   }, []);
 
+  // Keep RSVP counts current without refetching the profile
+  const live = useLiveEvents({
+    rsvp: ({ event_id, rsvp_count }) =>
+      setEvents((prev) => prev.map((e) => (e.event_uuid === event_id ? { ...e, rsvp_count } : e))),
+    updated: ({ event_id, event }) =>
+      setEvents((prev) => prev.map((e) => (e.event_uuid === event_id ? { ...e, ...event } : e))),
+    removed: ({ event_id }) => setEvents((prev) => prev.filter((e) => e.event_uuid !== event_id)),
+    resync: () => fetchProfile(),
+  });
+
   const fetchProfile = async () => {
     try {
       const API = process.env.REACT_APP_API_URL;
@@ -41,13 +52,22 @@ export default function Profile() {
   const handleRSVP = async (eventId, state) => {
     try {
       const API = process.env.REACT_APP_API_URL;
-      await axios.post("https://motomeet.onrender.com/api/home", {
+      const res = await axios.post("https://motomeet.onrender.com/api/home", {
         event_id: eventId,
         state
       }, {
         withCredentials: true
       });
-      await fetchProfile();
+      if (state) {
+        setEvents((prev) => prev.map((e) => (e.event_uuid === eventId ? { ...e, rsvp_count: res.data.rsvp_count } : e)));
+        setEventsGoing((prev) => [...prev.filter((id) => id !== eventId), eventId]);
+      } else {
+        // The profile only lists events you're going to
+        setEvents((prev) => prev.filter((e) => e.event_uuid !== eventId));
+        setEventsGoing((prev) => prev.filter((id) => id !== eventId));
+      }
+      // Without the stream nothing else would bring in other riders' changes
+      if (!live) await fetchProfile();
     } catch (error) {
       console.error("RSVP error:", error);
     }
@@ -66,7 +86,9 @@ export default function Profile() {
       await axios.post("https://motomeet.onrender.com/api/cancel_event", { event_id: eventId }, {
         withCredentials: true
       });
-      await fetchProfile();
+      setEvents((prev) => prev.filter((e) => e.event_uuid !== eventId));
+      setEventsGoing((prev) => prev.filter((id) => id !== eventId));
+      if (!live) await fetchProfile();
     } catch (err) {
       console.error("Failed to cancel event:", err);
     }
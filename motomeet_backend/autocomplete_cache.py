@@ -0,0 +1,124 @@
+import json
+import threading
+
+from geocode_cache import LRUCache, normalize_address
+
+# Fields that don't change which suggestions come back
+_IGNORED_FIELDS = ("input", "sessionToken")
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class AutocompleteCache:
+    """Suggestion cache for the places:autocomplete proxy.
+
+    `fetch(body)` does the upstream call and returns (status_code, json).
+    Only 200 responses are cached. Identical queries already in flight on
+    another thread wait for that call instead of starting their own, and a
+    query that extends an already answered one is served from it when that
+    answer was complete (fewer than `max_suggestions` results). When the
+    upstream call raises, an expired answer for the same query is served
+    if there is one.
+    """
+
+    def __init__(self, fetch, maxsize=4096, ttl=3600, max_suggestions=5,
+                 prefix_reuse=True, wait_timeout=10.0):
+        self.fetch = fetch
+        self.memory = LRUCache(maxsize, ttl)
+        self.max_suggestions = max_suggestions
+        self.prefix_reuse = prefix_reuse
+        self.wait_timeout = wait_timeout
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._counters = {"hits": 0, "prefix_hits": 0, "misses": 0, "coalesced": 0, "stale": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def key(body):
+        bias = {k: v for k, v in body.items() if k not in _IGNORED_FIELDS}
+        return json.dumps(bias, sort_keys=True), normalize_address(str(body.get("input", "")))
+
+    def _from_prefix(self, bias, query):
+        for end in range(len(query) - 1, 0, -1):
+            cached = self.memory.get((bias, query[:end]))
+            if cached is None:
+                continue
+            suggestions = cached.get("suggestions", [])
+            if len(suggestions) >= self.max_suggestions:
+                # Truncated answer, the longer query may have matches it left out
+                return None
+            matches = [
+                s for s in suggestions
+                if query in normalize_address(s.get("placePrediction", {}).get("text", {}).get("text", ""))
+            ]
+            return {"suggestions": matches} if matches else None
+        return None
+
+    def _fetch(self, key, body):
+        try:
+            return self.fetch(body)
+        except Exception:
+            cached = self.memory.get(key, stale=True)
+            if cached is None:
+                raise
+            self._count("stale")
+            return 200, cached
+
+    def get(self, body):
+        """Return (status_code, json, source) where source is hit/prefix/miss/coalesced."""
+        key = self.key(body)
+        cached = self.memory.get(key)
+        if cached is not None:
+            self._count("hits")
+            return 200, cached, "hit"
+
+        if self.prefix_reuse and key[1]:
+            cached = self._from_prefix(*key)
+            if cached is not None:
+                self._count("prefix_hits")
+                self.memory.set(key, cached)
+                return 200, cached, "prefix"
+
+        with self._lock:
+            call = self._inflight.get(key)
+            leader = call is None
+            if leader:
+                call = self._inflight[key] = _Call()
+
+        if not leader:
+            self._count("coalesced")
+            if call.done.wait(self.wait_timeout) and call.error is None:
+                status, data = call.result
+                return status, data, "coalesced"
+            # The leader failed or is stuck; go upstream ourselves
+            status, data = self._fetch(key, body)
+            return status, data, "miss"
+
+        self._count("misses")
+        try:
+            call.result = self._fetch(key, body)
+            status, data = call.result
+            if status == 200:
+                self.memory.set(key, data)
+            return status, data, "miss"
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["memory_size"] = len(self.memory)
+        return stats
@@ -0,0 +1,114 @@
+"""Shows that cancel_event's made_events cleanup no longer scales with the users table.
+
+Builds throwaway users/events tables in a scratch schema at several user counts
+and times the old whole-table UPDATE against the targeted array_remove.
+
+    python benchmarks/cancel_event_scaling.py --users 1000 10000 100000
+"""
+import argparse
+import os
+import statistics
+import time
+
+import psycopg2
+from dotenv import load_dotenv
+
+SCHEMA = "bench_cancel_event"
+
+OLD_CLEANUP = """
+    UPDATE users
+    SET made_events = (
+        SELECT ARRAY_AGG(eid)
+        FROM unnest(made_events) AS eid
+        WHERE eid IN (SELECT event_uuid FROM events)
+    );
+"""
+NEW_CLEANUP = """
+    UPDATE users
+    SET made_events = array_remove(made_events, %s)
+    WHERE email = %s
+"""
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        port=int(os.getenv("DB_PORT", 5432)),
+    )
+
+
+def seed(cur, n_users, events_per_host=3):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("CREATE TABLE users (email TEXT PRIMARY KEY, made_events UUID[] NOT NULL DEFAULT '{}')")
+    cur.execute("CREATE TABLE events (event_uuid UUID PRIMARY KEY, host_email TEXT NOT NULL)")
+    cur.execute("CREATE INDEX ON events (host_email)")
+    # Every tenth user hosts a few events
+    cur.execute("""
+        INSERT INTO users (email)
+        SELECT 'rider' || i || '@example.com' FROM generate_series(1, %s) AS i
+    """, (n_users,))
+    cur.execute("""
+        INSERT INTO events (event_uuid, host_email)
+        SELECT md5(random()::text || i || j)::uuid, 'rider' || i || '@example.com'
+        FROM generate_series(1, %s, 10) AS i, generate_series(1, %s) AS j
+    """, (n_users, events_per_host))
+    cur.execute("""
+        UPDATE users u SET made_events = h.ids
+        FROM (SELECT host_email, array_agg(event_uuid) AS ids FROM events GROUP BY host_email) h
+        WHERE h.host_email = u.email
+    """)
+    cur.execute("ANALYZE users")
+    cur.execute("ANALYZE events")
+
+
+def time_cancel(conn, cleanup, rounds):
+    timings = []
+    with conn.cursor() as cur:
+        cur.execute(f"SET search_path TO {SCHEMA}")
+        for _ in range(rounds):
+            cur.execute("SELECT event_uuid, host_email FROM events ORDER BY random() LIMIT 1")
+            event_id, host = cur.fetchone()
+            started = time.perf_counter()
+            cur.execute("DELETE FROM events WHERE event_uuid = %s", (event_id,))
+            if cleanup == "old":
+                cur.execute(OLD_CLEANUP)
+            else:
+                cur.execute(NEW_CLEANUP, (event_id, host))
+            timings.append((time.perf_counter() - started) * 1000)
+            # Keep the dataset identical between rounds and strategies
+            conn.rollback()
+            cur.execute(f"SET search_path TO {SCHEMA}")
+    return statistics.median(timings)
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        print(f"{'users':>10} {'old (ms)':>10} {'new (ms)':>10}")
+        for n_users in args.users:
+            with conn.cursor() as cur:
+                seed(cur, n_users)
+            conn.commit()
+            old = time_cancel(conn, "old", args.rounds)
+            new = time_cancel(conn, "new", args.rounds)
+            print(f"{n_users:>10} {old:>10.2f} {new:>10.2f}")
+    finally:
+        with conn.cursor() as cur:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        conn.commit()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
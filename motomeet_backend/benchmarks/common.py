@@ -0,0 +1,30 @@
+import os
+import sys
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+LOCAL_HOSTS = ("localhost", "127.0.0.1", "::1", "")
+
+# Default region: the SF Bay Area and surroundings
+REGION = {"lat": 37.5, "lon": -122.0, "spread": 1.5}
+
+
+def require_local_db(allow_remote):
+    """The benchmarks drop and reseed tables, so refuse anything but a local database."""
+    host = os.getenv("DB_HOST", "")
+    if host not in LOCAL_HOSTS and not allow_remote:
+        sys.exit(f"DB_HOST={host!r} is not local; pass --allow-remote if you really mean it")
+
+
+def connect():
+    return psycopg2.connect(
+        host=os.getenv("DB_HOST"),
+        database=os.getenv("DB_NAME"),
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        port=int(os.getenv("DB_PORT", 5432)),
+        cursor_factory=RealDictCursor,
+    )
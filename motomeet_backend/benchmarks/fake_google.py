@@ -0,0 +1,83 @@
+"""Local stand-in for the Google Geocoding and Places Autocomplete APIs.
+
+Answers are deterministic for a given address/input, land inside the benchmark
+region, and can be delayed to mimic upstream latency.
+
+    python benchmarks/fake_google.py --port 8765 --latency-ms 40
+"""
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from common import REGION
+
+
+def location_for(text):
+    digest = hashlib.sha256(text.strip().lower().encode()).digest()
+    dlat = (int.from_bytes(digest[:4], "big") / 2**32 - 0.5) * 2 * REGION["spread"]
+    dlon = (int.from_bytes(digest[4:8], "big") / 2**32 - 0.5) * 2 * REGION["spread"]
+    return {"lat": REGION["lat"] + dlat, "lng": REGION["lon"] + dlon}
+
+
+class FakeGoogleHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+    protocol_version = "HTTP/1.1"
+
+    def _send(self, payload, status=200):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        url = urlparse(self.path)
+        if url.path != "/maps/api/geocode/json":
+            return self._send({"error": "not found"}, 404)
+        address = parse_qs(url.query).get("address", [""])[0]
+        if not address or "nowhere" in address.lower():
+            return self._send({"results": [], "status": "ZERO_RESULTS"})
+        return self._send({"results": [{"geometry": {"location": location_for(address)}}], "status": "OK"})
+
+    def do_POST(self):
+        time.sleep(self.latency)
+        if urlparse(self.path).path != "/v1/places:autocomplete":
+            return self._send({"error": "not found"}, 404)
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        text = body.get("input", "")
+        suggestions = [
+            {"placePrediction": {"text": {"text": f"{text.title()} Street {i}, Bench City, CA, USA"}}}
+            for i in range(1, 6)
+        ]
+        return self._send({"suggestions": suggestions})
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start(port=0, latency_ms=0):
+    """Serve in a background thread; returns (server, base_url)."""
+    handler = type("Handler", (FakeGoogleHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True, name="fake-google").start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=40)
+    args = parser.parse_args()
+    server, url = start(args.port, args.latency_ms)
+    print(f"Fake Google listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,106 @@
+"""Shows the planning time prepared statements save on the /api/home feed query.
+
+Runs load_home_feed (the query behind GET /api/home) for seeded riders (see
+seed.py) twice, each on a fresh connection: as plain SQL and through the statement
+registry. Each run reports wall time per feed plus the planning and execution
+time Postgres reports in EXPLAIN ANALYZE. The first few EXECUTEs of a
+prepared statement still plan (custom plans); after that Postgres usually
+switches to a cached generic plan, which is where the saving shows.
+
+    python benchmarks/prepared_statements.py --riders 200 --rounds 10
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+from dotenv import load_dotenv
+from psycopg2.extras import RealDictCursor
+
+from common import BACKEND_DIR, connect, require_local_db
+
+
+class ExplainCursor(RealDictCursor):
+    """Runs every query as EXPLAIN ANALYZE and keeps the timings instead of the rows."""
+
+    timings = []
+
+    def execute(self, query, vars=None):
+        if not query.lstrip().upper().startswith(("SELECT", "WITH", "EXECUTE")):
+            return super().execute(query, vars)
+        super().execute("EXPLAIN (ANALYZE, FORMAT JSON) " + query, vars)
+        plan = super().fetchone()["QUERY PLAN"][0]
+        self.timings.append((plan["Planning Time"], plan["Execution Time"]))
+
+    def fetchall(self):
+        return []
+
+
+def time_feeds(motomeet, conn, riders, rounds):
+    timings = []
+    for _ in range(rounds):
+        for email in riders:
+            started = time.perf_counter()
+            motomeet.load_home_feed(conn, email, fresh=True)
+            conn.commit()
+            timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def explain_feeds(motomeet, conn, riders, rounds):
+    ExplainCursor.timings = []
+    conn.cursor_factory = ExplainCursor
+    try:
+        time_feeds(motomeet, conn, riders, rounds)
+    finally:
+        conn.cursor_factory = motomeet.CURSOR_FACTORY
+    return ExplainCursor.timings
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--riders", type=int, default=200, help="How many seeded riders' feeds to load.")
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--allow-remote", action="store_true")
+    args = parser.parse_args()
+    require_local_db(args.allow_remote)
+
+    conn = connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT email FROM users WHERE lat IS NOT NULL ORDER BY random() LIMIT %s", (args.riders,))
+        riders = [row["email"] for row in cur.fetchall()]
+    conn.close()
+    if not riders:
+        sys.exit("No riders found; run benchmarks/seed.py first")
+
+    sys.path.insert(0, BACKEND_DIR)
+    os.environ["EVENT_INDEX_ENABLED"] = "0"  # measure the SQL feed, not the in-memory one
+    import motomeet
+
+    print(f"{len(riders)} riders x {args.rounds} rounds of the home feed query")
+    print(f"{'mode':<10} {'p50 ms':>9} {'p95 ms':>9} {'plan p50 ms':>12} {'exec p50 ms':>12}")
+    for mode, enabled in (("plain", False), ("prepared", True)):
+        motomeet.statements.enabled = enabled
+        # A fresh connection per mode, so the prepared run starts unprepared like a new pool would
+        conn = motomeet.config()
+        try:
+            time_feeds(motomeet, conn, riders[:10], 1)  # warm caches
+            wall = sorted(time_feeds(motomeet, conn, riders, args.rounds))
+            explained = explain_feeds(motomeet, conn, riders, args.rounds)
+        finally:
+            conn.close()
+        planning = statistics.median(p for p, _ in explained)
+        execution = statistics.median(e for _, e in explained)
+        p95 = wall[min(len(wall) - 1, int(len(wall) * 0.95))]
+        print(f"{mode:<10} {statistics.median(wall):>9.2f} {p95:>9.2f} {planning:>12.3f} {execution:>12.3f}")
+
+    print("\nPer-statement counts from the registry:")
+    for name, stats in motomeet.statements.stats().items():
+        print(f"  {name:<24} {stats['executions']:>8} executions {stats['prepares']:>4} prepares "
+              f"{stats['seconds_total']:>10.3f}s")
+
+
+if __name__ == "__main__":
+    main()
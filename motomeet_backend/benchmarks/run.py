@@ -0,0 +1,239 @@
+"""Drive a mixed MotoMeet workload and report per-endpoint latency and throughput.
+
+By default the Flask app is served in-process (rate limits off) against the
+local database from seed.py, with Google replaced by fake_google.py. Use
+--target to hit an already running server instead (e.g. under gunicorn).
+
+    python benchmarks/run.py --duration 30 --concurrency 16 --save benchmarks/baselines/local.json
+    python benchmarks/run.py --duration 30 --concurrency 16 --compare benchmarks/baselines/local.json
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import requests
+from dotenv import load_dotenv
+
+import fake_google
+from common import BACKEND_DIR, REGION, connect, require_local_db
+
+DEFAULT_MIX = "home=60,rsvp=20,set_location=10,create_event=5,autocomplete=5"
+CITIES = [f"Bench City {i}" for i in range(300)]
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Workload:
+    def __init__(self, base_url, secret, riders, event_ids, mix):
+        self.base_url = base_url
+        self.riders = riders
+        self.event_ids = event_ids
+        self.ops, self.weights = zip(*mix.items())
+        exp = datetime.now(timezone.utc) + timedelta(hours=5)
+        # Mint tokens directly so logins (and bcrypt) stay out of the measurement
+        self.tokens = {email: jwt.encode({"email": email, "exp": exp}, secret, algorithm="HS256") for email in riders}
+
+    def request(self, session, op):
+        email = random.choice(self.riders)
+        cookies = {"access_token": self.tokens[email]}
+        url = self.base_url
+        if op == "home":
+            return session.get(f"{url}/api/home", cookies=cookies)
+        if op == "rsvp":
+            body = {"event_id": random.choice(self.event_ids), "state": random.random() < 0.6}
+            return session.post(f"{url}/api/home", json=body, cookies=cookies)
+        if op == "set_location":
+            body = {"city": random.choice(CITIES), "radius": random.choice([25, 50, 100])}
+            return session.post(f"{url}/api/set_location", json=body, cookies=cookies)
+        if op == "create_event":
+            when = datetime.now(timezone.utc) + timedelta(days=random.uniform(1, 30))
+            body = {
+                "event_name": f"Bench ride {random.randrange(10**6)}",
+                "event_time": when.isoformat(),
+                "location": "Bench meet spot",
+                "lat": REGION["lat"] + random.uniform(-1, 1) * REGION["spread"],
+                "lng": REGION["lon"] + random.uniform(-1, 1) * REGION["spread"],
+                "description": "Created by the benchmark",
+            }
+            return session.post(f"{url}/api/create_event", json=body, cookies=cookies)
+        if op == "autocomplete":
+            city = random.choice(CITIES)
+            body = {"input": city[:random.randint(3, len(city))]}
+            return session.post(f"{url}/api/autocomplete", json=body, cookies=cookies)
+        raise ValueError(f"Unknown operation {op}")
+
+    def run(self, concurrency, duration, warmup):
+        samples = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        measure_from = time.monotonic() + warmup
+        stop_at = measure_from + duration
+
+        def worker():
+            session = requests.Session()
+            while True:
+                now = time.monotonic()
+                if now >= stop_at:
+                    return
+                op = random.choices(self.ops, self.weights)[0]
+                started = time.perf_counter()
+                try:
+                    ok = self.request(session, op).status_code < 400
+                except requests.RequestException:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                if now < measure_from:
+                    continue
+                with lock:
+                    samples[op].append(elapsed)
+                    if not ok:
+                        errors[op] += 1
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        results = {}
+        for op, values in sorted(samples.items()):
+            values.sort()
+            results[op] = {
+                "count": len(values),
+                "errors": errors[op],
+                "rps": round(len(values) / duration, 2),
+                "p50_ms": round(percentile(values, 50) * 1000, 2),
+                "p95_ms": round(percentile(values, 95) * 1000, 2),
+                "p99_ms": round(percentile(values, 99) * 1000, 2),
+            }
+        return results
+
+
+def load_dataset(sample_users):
+    conn = connect()
+    with conn.cursor() as cur:
+        cur.execute("SELECT email FROM users WHERE lat IS NOT NULL ORDER BY random() LIMIT %s", (sample_users,))
+        riders = [row["email"] for row in cur.fetchall()]
+        cur.execute("SELECT event_uuid FROM events WHERE event_time >= NOW()")
+        event_ids = [str(row["event_uuid"]) for row in cur.fetchall()]
+        cur.execute("SELECT (SELECT COUNT(*) FROM users) AS users, (SELECT COUNT(*) FROM events) AS events, "
+                    "(SELECT COUNT(*) FROM rsvps) AS rsvps")
+        counts = dict(cur.fetchone())
+    conn.close()
+    if not riders or not event_ids:
+        sys.exit("No riders or upcoming events found; run benchmarks/seed.py first")
+    return riders, event_ids, counts
+
+
+def serve_in_process(google_url):
+    from werkzeug.serving import make_server
+
+    os.environ["GOOGLE_GEOCODE_URL"] = f"{google_url}/maps/api/geocode/json"
+    os.environ["GOOGLE_AUTOCOMPLETE_URL"] = f"{google_url}/v1/places:autocomplete"
+    sys.path.insert(0, BACKEND_DIR)
+    import motomeet
+
+    motomeet.limiter.enabled = False
+    motomeet.db_pool.warm()
+    server = make_server("127.0.0.1", 0, motomeet.create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True, name="motomeet").start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def print_results(results):
+    print(f"{'endpoint':<14} {'count':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for op, r in results.items():
+        print(f"{op:<14} {r['count']:>8} {r['errors']:>7} {r['rps']:>9} {r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+def compare(results, baseline, threshold):
+    """Print deltas against a saved run; returns True if anything regressed past `threshold` percent."""
+    regressed = False
+    print(f"\nvs baseline from {baseline['meta'].get('started_at')} ({baseline['meta'].get('commit')})")
+    for op, r in results.items():
+        base = baseline["results"].get(op)
+        if not base:
+            continue
+        p95 = (r["p95_ms"] - base["p95_ms"]) / base["p95_ms"] * 100 if base["p95_ms"] else 0.0
+        rps = (r["rps"] - base["rps"]) / base["rps"] * 100 if base["rps"] else 0.0
+        flag = ""
+        if p95 > threshold or rps < -threshold:
+            flag = "  ❌ regression"
+            regressed = True
+        print(f"{op:<14} p95 {p95:+7.1f}%   req/s {rps:+7.1f}%{flag}")
+    return regressed
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=30)
+    parser.add_argument("--warmup", type=float, default=5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"Weighted operations (default {DEFAULT_MIX})")
+    parser.add_argument("--riders", type=int, default=500, help="How many seeded riders to act as.")
+    parser.add_argument("--target", help="Base URL of a running server instead of serving in-process.")
+    parser.add_argument("--google-latency-ms", type=float, default=40)
+    parser.add_argument("--save", help="Write the results as a baseline JSON file.")
+    parser.add_argument("--compare", help="Compare against a saved baseline JSON file.")
+    parser.add_argument("--threshold", type=float, default=15, help="Regression threshold in percent.")
+    parser.add_argument("--allow-remote", action="store_true")
+    args = parser.parse_args()
+    require_local_db(args.allow_remote)
+
+    secret = os.getenv("JWT_SECRET_KEY")
+    if not secret:
+        secret = os.environ["JWT_SECRET_KEY"] = "benchmark-secret"
+    mix = {op: float(w) for op, w in (part.split("=") for part in args.mix.split(","))}
+
+    riders, event_ids, counts = load_dataset(args.riders)
+    if args.target:
+        base_url = args.target.rstrip("/")
+    else:
+        _, google_url = fake_google.start(latency_ms=args.google_latency_ms)
+        base_url = serve_in_process(google_url)
+
+    started_at = datetime.now(timezone.utc).isoformat()
+    print(f"Running {args.mix} at concurrency {args.concurrency} for {args.duration:.0f}s against {base_url}")
+    results = Workload(base_url, secret, riders, event_ids, mix).run(args.concurrency, args.duration, args.warmup)
+    print_results(results)
+
+    commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip()
+    run = {
+        "meta": {
+            "started_at": started_at,
+            "commit": commit,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "mix": args.mix,
+            "dataset": counts,
+            "target": args.target or "in-process",
+        },
+        "results": results,
+    }
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save)), exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(run, f, indent=2)
+        print(f"Saved baseline to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            if compare(results, json.load(f), args.threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+-- Base tables as the app expects them, for a local PostGIS used by the benchmarks.
+-- Production already has these; migrations/ are applied on top by benchmarks/seed.py.
+CREATE EXTENSION IF NOT EXISTS postgis;
+
+CREATE TABLE IF NOT EXISTS users (
+    email TEXT PRIMARY KEY,
+    hashed_password TEXT,
+    n TEXT,
+    make TEXT,
+    model TEXT,
+    made_events UUID[] DEFAULT '{}',
+    lat DOUBLE PRECISION,
+    long DOUBLE PRECISION,
+    radius INTEGER,
+    city TEXT
+);
+
+CREATE TABLE IF NOT EXISTS events (
+    event_uuid UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    event_name TEXT NOT NULL,
+    event_time TIMESTAMPTZ NOT NULL,
+    location TEXT,
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL,
+    host_email TEXT NOT NULL REFERENCES users (email),
+    description TEXT,
+    geom GEOGRAPHY(Point, 4326)
+        GENERATED ALWAYS AS (ST_SetSRID(ST_MakePoint(longitude, latitude), 4326)::geography) STORED
+);
+
+CREATE TABLE IF NOT EXISTS rsvps (
+    user_email TEXT NOT NULL REFERENCES users (email),
+    event_id UUID NOT NULL REFERENCES events (event_uuid),
+    PRIMARY KEY (user_email, event_id)
+);
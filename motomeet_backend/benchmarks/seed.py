@@ -0,0 +1,126 @@
+"""Create and fill a local PostGIS database with a synthetic MotoMeet dataset.
+
+Riders, events and RSVPs are scattered across the benchmark region. Run
+against a scratch database only; --reset wipes users, events and rsvps.
+
+    python benchmarks/seed.py --reset --users 5000 --events 2000 --rsvps 50000
+"""
+import argparse
+import os
+import sys
+
+import bcrypt
+from dotenv import load_dotenv
+
+from common import BACKEND_DIR, BENCH_DIR, REGION, connect, require_local_db
+
+BENCH_PASSWORD = "benchpassword"
+
+
+def apply_migrations():
+    sys.path.insert(0, BACKEND_DIR)
+    from motomeet import create_app
+
+    result = create_app().test_cli_runner().invoke(args=["migrate"])
+    print(result.output, end="")
+    if result.exit_code != 0:
+        raise SystemExit(f"Migrations failed: {result.exception}")
+
+
+def seed(cur, users, events, rsvps, past_fraction, bcrypt_rounds):
+    params = {
+        "users": users,
+        "events": events,
+        "rsvps": rsvps,
+        "past": past_fraction,
+        "lat": REGION["lat"],
+        "lon": REGION["lon"],
+        "spread": REGION["spread"],
+        # One shared hash; hashing thousands of passwords would dominate seeding
+        "hash": bcrypt.hashpw(BENCH_PASSWORD.encode(), bcrypt.gensalt(rounds=bcrypt_rounds)).decode(),
+    }
+    cur.execute("""
+        INSERT INTO users (email, hashed_password, n, make, model, made_events, lat, long, radius, city)
+        SELECT 'rider' || i || '@bench.test', %(hash)s, 'Rider ' || i, 'Honda', 'CB500F', '{}',
+               %(lat)s + (random() - 0.5) * 2 * %(spread)s,
+               %(lon)s + (random() - 0.5) * 2 * %(spread)s,
+               (ARRAY[25, 50, 100, 250])[1 + floor(random() * 4)::int] * 1609,
+               'Bench City'
+        FROM generate_series(1, %(users)s) AS i
+    """, params)
+    cur.execute("""
+        INSERT INTO events (event_name, event_time, location, latitude, longitude, host_email, description)
+        SELECT 'Ride ' || i,
+               CASE WHEN random() < %(past)s
+                    THEN NOW() - random() * interval '90 days'
+                    ELSE NOW() + interval '1 hour' + random() * interval '60 days' END,
+               'Meet spot ' || i,
+               %(lat)s + (random() - 0.5) * 2 * %(spread)s,
+               %(lon)s + (random() - 0.5) * 2 * %(spread)s,
+               'rider' || (1 + floor(random() * %(users)s)::int) || '@bench.test',
+               'Synthetic ride number ' || i
+        FROM generate_series(1, %(events)s) AS i
+    """, params)
+    # Hosts go to their own events, like create_event does
+    cur.execute("INSERT INTO rsvps (user_email, event_id) SELECT host_email, event_uuid FROM events ON CONFLICT DO NOTHING")
+    cur.execute("""
+        WITH picks AS MATERIALIZED (
+            SELECT 1 + floor(random() * %(users)s)::int AS u, 1 + floor(random() * %(events)s)::int AS rn
+            FROM generate_series(1, %(rsvps)s)
+        ),
+        numbered AS MATERIALIZED (
+            SELECT event_uuid, row_number() OVER () AS rn FROM events
+        )
+        INSERT INTO rsvps (user_email, event_id)
+        SELECT 'rider' || p.u || '@bench.test', n.event_uuid
+        FROM picks p JOIN numbered n USING (rn)
+        ON CONFLICT DO NOTHING
+    """, params)
+    cur.execute("""
+        UPDATE events e SET rsvp_count = c.n
+        FROM (SELECT event_id, COUNT(*) AS n FROM rsvps GROUP BY event_id) c
+        WHERE c.event_id = e.event_uuid
+    """)
+    cur.execute("""
+        UPDATE users u SET made_events = h.ids
+        FROM (SELECT host_email, array_agg(event_uuid) AS ids FROM events GROUP BY host_email) h
+        WHERE h.host_email = u.email
+    """)
+    for table in ("users", "events", "rsvps"):
+        cur.execute(f"ANALYZE {table}")
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--rsvps", type=int, default=50000)
+    parser.add_argument("--past-fraction", type=float, default=0.2, help="Share of events already in the past.")
+    parser.add_argument("--bcrypt-rounds", type=int, default=int(os.getenv("BCRYPT_ROUNDS", 12)))
+    parser.add_argument("--reset", action="store_true", help="Empty users, events and rsvps first.")
+    parser.add_argument("--allow-remote", action="store_true")
+    args = parser.parse_args()
+    require_local_db(args.allow_remote)
+
+    conn = connect()
+    with conn.cursor() as cur:
+        with open(os.path.join(BENCH_DIR, "schema.sql")) as f:
+            cur.execute(f.read())
+    conn.commit()
+    apply_migrations()
+
+    with conn.cursor() as cur:
+        if args.reset:
+            cur.execute("TRUNCATE rsvps, events, users CASCADE")
+        seed(cur, args.users, args.events, args.rsvps, args.past_fraction, args.bcrypt_rounds)
+        cur.execute("SELECT (SELECT COUNT(*) FROM users) AS users, (SELECT COUNT(*) FROM events) AS events, "
+                    "(SELECT COUNT(*) FROM rsvps) AS rsvps")
+        counts = cur.fetchone()
+    conn.commit()
+    conn.close()
+    print(f"✅ Seeded {counts['users']} users, {counts['events']} events, {counts['rsvps']} RSVPs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+import os
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be checked out before the timeout."""
+
+
+class ConnectionPool:
+    """Thread-safe pool of psycopg2 connections.
+
+    `connect` is a zero-argument factory returning a new connection (or None on
+    failure), so the pool doesn't care how the connection is configured.
+    With `track_stacks` every checkout records its call stack so leak reports
+    can say where the connection was taken; that costs a stack walk per
+    checkout, so leave it off unless you're hunting a leak.
+    """
+
+    def __init__(self, connect, minconn=2, maxconn=10, timeout=5.0,
+                 health_check_after=30.0, leak_after=60.0, on_checkout=None, track_stacks=False):
+        self._connect = connect
+        self.on_checkout = on_checkout  # called with the seconds spent waiting
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self.leak_after = leak_after
+        self.track_stacks = track_stacks
+
+        self._cond = threading.Condition()
+        self._idle = []          # [(conn, last_used)]
+        self._in_use = {}        # id(conn) -> (conn, checked_out_at, stack or None)
+        self._size = 0           # idle + in use + being opened
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "opened": 0,
+            "discarded": 0,
+            "health_check_failures": 0,
+            "leaks_reported": 0,
+            "wait_seconds_total": 0.0,
+        }
+        self._reported_leaks = set()
+        self._watch_pid = None
+
+    def _open(self):
+        conn = self._connect()
+        if conn is None:
+            raise psycopg2.OperationalError("Database Connection Error")
+        with self._cond:
+            self._stats["opened"] += 1
+        return conn
+
+    def warm(self):
+        """Open connections up to `minconn` so the first requests don't pay for them."""
+        opened = 0
+        while True:
+            with self._cond:
+                if self._size >= self.minconn:
+                    break
+                self._size += 1
+            try:
+                conn = self._open()
+            except psycopg2.Error as e:
+                with self._cond:
+                    self._size -= 1
+                print(f"❌ Pool warm-up failed: {e}")
+                break
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+            opened += 1
+        return opened
+
+    def _healthy(self, conn, last_used):
+        if conn.closed:
+            return False
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            with self._cond:
+                self._stats["health_check_failures"] += 1
+            return False
+
+    def _close_quietly(self, conn):
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+
+    def getconn(self, timeout=None):
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+        while True:
+            conn = None
+            with self._cond:
+                while not self._idle and self._size >= self.maxconn:
+                    self._report_leaks_locked()
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"No database connection available after {timeout:.1f}s "
+                            f"({len(self._in_use)} in use)"
+                        )
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._healthy(conn, last_used):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            stack = traceback.format_stack(limit=8) if self.track_stacks else None
+            with self._cond:
+                self._in_use[id(conn)] = (conn, time.monotonic(), stack)
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += waited
+            if self.on_checkout is not None:
+                self.on_checkout(waited)
+            return conn
+
+    def _discard(self, conn):
+        self._close_quietly(conn)
+        with self._cond:
+            self._in_use.pop(id(conn), None)
+            self._reported_leaks.discard(id(conn))
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def putconn(self, conn, discard=False):
+        if not discard and not conn.closed:
+            status = conn.info.transaction_status
+            if status != extensions.TRANSACTION_STATUS_IDLE:
+                # Never hand out a connection with a half-finished transaction
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    discard = True
+        if discard or conn.closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._in_use.pop(id(conn), None)
+            self._reported_leaks.discard(id(conn))
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self, timeout=None):
+        """Borrow a connection; it always goes back to the pool, rolled back on error."""
+        conn = self.getconn(timeout)
+        try:
+            yield conn
+        except psycopg2.Error:
+            # Broken connections get replaced instead of recycled
+            self.putconn(conn, discard=conn.closed != 0)
+            raise
+        except BaseException:
+            self.putconn(conn)
+            raise
+        else:
+            self.putconn(conn)
+
+    def _report_leaks_locked(self):
+        now = time.monotonic()
+        for key, (conn, since, stack) in self._in_use.items():
+            if now - since > self.leak_after and key not in self._reported_leaks:
+                self._reported_leaks.add(key)
+                self._stats["leaks_reported"] += 1
+                where = "Checked out at:\n" + "".join(stack) if stack else "Set DB_POOL_TRACK_STACKS=1 to see where."
+                print(f"⚠️ Connection checked out for {now - since:.0f}s, possible leak. {where}")
+
+    def find_leaks(self):
+        with self._cond:
+            self._report_leaks_locked()
+            return len(self._reported_leaks)
+
+    def watch_leaks(self, interval=30.0):
+        """Check for leaks every `interval` seconds in a background thread, so
+        one shows up before it has drained the pool. Once per process."""
+        with self._cond:
+            if self._watch_pid == os.getpid():
+                return
+            self._watch_pid = os.getpid()
+
+        def run():
+            while True:
+                time.sleep(interval)
+                self.find_leaks()
+
+        threading.Thread(target=run, daemon=True, name="db-pool-leaks").start()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": len(self._in_use),
+                "min": self.minconn,
+                "max": self.maxconn,
+            })
+            return stats
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+        for conn, _ in idle:
+            self._close_quietly(conn)
@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+import math
+import tempfile
+import time
+from datetime import datetime, timezone
+
+
+def read_rows(stream, fmt):
+    """Yield (row_number, dict) from a CSV (with a header row) or NDJSON byte stream.
+
+    NDJSON lines that aren't a JSON object come back as (row_number, None).
+    """
+    text = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    if fmt == "csv":
+        for number, row in enumerate(csv.DictReader(text), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+def validate_row(row, now):
+    """Normalize one row to staging columns, or raise ValueError saying what's wrong."""
+    if row is None:
+        raise ValueError("Not a valid row")
+    name = str(row.get("event_name") or "").strip()
+    if not name or len(name) > 50:
+        raise ValueError("event_name must be 1-50 characters")
+    try:
+        when = datetime.fromisoformat(str(row.get("event_time") or "").strip())
+    except ValueError:
+        raise ValueError("event_time must be an ISO 8601 timestamp")
+    # Times without a zone are taken as UTC rather than whatever the DB session uses
+    if not when.tzinfo:
+        when = when.replace(tzinfo=timezone.utc)
+    if when < now:
+        raise ValueError("event_time is in the past")
+    try:
+        lat, lng = float(row.get("lat")), float(row.get("lng"))
+    except (TypeError, ValueError):
+        raise ValueError("lat and lng must be numbers")
+    if not (math.isfinite(lat) and math.isfinite(lng) and -90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError("lat/lng out of range")
+    location = str(row.get("location") or "").strip()
+    if not location:
+        raise ValueError("location is required")
+    description = str(row.get("description") or "")
+    return name, when.isoformat(), location, lat, lng, description
+
+
+class StagedImport:
+    """Validated rows spooled as CSV, ready to COPY, plus the report so far.
+
+    Close it (or use it in a `with`) to drop the spool file.
+    """
+
+    def __init__(self, buffer, report, started, ready):
+        self.buffer = buffer
+        self.report = report
+        self.started = started
+        self.ready = ready  # some good rows, and no bad ones under strict
+
+    def close(self):
+        self.buffer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+
+class EventImporter:
+    """Bulk-loads a host's events in two steps. stage() reads and validates
+    the upload into a spool file without touching the database; merge() then
+    COPYs the good rows into a temp staging table and merges them into events
+    and rsvps with one statement each, so a connection is only held for the
+    SQL. The host's made_events is left to the made_events job, which the
+    caller queues with the imported ids.
+
+    Rows the host already has (same name and time) are skipped, so a schedule
+    can be re-imported safely. Nothing is committed here; the caller finishes
+    the transaction.
+    """
+
+    def __init__(self, max_rows=1000):
+        self.max_rows = max_rows
+
+    def stage(self, rows, strict=False):
+        """Validate `rows` (from read_rows) into a StagedImport."""
+        started = time.perf_counter()
+        now = datetime.now(timezone.utc)
+        errors = []
+        seen = set()
+        valid = 0
+
+        # Spills to disk past 4 MB, so memory stays flat however big the file is
+        buffer = tempfile.SpooledTemporaryFile(max_size=4 * 1024 * 1024, mode="w+", newline="")
+        try:
+            writer = csv.writer(buffer, lineterminator="\n")
+            for number, row in rows:
+                if number > self.max_rows:
+                    errors.append({"row": number, "error": f"More than {self.max_rows} rows, the rest were ignored"})
+                    break
+                try:
+                    values = validate_row(row, now)
+                except ValueError as e:
+                    errors.append({"row": number, "error": str(e)})
+                    continue
+                if (values[0], values[1]) in seen:
+                    errors.append({"row": number, "error": "Duplicate of an earlier row"})
+                    continue
+                seen.add((values[0], values[1]))
+                writer.writerow((number,) + values)
+                valid += 1
+        except BaseException:
+            buffer.close()
+            raise
+
+        report = {"rows": valid + len(errors), "errors": errors, "imported": [], "skipped": []}
+        ready = bool(valid) and not (strict and errors)
+        if not ready:
+            # Nothing will be merged, so the report is final
+            report["seconds"] = round(time.perf_counter() - started, 3)
+        buffer.seek(0)
+        return StagedImport(buffer, report, started, ready)
+
+    def merge(self, cur, host_email, staged):
+        """COPY and merge a ready StagedImport; fills in its report and returns
+        the imported rows (row_no, event_id, latitude, longitude)."""
+        report = staged.report
+        cur.execute("""
+            CREATE TEMP TABLE event_import (
+                row_no INTEGER PRIMARY KEY,
+                event_name TEXT NOT NULL,
+                event_time TIMESTAMPTZ NOT NULL,
+                location TEXT,
+                latitude DOUBLE PRECISION NOT NULL,
+                longitude DOUBLE PRECISION NOT NULL,
+                description TEXT,
+                event_uuid UUID NOT NULL DEFAULT gen_random_uuid(),
+                existing BOOLEAN NOT NULL DEFAULT false
+            ) ON COMMIT DROP
+        """)
+        cur.copy_expert("""
+            COPY event_import (row_no, event_name, event_time, location, latitude, longitude, description)
+            FROM STDIN WITH (FORMAT csv)
+        """, staged.buffer)
+
+        cur.execute("""
+            UPDATE event_import s SET existing = true
+            FROM events e
+            WHERE e.host_email = %s AND e.event_name = s.event_name AND e.event_time = s.event_time
+        """, (host_email,))
+        cur.execute("""
+            INSERT INTO events (event_uuid, event_name, event_time, location, latitude, longitude,
+                                host_email, description, rsvp_count)
+            SELECT event_uuid, event_name, event_time, location, latitude, longitude, %s, description, 1
+            FROM event_import WHERE NOT existing
+            ORDER BY row_no
+        """, (host_email,))
+        # Hosts are always going to their own events
+        cur.execute("""
+            INSERT INTO rsvps (user_email, event_id)
+            SELECT %s, event_uuid FROM event_import WHERE NOT existing
+            ON CONFLICT DO NOTHING
+        """, (host_email,))
+        cur.execute("""
+            SELECT row_no, event_uuid::text AS event_id, latitude, longitude, existing
+            FROM event_import ORDER BY row_no
+        """)
+        staged_rows = cur.fetchall()
+
+        imported = [row for row in staged_rows if not row["existing"]]
+        report["imported"] = [{"row": r["row_no"], "event_id": r["event_id"]} for r in imported]
+        report["skipped"] = [{"row": r["row_no"], "reason": "Already exists"} for r in staged_rows if r["existing"]]
+        seconds = time.perf_counter() - staged.started
+        report["seconds"] = round(seconds, 3)
+        report["rows_per_second"] = round(report["rows"] / seconds, 1) if seconds else None
+        return imported
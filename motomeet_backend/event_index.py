@@ -0,0 +1,186 @@
+import math
+import threading
+import time
+
+import numpy as np
+
+# Sphere radius PostGIS uses for geography distances with use_spheroid => false
+EARTH_RADIUS_M = 6371008.7714
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180
+
+
+class EventIndex:
+    """In-memory index of upcoming events, bucketed on a lat/lon grid.
+
+    `loader(event_id=None)` returns feed rows for every upcoming event (or just
+    one), each with `_lat`, `_lon` and `_epoch` columns. Reads work on an
+    immutable snapshot of NumPy arrays; writes rebuild it, which is fine since
+    events change far less often than the feed is read. `generation` goes up
+    on every change, so a page read after noting it is at least that new.
+    """
+
+    def __init__(self, loader, cell_degrees=1.0, refresh_interval=60.0):
+        self.loader = loader
+        self.cell_degrees = cell_degrees
+        self.refresh_interval = refresh_interval
+        self._rows = {}
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self._lock = threading.Lock()
+        self._loading = False
+        self._pending_counts = None  # RSVP counts set while a build is loading
+        self.generation = 0
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    def build(self):
+        """Load every upcoming event; blocks until done."""
+        with self._lock:
+            self._pending_counts = {}
+        try:
+            rows = {str(row["event_uuid"]): row for row in self.loader()}
+        except BaseException:
+            with self._lock:
+                self._pending_counts = None
+            raise
+        with self._lock:
+            # The load may have read a count from before an RSVP that landed meanwhile
+            for key, count in self._pending_counts.items():
+                if key in rows:
+                    rows[key]["rsvp_count"] = count
+            self._pending_counts = None
+            self._rows = rows
+            self._loaded_at = time.monotonic()
+            self._rebuild_locked()
+
+    def build_in_background(self):
+        with self._lock:
+            if self._loading:
+                return
+            self._loading = True
+
+        def run():
+            try:
+                self.build()
+            except Exception as e:
+                print(f"❌ Event index build failed: {e}")
+            finally:
+                with self._lock:
+                    self._loading = False
+
+        threading.Thread(target=run, daemon=True, name="event-index-build").start()
+
+    def _rebuild_locked(self):
+        now = time.time()
+        # Drop events that have started since the last rebuild
+        for key in [k for k, row in self._rows.items() if row["_epoch"] < now]:
+            del self._rows[key]
+
+        rows = sorted(self._rows.values(), key=lambda r: (r["_epoch"], str(r["event_uuid"])))
+        lat = np.radians(np.array([r["_lat"] for r in rows], dtype=np.float64))
+        lon = np.radians(np.array([r["_lon"] for r in rows], dtype=np.float64))
+        epoch = np.array([r["_epoch"] for r in rows], dtype=np.float64)
+
+        buckets = {}
+        for i, r in enumerate(rows):
+            buckets.setdefault(self._cell(r["_lat"], r["_lon"]), []).append(i)
+        buckets = {cell: np.array(idx, dtype=np.int64) for cell, idx in buckets.items()}
+
+        self._snapshot = (rows, lat, lon, epoch, buckets)
+        self.generation += 1
+
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_degrees), math.floor(lon / self.cell_degrees))
+
+    def _candidates(self, buckets, lat, lon, radius):
+        lat_span = radius / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 90.0)))
+        lon_span = 180.0 if cos_lat < 1e-6 else min(radius / (METERS_PER_DEGREE * cos_lat), 180.0)
+
+        lat_cells = range(math.floor((lat - lat_span) / self.cell_degrees),
+                          math.floor((lat + lat_span) / self.cell_degrees) + 1)
+        cells_around = math.ceil(360 / self.cell_degrees)
+        if lon_span >= 180.0:
+            lon_cells = range(math.floor(-180 / self.cell_degrees), math.floor(180 / self.cell_degrees) + 1)
+        else:
+            lon_cells = range(math.floor((lon - lon_span) / self.cell_degrees),
+                              math.floor((lon + lon_span) / self.cell_degrees) + 1)
+
+        found = []
+        seen = set()
+        for la in lat_cells:
+            for lo in lon_cells:
+                # Wrap across the antimeridian
+                lo = (lo + cells_around // 2) % cells_around - cells_around // 2
+                if (la, lo) in seen:
+                    continue
+                seen.add((la, lo))
+                idx = buckets.get((la, lo))
+                if idx is not None:
+                    found.append(idx)
+        if not found:
+            return np.empty(0, dtype=np.int64)
+        # Buckets hold indices into the time-sorted rows, so sorting keeps feed order
+        return np.sort(np.concatenate(found))
+
+    def nearby(self, lat, lon, radius, after=None, limit=None):
+        """Same rows, order and paging as the SQL feed query (minus the helper columns)."""
+        if self._loaded_at and time.monotonic() - self._loaded_at > self.refresh_interval:
+            self.build_in_background()
+        rows, lats, lons, epochs, buckets = self._snapshot
+        lat, lon, radius = float(lat), float(lon), float(radius)
+
+        idx = self._candidates(buckets, lat, lon, radius)
+        idx = idx[epochs[idx] >= time.time()]
+
+        # Vectorized haversine over the candidate set
+        lat0, lon0 = math.radians(lat), math.radians(lon)
+        dlat = lats[idx] - lat0
+        dlon = lons[idx] - lon0
+        a = np.sin(dlat / 2) ** 2 + math.cos(lat0) * np.cos(lats[idx]) * np.sin(dlon / 2) ** 2
+        dist = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+        keep = dist <= radius
+        idx, dist = idx[keep], dist[keep]
+
+        events = []
+        for i, d in zip(idx.tolist(), dist.tolist()):
+            row = rows[i]
+            if after is not None and (row["event_time"], str(row["event_uuid"])) <= after:
+                continue
+            event = {k: v for k, v in row.items() if not k.startswith("_")}
+            event["distance"] = d
+            events.append(event)
+            if limit is not None and len(events) >= limit:
+                break
+        return events
+
+    def refresh_event(self, event_id, rows=None):
+        """Reload one event after it was created or edited. Pass `rows` if they
+        were already loaded."""
+        if rows is None:
+            rows = self.loader(event_id)
+        with self._lock:
+            self._rows.pop(str(event_id), None)
+            for row in rows:
+                self._rows[str(row["event_uuid"])] = row
+            self._rebuild_locked()
+
+    def remove_event(self, event_id):
+        with self._lock:
+            if self._rows.pop(str(event_id), None) is not None:
+                self._rebuild_locked()
+
+    def set_rsvp_count(self, event_id, count):
+        # Rows are shared with the current snapshot, so this is visible immediately
+        with self._lock:
+            if self._pending_counts is not None:
+                self._pending_counts[str(event_id)] = count
+            row = self._rows.get(str(event_id))
+            if row is not None:
+                row["rsvp_count"] = count
+                self.generation += 1
+
+    def __len__(self):
+        return len(self._rows)
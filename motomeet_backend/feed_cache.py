@@ -0,0 +1,152 @@
+import hashlib
+import math
+import threading
+import time
+from collections import OrderedDict
+
+METERS_PER_DEGREE = 111195.0
+
+
+class FeedVersions:
+    """Data versions that cached feeds are validated against.
+
+    A scope is either one rider ("user:<email>") or a grid cell of events
+    ("cell:<lat>:<lon>"). Every write that could change a feed bumps the
+    scopes it touches to a fresh value from one sequence, so some scope's
+    version changes whenever anything in that feed might have. Compare the
+    whole set (stamp()), not the max: nextval order isn't commit order, so a
+    write can become visible with a lower version than one already seen.
+    """
+
+    def __init__(self, cell_degrees=1.0):
+        self.cell_degrees = cell_degrees
+
+    @staticmethod
+    def user(email):
+        return f"user:{email}"
+
+    def cell(self, lat, lon):
+        return f"cell:{math.floor(float(lat) / self.cell_degrees)}:{math.floor(float(lon) / self.cell_degrees)}"
+
+    def cells_within(self, lat, lon, radius):
+        """Every cell a feed centered on (lat, lon) with `radius` meters can reach."""
+        lat, lon = float(lat), float(lon)
+        lat_span = float(radius) / METERS_PER_DEGREE
+        cos_lat = math.cos(math.radians(min(abs(lat) + lat_span, 89.0)))
+        lon_span = min(float(radius) / (METERS_PER_DEGREE * cos_lat), 180.0)
+        d = self.cell_degrees
+        scopes = []
+        for la in range(math.floor((lat - lat_span) / d), math.floor((lat + lat_span) / d) + 1):
+            for lo in range(math.floor((lon - lon_span) / d), math.floor((lon + lon_span) / d) + 1):
+                # Wrap across the antimeridian the same way cell() would see it
+                wrapped = (lo * d + 180) % 360 - 180
+                scopes.append(f"cell:{la}:{math.floor(wrapped / d)}")
+        return sorted(set(scopes))
+
+    @staticmethod
+    def bump(cur, scopes):
+        """Bump `scopes` inside the caller's transaction. Do this last, after the
+        data writes, so row locks are always taken in the same order."""
+        scopes = sorted(set(scopes))
+        if not scopes:
+            return
+        cur.execute("""
+            INSERT INTO feed_versions (scope, version)
+            SELECT scope, nextval('feed_version_seq') FROM unnest(%s::text[]) AS scope
+            ON CONFLICT (scope) DO UPDATE SET version = EXCLUDED.version
+        """, (scopes,))
+
+    @classmethod
+    def current(cls, cur, scopes):
+        """stamp() of the scopes' versions as of now."""
+        return cls.stamp(cls.versions(cur, scopes))
+
+    @staticmethod
+    def versions(cur, scopes):
+        """{scope: version} for the scopes that have one."""
+        cur.execute("SELECT scope, version FROM feed_versions WHERE scope = ANY(%s)", (list(scopes),))
+        return {row["scope"]: row["version"] for row in cur.fetchall()}
+
+    @staticmethod
+    def stamp(versions):
+        """One value for a {scope: version} map that changes when any scope's version does."""
+        raw = ",".join(f"{scope}={version}" for scope, version in sorted(versions.items()))
+        return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+class CachedResponse:
+    __slots__ = ("scopes", "version", "etag", "body", "valid_until", "encoded")
+
+    def __init__(self, scopes, version, etag, body, valid_until):
+        self.scopes = scopes
+        self.version = version
+        self.etag = etag
+        self.body = body
+        self.valid_until = valid_until
+        self.encoded = {}  # content coding -> compressed body, filled on first use
+
+    def encode(self, encoding, compress):
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+class ResponseCache:
+    """Per-user rendered JSON responses, bounded by entry count and total bytes."""
+
+    def __init__(self, maxsize=2000, max_bytes=64 * 1024 * 1024):
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self._data = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "stale": 0, "misses": 0, "not_modified": 0}
+
+    def count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    @staticmethod
+    def make_etag(key, version, valid_until):
+        raw = f"{key!r}|{version}|{valid_until}".encode()
+        return hashlib.sha256(raw).hexdigest()[:32]
+
+    def get(self, key):
+        """The cached entry for `key` unless it has timed out (an event in it started)."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry.valid_until is not None and entry.valid_until <= time.time():
+                self._remove_locked(key)
+                return None
+            self._data.move_to_end(key)
+            return entry
+
+    def entry(self, key, scopes, version, body, valid_until=None):
+        """An entry to send without keeping it."""
+        return CachedResponse(scopes, version, self.make_etag(key, version, valid_until), body, valid_until)
+
+    def put(self, key, scopes, version, body, valid_until=None):
+        entry = self.entry(key, scopes, version, body, valid_until)
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            self._remove_locked(key)
+            self._data[key] = entry
+            self._bytes += len(body)
+            while len(self._data) > self.maxsize or self._bytes > self.max_bytes:
+                self._remove_locked(next(iter(self._data)))
+        return entry
+
+    def _remove_locked(self, key):
+        entry = self._data.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry.body)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update({"entries": len(self._data), "bytes": self._bytes})
+            return stats
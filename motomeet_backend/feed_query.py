@@ -0,0 +1,192 @@
+import base64
+import json
+from datetime import datetime, timedelta, timezone
+
+# Sort key -> (SQL inside the nearby query, SQL on its output rows as `ev`, type for cursor values)
+KEYS = {
+    "event_time": ("e.event_time", "ev.event_time", "timestamptz"),
+    "distance": ("ST_Distance(e.geom::geography, p.pt, false)", "ev.distance", "float8"),
+    "rsvp_count": ("e.rsvp_count", "ev.rsvp_count", "int"),
+    "hosted": ("(e.host_email = %(viewer)s)", "(ev.host_email = %(viewer)s)", "boolean"),
+    "event_uuid": ("e.event_uuid", "ev.event_uuid", "uuid"),
+}
+
+# Every sort ends on (event_time, event_uuid), so pages are stable and the default matches the old feed
+SORTS = {
+    "time": (),
+    "distance": (("distance", "ASC"),),
+    "popularity": (("rsvp_count", "DESC"),),
+    "least_popular": (("rsvp_count", "ASC"),),
+    "mine": (("hosted", "DESC"),),
+}
+TIEBREAK = (("event_time", "ASC"), ("event_uuid", "ASC"))
+
+MAX_TEXT = 100
+
+
+def _parse_time(value, name):
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"Invalid {name}")
+    # Dates without a zone are taken as UTC rather than whatever the DB session uses
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def _like_pattern(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+class FeedQuery:
+    """How a page of the nearby feed is sorted and filtered.
+
+    All of it runs in SQL: nearby_events_sql() asks for the extra WHERE terms,
+    ORDER BY and keyset condition and binds the params. Cursors carry the last
+    row's sort key plus its uuid, so every sort pages the same way the time
+    order always has. `viewer` is the rider asking, for the hosted-by-me sort.
+    """
+
+    def __init__(self, viewer=None, sort="time", starts_from=None, starts_before=None,
+                 max_distance=None, min_rsvps=None, text=None):
+        if sort not in SORTS:
+            raise ValueError(f"sort must be one of: {', '.join(SORTS)}")
+        self.viewer = viewer
+        self.sort = sort
+        self.starts_from = starts_from
+        self.starts_before = starts_before
+        self.max_distance = max_distance  # meters
+        self.min_rsvps = min_rsvps
+        self.text = text
+        self.keys = SORTS[sort] + TIEBREAK
+
+    @classmethod
+    def from_args(cls, args, viewer=None):
+        """Build one from query string args; raises ValueError with a message for the client."""
+        starts_from = _parse_time(args["from"], "from") if args.get("from") else None
+        starts_before = _parse_time(args["to"], "to") if args.get("to") else None
+        if starts_before is not None and len(args["to"]) == 10:
+            # A plain date includes that whole day
+            starts_before += timedelta(days=1)
+        max_distance = None
+        if args.get("max_distance"):
+            try:
+                miles = float(args["max_distance"])
+            except ValueError:
+                raise ValueError("Invalid max_distance")
+            if not miles > 0:
+                raise ValueError("Invalid max_distance")
+            max_distance = miles * 1609
+        min_rsvps = None
+        if args.get("min_rsvps"):
+            try:
+                min_rsvps = int(args["min_rsvps"])
+            except ValueError:
+                raise ValueError("Invalid min_rsvps")
+            if min_rsvps < 0:
+                raise ValueError("Invalid min_rsvps")
+        text = (args.get("q") or "").strip()[:MAX_TEXT] or None
+        return cls(viewer, args.get("sort") or "time", starts_from, starts_before, max_distance, min_rsvps, text)
+
+    @property
+    def filtered(self):
+        return any(v is not None for v in (self.starts_from, self.starts_before, self.max_distance,
+                                           self.min_rsvps, self.text))
+
+    @property
+    def is_default(self):
+        """Plain time order with no filters: what the event index can serve."""
+        return self.sort == "time" and not self.filtered
+
+    @property
+    def variant(self):
+        """Short name for this shape of query, for prepared statement names."""
+        flags = "".join(flag for flag, value in (
+            ("f", self.starts_from), ("b", self.starts_before), ("d", self.max_distance),
+            ("r", self.min_rsvps), ("q", self.text),
+        ) if value is not None)
+        return f"{self.sort}_{flags}" if flags else self.sort
+
+    def cache_key(self):
+        return (self.sort, self.starts_from, self.starts_before, self.max_distance, self.min_rsvps, self.text)
+
+    def radius_sql(self, radius, params):
+        if self.max_distance is None:
+            return radius
+        params["max_distance"] = self.max_distance
+        return f"LEAST({radius}, %(max_distance)s::float8)"
+
+    def filters_sql(self, params):
+        terms = []
+        if self.starts_from is not None:
+            terms.append("AND e.event_time >= %(starts_from)s::timestamptz")
+            params["starts_from"] = self.starts_from
+        if self.starts_before is not None:
+            terms.append("AND e.event_time < %(starts_before)s::timestamptz")
+            params["starts_before"] = self.starts_before
+        if self.min_rsvps is not None:
+            terms.append("AND e.rsvp_count >= %(min_rsvps)s::int")
+            params["min_rsvps"] = self.min_rsvps
+        if self.text is not None:
+            # Same expression as events_text_trgm_idx, so the trigram index can answer it
+            terms.append("AND (e.event_name || ' ' || COALESCE(e.description, '')) ILIKE %(text)s")
+            params["text"] = _like_pattern(self.text)
+        if self.sort == "mine":
+            params["viewer"] = self.viewer
+        return "\n        ".join(terms)
+
+    def order_sql(self, outer=False):
+        column = 1 if outer else 0
+        return "ORDER BY " + ", ".join(f"{KEYS[key][column]} {direction}" for key, direction in self.keys)
+
+    def keyset_sql(self, after, params):
+        """WHERE term for rows after cursor position `after` (from decode_cursor)."""
+        names = []
+        for i, (key, _) in enumerate(self.keys):
+            params[f"after_{i}"] = after[i]
+            names.append(f"%(after_{i})s::{KEYS[key][2]}")
+        if all(direction == "ASC" for _, direction in self.keys):
+            # One row comparison, which events_time_uuid_idx can range-scan for the time order
+            columns = ", ".join(KEYS[key][0] for key, _ in self.keys)
+            return f"AND ({columns}) > ({', '.join(names)})"
+        # Mixed directions: after on the first key that differs
+        terms = []
+        for i, (key, direction) in enumerate(self.keys):
+            equal = [f"{KEYS[k][0]} = {names[j]}" for j, (k, _) in enumerate(self.keys[:i])]
+            op = ">" if direction == "ASC" else "<"
+            terms.append("(" + " AND ".join(equal + [f"{KEYS[key][0]} {op} {names[i]}"]) + ")")
+        return "AND (" + " OR ".join(terms) + ")"
+
+    def _key_value(self, event, key):
+        if key == "hosted":
+            return event["host_email"] == self.viewer
+        if key == "event_time":
+            return event["event_time"].isoformat()
+        if key == "event_uuid":
+            return str(event["event_uuid"])
+        return event[key]
+
+    def encode_cursor(self, event):
+        """Opaque keyset cursor pointing just after `event`."""
+        raw = json.dumps({"s": self.sort, "k": [self._key_value(event, key) for key, _ in self.keys]})
+        return base64.urlsafe_b64encode(raw.encode()).decode()
+
+    def decode_cursor(self, cursor):
+        """Sort key values from a cursor made by this sort, or raise ValueError."""
+        try:
+            raw = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if "k" not in raw:
+                # Cursors from before sorting existed: {"t": event_time, "id": event_uuid}
+                raw = {"s": "time", "k": [raw["t"], raw["id"]]}
+            if raw["s"] != self.sort or len(raw["k"]) != len(self.keys):
+                raise ValueError
+            values = []
+            for (key, _), value in zip(self.keys, raw["k"]):
+                if key == "event_time":
+                    value = datetime.fromisoformat(value)
+                elif key == "event_uuid":
+                    value = str(value)
+                values.append(value)
+            return tuple(values)
+        except Exception:
+            raise ValueError("Invalid cursor")
@@ -0,0 +1,158 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class GeocodeError(Exception):
+    """The geocoding upstream answered with an error (not just "no results")."""
+
+
+class LRUCache:
+    """Small thread-safe LRU with a per-entry TTL."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, stale=False):
+        """The value for `key`, or None once it has expired. Expired entries stay
+        until evicted, so `stale=True` can still hand them out when upstream is down."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic() and not stale:
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def __len__(self):
+        return len(self._data)
+
+
+_NOT_FOUND = object()
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_address(address):
+    """'  San Jose, CA ' and 'san jose ca' share one cache entry."""
+    address = _PUNCTUATION.sub(" ", address.lower())
+    return _SPACES.sub(" ", address).strip()
+
+
+class GeocodeCache:
+    """In-process LRU in front of the `geocode_cache` table in front of Google.
+
+    `fetch(address)` does the upstream call and returns (lat, lng), or None
+    when the address has no results. If it raises, an expired entry from
+    memory or the table is served instead when there is one.
+    """
+
+    def __init__(self, fetch, pool, maxsize=2048, ttl=6 * 3600,
+                 db_ttl_days=30, not_found_ttl=600):
+        self.fetch = fetch
+        self.pool = pool
+        self.memory = LRUCache(maxsize, ttl)
+        self.db_ttl_days = db_ttl_days
+        self.not_found_ttl = not_found_ttl
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "not_found": 0, "db_errors": 0, "stale": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def _load(self, key, stale=False):
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        SELECT lat, lng FROM geocode_cache
+                        WHERE address_key = %s
+                        AND (%s OR created_at > NOW() - make_interval(days => %s))
+                    """, (key, stale, self.db_ttl_days))
+                    row = cur.fetchone()
+                conn.commit()
+        except Exception as e:
+            # The cache is an optimization, fall through to Google
+            print(f"❌ Geocode cache read error: {e}")
+            self._count("db_errors")
+            return None
+        if row is None:
+            return None
+        return (row["lat"], row["lng"])
+
+    def _store(self, key, location):
+        try:
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("""
+                        INSERT INTO geocode_cache (address_key, lat, lng)
+                        VALUES (%s, %s, %s)
+                        ON CONFLICT (address_key)
+                        DO UPDATE SET lat = EXCLUDED.lat, lng = EXCLUDED.lng, created_at = NOW()
+                    """, (key, location[0], location[1]))
+                conn.commit()
+        except Exception as e:
+            print(f"❌ Geocode cache write error: {e}")
+            self._count("db_errors")
+
+    def lookup(self, address):
+        """Return (lat, lng) for `address`, or None if Google has no match."""
+        key = normalize_address(address)
+        if not key:
+            return None
+
+        cached = self.memory.get(key)
+        if cached is not None:
+            self._count("memory_hits")
+            return None if cached is _NOT_FOUND else cached
+
+        location = self._load(key)
+        if location is not None:
+            self._count("db_hits")
+            self.memory.set(key, location)
+            return location
+
+        self._count("misses")
+        try:
+            location = self.fetch(address)
+        except Exception:
+            location = self.memory.get(key, stale=True)
+            if location is None or location is _NOT_FOUND:
+                location = self._load(key, stale=True)
+            if location is None:
+                raise
+            self._count("stale")
+            return location
+        if location is None:
+            self._count("not_found")
+            self.memory.set(key, _NOT_FOUND, ttl=self.not_found_ttl)
+            return None
+        location = (float(location[0]), float(location[1]))
+        self.memory.set(key, location)
+        self._store(key, location)
+        return location
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+        stats["memory_size"] = len(self.memory)
+        return stats
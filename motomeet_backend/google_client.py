@@ -0,0 +1,138 @@
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import Metrics
+
+# Worth another try; anything else in 4xx is our fault and won't change
+_RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstreamUnavailable(Exception):
+    """Google is failing or the circuit is open; the caller should serve a cached answer or 503."""
+
+
+class CircuitBreaker:
+    """Opens after `threshold` consecutive failures and fails fast for `reset_after`
+    seconds. Then one trial call is let through: success closes it again,
+    failure re-opens it."""
+
+    def __init__(self, threshold=5, reset_after=30.0):
+        self.threshold = threshold
+        self.reset_after = reset_after
+        self._failures = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at >= self.reset_after:
+                return "half_open"
+            return "open"
+
+    def allow(self):
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_after or self._trial:
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class GoogleClient:
+    """One keep-alive session for every call to Google's APIs.
+
+    Each API (a short name like "geocode") gets its own timeout and circuit
+    breaker. Connection errors, timeouts, 429 and 5xx are retried up to
+    `retries` times with full-jitter backoff; once they're used up, or while
+    the breaker is open, calls raise UpstreamUnavailable.
+    """
+
+    def __init__(self, metrics=None, pool_size=20, retries=2, backoff=0.1,
+                 breaker_threshold=5, breaker_reset=30.0, timeouts=None):
+        self.metrics = metrics or Metrics(enabled=False)
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker_threshold = breaker_threshold
+        self.breaker_reset = breaker_reset
+        self.timeouts = dict(timeouts or {})
+        self.breakers = {}
+        self._lock = threading.Lock()
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def breaker(self, api):
+        with self._lock:
+            breaker = self.breakers.get(api)
+            if breaker is None:
+                breaker = self.breakers[api] = CircuitBreaker(self.breaker_threshold, self.breaker_reset)
+            return breaker
+
+    def request(self, api, method, url, **kwargs):
+        """Send one request, retrying transient failures. Returns the final response,
+        which may still be a 4xx."""
+        breaker = self.breaker(api)
+        if not breaker.allow():
+            self.metrics.inc("google_api_rejected_total", api=api)
+            raise UpstreamUnavailable(f"{api}: circuit open")
+        kwargs.setdefault("timeout", self.timeouts.get(api, (3.05, 10)))
+
+        try:
+            for attempt in range(self.retries + 1):
+                if attempt:
+                    self.metrics.inc("google_api_retries_total", api=api)
+                    time.sleep(random.uniform(0, self.backoff * 2 ** attempt))
+                try:
+                    with self.metrics.span("google_api_seconds", api=api):
+                        response = self.session.request(method, url, **kwargs)
+                except requests.RequestException as e:
+                    self.metrics.inc("google_api_errors_total", api=api, reason=type(e).__name__)
+                    error = e
+                    continue
+                if response.status_code in _RETRY_STATUSES:
+                    self.metrics.inc("google_api_errors_total", api=api, reason=str(response.status_code))
+                    error = f"status {response.status_code}"
+                    continue
+                breaker.success()
+                return response
+        except BaseException:
+            breaker.failure()
+            raise
+
+        breaker.failure()
+        raise UpstreamUnavailable(f"{api}: {error}")
+
+    def get(self, api, url, **kwargs):
+        return self.request(api, "GET", url, **kwargs)
+
+    def post(self, api, url, **kwargs):
+        return self.request(api, "POST", url, **kwargs)
+
+    def breaker_states(self):
+        with self._lock:
+            breakers = dict(self.breakers)
+        return {api: breaker.state for api, breaker in breakers.items()}
@@ -0,0 +1,59 @@
+# Production server: gunicorn -c gunicorn.conf.py "motomeet:create_app()"
+#
+# Under gthread the app is imported once in the master (preload_app) and
+# forked, so workers share the imported code. Nothing opens a connection at
+# import time; each worker warms its own DB pool, event index and live-update
+# listener in post_worker_init. /metrics is per worker, so scrape with that in
+# mind; it answers only with METRICS_TOKEN set (send it as a Bearer token).
+import multiprocessing
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+
+# "gthread" (default) or "gevent". SSE clients (/api/live) and feed streams
+# each hold a thread for as long as they're connected, so with gthread live
+# streams are capped at GUNICORN_THREADS - 2 per worker (LIVE_MAX_CLIENTS
+# overrides it) and normal requests always have threads left. gevent makes
+# streams cheap.
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+workers = int(os.getenv("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv("GUNICORN_THREADS", 8))
+worker_connections = int(os.getenv("GUNICORN_WORKER_CONNECTIONS", 1000))
+# gevent patches threading when the worker starts. The pool's Condition, the
+# caches' locks and the hasher's semaphore are made at import, so the app has
+# to be imported after that, in the worker, or a pool wait blocks every greenlet.
+preload_app = worker_class != "gevent"
+
+# Every worker has its own bcrypt process pool; split the cores between them
+os.environ.setdefault("BCRYPT_WORKERS", str(max(multiprocessing.cpu_count() // workers, 1)))
+
+if worker_class == "gthread":
+    # Leave threads for normal requests; /api/live answers 503 past this many streams
+    os.environ.setdefault("LIVE_MAX_CLIENTS", str(max(threads - 2, 1)))
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+# Recycle workers now and then so a slow leak can't grow forever
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 5000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 500))
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+
+
+def post_worker_init(worker):
+    # Runs after the worker has loaded the app (and, under gevent, patched the stdlib)
+    if worker_class == "gevent":
+        # Make psycopg2 yield to other greenlets while it waits on Postgres
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    import motomeet
+    motomeet.warm_worker()
+    worker.log.info("Worker %s warmed", worker.pid)
+
+
+def worker_exit(server, worker):
+    import motomeet
+    motomeet.shutdown_worker()
@@ -0,0 +1,183 @@
+import select
+import threading
+import time
+
+from psycopg2.extras import Json
+
+CHANNEL = "jobs"
+
+
+class JobQueue:
+    """Postgres-backed job queue.
+
+    Handlers enqueue inside their own transaction, so a job exists exactly when
+    the write that caused it committed. Workers claim a batch with
+    FOR UPDATE SKIP LOCKED and take a lease on it (`locked_until`) instead of
+    holding the transaction open while the job runs; a worker that dies just
+    lets the lease run out. Failed jobs are retried with exponential backoff
+    until `max_attempts`, then left in the table with their last error.
+    Handlers must be idempotent, since a job can run more than once.
+
+    Periodic tasks registered with periodic() run on whichever worker gets to
+    them first; an advisory lock keeps two workers from running the same one
+    at once.
+    """
+
+    def __init__(self, pool, lease_seconds=300, backoff_seconds=30, keep_days=7, metrics=None):
+        self.pool = pool
+        self.lease_seconds = lease_seconds
+        self.backoff_seconds = backoff_seconds
+        self.keep_days = keep_days
+        self.metrics = metrics
+        self.handlers = {}
+        self._periodic = [["purge_jobs", 3600, self.purge, 0.0]]
+
+    def handler(self, kind):
+        """Register `fn(payload, job)` as the handler for jobs of `kind`."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    def periodic(self, name, interval):
+        """Register `fn()` to run every `interval` seconds while a worker is up."""
+        def register(fn):
+            self._periodic.append([name, interval, fn, 0.0])
+            return fn
+        return register
+
+    def _run_periodic(self):
+        for task in self._periodic:
+            name, interval, fn, last_run = task
+            if time.monotonic() - last_run < interval:
+                continue
+            task[3] = time.monotonic()
+            with self.pool.connection() as conn:
+                with conn.cursor() as cur:
+                    cur.execute("SELECT pg_try_advisory_lock(hashtext(%s)) AS locked", (name,))
+                    locked = cur.fetchone()["locked"]
+                conn.commit()
+                if not locked:
+                    continue
+                try:
+                    fn()
+                except Exception as e:
+                    print(f"❌ Periodic task {name} failed: {e}")
+                finally:
+                    with conn.cursor() as cur:
+                        cur.execute("SELECT pg_advisory_unlock(hashtext(%s))", (name,))
+                    conn.commit()
+
+    @staticmethod
+    def enqueue(cur, kind, payload, delay=0, max_attempts=5):
+        """Add a job inside the caller's transaction; workers are woken on commit."""
+        cur.execute("""
+            INSERT INTO jobs (kind, payload, run_at, max_attempts)
+            VALUES (%s, %s, NOW() + make_interval(secs => %s), %s)
+        """, (kind, Json(payload), delay, max_attempts))
+        cur.execute("SELECT pg_notify(%s, '')", (CHANNEL,))
+
+    def _claim(self, batch):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE jobs
+                    SET attempts = attempts + 1, locked_until = NOW() + make_interval(secs => %s)
+                    WHERE id IN (
+                        SELECT id FROM jobs
+                        WHERE done_at IS NULL
+                        AND run_at <= NOW()
+                        AND attempts < max_attempts
+                        AND (locked_until IS NULL OR locked_until < NOW())
+                        ORDER BY run_at
+                        LIMIT %s
+                        FOR UPDATE SKIP LOCKED
+                    )
+                    RETURNING id, kind, payload, attempts, max_attempts
+                """, (self.lease_seconds, batch))
+                jobs = cur.fetchall()
+            conn.commit()
+        return jobs
+
+    def _finish(self, job, error=None):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                if error is None:
+                    cur.execute("UPDATE jobs SET done_at = NOW(), locked_until = NULL WHERE id = %s", (job["id"],))
+                else:
+                    delay = self.backoff_seconds * 2 ** (job["attempts"] - 1)
+                    cur.execute("""
+                        UPDATE jobs
+                        SET locked_until = NULL, last_error = %s,
+                            run_at = NOW() + make_interval(secs => %s)
+                        WHERE id = %s
+                    """, (error[:2000], delay, job["id"]))
+            conn.commit()
+
+    def _count(self, kind, outcome):
+        if self.metrics is not None:
+            self.metrics.inc("jobs_total", kind=kind, outcome=outcome)
+
+    def run_once(self, batch=10):
+        """Claim and run up to `batch` due jobs. Returns how many were claimed."""
+        jobs = self._claim(batch)
+        for job in jobs:
+            fn = self.handlers.get(job["kind"])
+            if fn is None:
+                self._finish(job, f"No handler for {job['kind']!r}")
+                self._count(job["kind"], "unknown")
+                continue
+            try:
+                fn(job["payload"], job)
+            except Exception as e:
+                print(f"❌ Job {job['id']} ({job['kind']}) failed, attempt {job['attempts']}/{job['max_attempts']}: {e}")
+                self._finish(job, f"{type(e).__name__}: {e}")
+                self._count(job["kind"], "failed" if job["attempts"] >= job["max_attempts"] else "retry")
+            else:
+                self._finish(job)
+                self._count(job["kind"], "done")
+        return len(jobs)
+
+    def run_forever(self, connect, batch=10, poll_interval=5.0, stop=None):
+        """Work the queue until `stop` is set. A LISTEN connection from `connect()`
+        wakes the worker as soon as a job is enqueued; `poll_interval` picks up
+        retries and anything whose notification was missed."""
+        stop = stop or threading.Event()
+        listener = connect()
+        listener.autocommit = True
+        with listener.cursor() as cur:
+            cur.execute(f"LISTEN {CHANNEL}")
+        try:
+            while not stop.is_set():
+                self._run_periodic()
+                if self.run_once(batch) >= batch:
+                    continue
+                if select.select([listener], [], [], poll_interval) != ([], [], []):
+                    listener.poll()
+                    listener.notifies.clear()
+        finally:
+            listener.close()
+
+    def purge(self):
+        """Drop finished jobs older than `keep_days`; failed ones stay for inspection."""
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("DELETE FROM jobs WHERE done_at < NOW() - make_interval(days => %s)", (self.keep_days,))
+            conn.commit()
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT
+                        COUNT(*) FILTER (WHERE attempts < max_attempts) AS pending,
+                        COUNT(*) FILTER (WHERE attempts >= max_attempts) AS dead,
+                        COALESCE(EXTRACT(EPOCH FROM NOW() - MIN(run_at) FILTER (
+                            WHERE attempts < max_attempts AND run_at <= NOW()
+                        )), 0) AS oldest_due_seconds
+                    FROM jobs
+                    WHERE done_at IS NULL
+                """)
+                row = cur.fetchone()
+            conn.commit()
+        return {k: float(v) for k, v in row.items()}
@@ -0,0 +1,93 @@
+import datetime
+import gzip
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional, the stdlib encoder is used instead
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # optional, gzip only
+    brotli = None
+
+# Floats the stdlib writes in exponent form (abs < 1e-4 or >= 1e16) come out
+# differently from orjson: as "0.0000..." or with an exponent. False positives
+# only cost a fallback.
+_TINY_FLOAT = b"0.0000"
+_EXPONENT = re.compile(rb"e-?[0-9]+[,}\]]")
+
+_DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+_MONTHS = ("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec")
+
+
+def _http_datetime(d):
+    # werkzeug.http.http_date without the email.utils round trip; every feed row has one
+    if d.tzinfo is not None:
+        d = d.astimezone(datetime.timezone.utc)
+    return (f"{_DAYS[d.weekday()]}, {d.day:02d} {_MONTHS[d.month - 1]} {d.year:04d} "
+            f"{d.hour:02d}:{d.minute:02d}:{d.second:02d} GMT")
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask's default JSON output, produced by orjson when it's installed.
+
+    The bytes match DefaultJSONProvider in compact mode (sorted keys, ASCII
+    only, RFC 822 dates, Decimal as a string). Anything orjson would write
+    differently - non-ASCII text, exponent floats, non-string keys - goes
+    through the stdlib encoder instead. The exception is NaN and Infinity:
+    orjson writes null where the stdlib writes NaN/Infinity, which isn't JSON
+    and which the browser's JSON.parse rejects.
+    """
+
+    @staticmethod
+    def default(o):
+        if type(o) is datetime.datetime:
+            return _http_datetime(o)
+        return DefaultJSONProvider.default(o)
+
+    def _fast_dumps(self, obj):
+        if orjson is None or not self.sort_keys or not self.ensure_ascii:
+            return None
+        try:
+            out = orjson.dumps(
+                obj,
+                default=self.default,
+                option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS,
+            )
+        except TypeError:
+            return None
+        if not out.isascii() or _TINY_FLOAT in out or _EXPONENT.search(out):
+            return None
+        return out
+
+    def encode(self, obj):
+        """Compact JSON as bytes, the same as a jsonify body minus the trailing newline."""
+        out = self._fast_dumps(obj)
+        if out is None:
+            out = self.dumps(obj, separators=(",", ":")).encode()
+        return out
+
+    def response(self, *args, **kwargs):
+        if self.compact is False or (self.compact is None and self._app.debug):
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.encode(obj) + b"\n", mimetype=self.mimetype)
+
+
+def pick_encoding(accept_encodings):
+    """The best content coding we can produce for werkzeug's parsed Accept-Encoding, or None."""
+    if brotli is not None and accept_encodings["br"]:
+        return "br"
+    if accept_encodings["gzip"]:
+        return "gzip"
+    return None
+
+
+def compress(body, encoding):
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=5)
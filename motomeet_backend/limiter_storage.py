@@ -0,0 +1,219 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from math import floor
+from urllib.parse import parse_qs, urlparse
+
+from limits.storage import Storage
+from limits.storage.base import SlidingWindowCounterSupport, TimestampedSlidingWindow
+
+_MAGIC = b"MMRL0001"
+_HEADER = struct.Struct("<8sQ")   # magic, slot count
+_SLOT = struct.Struct("<Qdq")     # key hash (0 = never used), expires at (epoch seconds), count
+_VALUE = struct.Struct("<dq")     # the slot minus its hash
+MAX_PROBE = 32
+
+
+def _hash(key):
+    # Stable across processes, unlike hash()
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+
+
+class SharedMemoryStorage(Storage, SlidingWindowCounterSupport, TimestampedSlidingWindow):
+    """Rate limit counters in a memory-mapped file shared by every worker on the host.
+
+    Use with `shm://` (a file in /dev/shm) or `shm:///path/to/file`; add
+    `?slots=N` to size a new file. Counters live in a fixed hash table of
+    slots, so nothing needs cleaning up: expired slots are reused, and if a
+    key's neighbourhood is full the counter closest to expiring is dropped.
+    Every operation holds a threading lock plus flock on the file for a few
+    microseconds, which keeps counts exact across processes and threads.
+    Supports the fixed-window and sliding-window-counter strategies.
+    """
+
+    STORAGE_SCHEME = ["shm"]
+
+    def __init__(self, uri, wrap_exceptions=False, slots=262144, **options):
+        parsed = urlparse(uri)
+        default_dir = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+        self.path = parsed.path or os.path.join(default_dir, "motomeet-ratelimit")
+        self.slots = int(parse_qs(parsed.query).get("slots", [slots])[0])
+        self._lock = threading.Lock()
+        self._pid = None
+        self._fd = None
+        self._map = None
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+    @property
+    def base_exceptions(self):
+        return (OSError, ValueError)
+
+    def _open(self):
+        # A forked worker opens its own descriptor; flock on an inherited one wouldn't exclude the parent
+        if self._pid == os.getpid():
+            return
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        try:
+            slots = self.slots
+            header = os.pread(fd, _HEADER.size, 0)
+            if len(header) == _HEADER.size:
+                magic, existing = _HEADER.unpack(header)
+                if magic == _MAGIC and os.fstat(fd).st_size == _HEADER.size + existing * _SLOT.size:
+                    # Workers already using the file decide its size
+                    slots = existing
+                    header = None
+            if header is not None:
+                os.ftruncate(fd, 0)
+                os.ftruncate(fd, _HEADER.size + slots * _SLOT.size)
+                os.pwrite(fd, _HEADER.pack(_MAGIC, slots), 0)
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        self._map = mmap.mmap(fd, _HEADER.size + slots * _SLOT.size)
+        self._fd = fd
+        self.slots = slots
+        self._pid = os.getpid()
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield self._map
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _find(self, buf, key, now, create=False):
+        """Offset of `key`'s slot, or None. With create=True a slot is always returned."""
+        key_hash = _hash(key)
+        home = key_hash % self.slots
+        free = oldest = None
+        oldest_expiry = float("inf")
+        for i in range(MAX_PROBE):
+            offset = _HEADER.size + (home + i) % self.slots * _SLOT.size
+            slot_hash, expires, _ = _SLOT.unpack_from(buf, offset)
+            if slot_hash == key_hash:
+                return offset
+            if slot_hash == 0:
+                if free is None:
+                    free = offset
+                break
+            if expires <= now and free is None:
+                free = offset
+            if expires < oldest_expiry:
+                oldest, oldest_expiry = offset, expires
+        if not create:
+            return None
+        if free is None:
+            free = oldest
+        _SLOT.pack_into(buf, free, key_hash, 0.0, 0)
+        return free
+
+    def _get(self, buf, key, now):
+        """(count, expires at) for a live key, else (0, None)."""
+        offset = self._find(buf, key, now)
+        if offset is None:
+            return 0, None
+        expires, count = _VALUE.unpack_from(buf, offset + 8)
+        if expires <= now:
+            return 0, None
+        return count, expires
+
+    def _add(self, buf, key, expiry, amount, now, elastic_expiry=False):
+        offset = self._find(buf, key, now, create=True)
+        expires, count = _VALUE.unpack_from(buf, offset + 8)
+        if expires <= now:
+            count, expires = 0, now + expiry
+        count += amount
+        if elastic_expiry:
+            expires = now + expiry
+        _VALUE.pack_into(buf, offset + 8, expires, count)
+        return count
+
+    def _clear(self, buf, key, now):
+        offset = self._find(buf, key, now)
+        if offset is not None:
+            # Keep the hash so the probe chain through this slot stays intact
+            _VALUE.pack_into(buf, offset + 8, 0.0, 0)
+
+    def incr(self, key, expiry, elastic_expiry=False, amount=1):
+        with self._locked() as buf:
+            return self._add(buf, key, expiry, amount, time.time(), elastic_expiry)
+
+    def decr(self, key, amount=1):
+        with self._locked() as buf:
+            now = time.time()
+            count, expires = self._get(buf, key, now)
+            if expires is None:
+                return 0
+            count = max(count - amount, 0)
+            _VALUE.pack_into(buf, self._find(buf, key, now) + 8, expires, count)
+            return count
+
+    def get(self, key):
+        with self._locked() as buf:
+            return self._get(buf, key, time.time())[0]
+
+    def get_expiry(self, key):
+        with self._locked() as buf:
+            now = time.time()
+            return self._get(buf, key, now)[1] or now
+
+    def check(self):
+        try:
+            with self._locked():
+                return True
+        except OSError:
+            return False
+
+    def reset(self):
+        with self._locked() as buf:
+            now = time.time()
+            live = 0
+            for i in range(self.slots):
+                slot_hash, expires, _ = _SLOT.unpack_from(buf, _HEADER.size + i * _SLOT.size)
+                if slot_hash and expires > now:
+                    live += 1
+            buf[_HEADER.size:] = bytes(self.slots * _SLOT.size)
+            return live
+
+    def clear(self, key):
+        with self._locked() as buf:
+            self._clear(buf, key, time.time())
+
+    def _window(self, buf, key, expiry, now):
+        previous_key, current_key = self.sliding_window_keys(key, expiry, now)
+        previous_count = self._get(buf, previous_key, now)[0]
+        current_count = self._get(buf, current_key, now)[0]
+        previous_ttl = (1 - (((now - expiry) / expiry) % 1)) * expiry if previous_count else 0.0
+        current_ttl = (1 - ((now / expiry) % 1)) * expiry + expiry
+        return previous_count, previous_ttl, current_count, current_ttl
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        with self._locked() as buf:
+            now = time.time()
+            previous_count, previous_ttl, current_count, _ = self._window(buf, key, expiry, now)
+            if floor(previous_count * previous_ttl / expiry + current_count) + amount > limit:
+                return False
+            # The current window's counter is read as the previous one for another full window
+            self._add(buf, self.sliding_window_keys(key, expiry, now)[1], 2 * expiry, amount, now)
+            return True
+
+    def get_sliding_window(self, key, expiry):
+        with self._locked() as buf:
+            return self._window(buf, key, expiry, time.time())
+
+    def clear_sliding_window(self, key, expiry):
+        with self._locked() as buf:
+            now = time.time()
+            for window_key in self.sliding_window_keys(key, expiry, now):
+                self._clear(buf, window_key, now)
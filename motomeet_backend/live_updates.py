@@ -0,0 +1,136 @@
+import json
+import os
+import queue
+import select
+import threading
+import time
+
+CHANNEL = "event_changes"
+
+
+class Subscriber:
+    """One SSE client: the feed cells it can see and the events it's going to."""
+
+    def __init__(self, email, cells, event_ids, maxsize=100):
+        self.email = email
+        self.cells = set(cells)
+        self.event_ids = set(event_ids)
+        self.queue = queue.Queue(maxsize)
+        self.overflowed = False
+
+    def wants(self, message):
+        if message.get("type") == "resync" or message.get("event_id") in self.event_ids:
+            return True
+        return any(cell in self.cells for cell in message.get("cells", ()))
+
+    def offer(self, message):
+        if message.get("type") == "rsvp" and message.get("email") == self.email:
+            # Keep following events this rider just RSVP'd to, wherever they are
+            if message.get("going"):
+                self.event_ids.add(message["event_id"])
+            else:
+                self.event_ids.discard(message["event_id"])
+        if self.overflowed or not self.wants(message):
+            return
+        try:
+            self.queue.put_nowait(message)
+        except queue.Full:
+            # Too slow to keep up; the stream tells the client to refetch and ends
+            self.overflowed = True
+
+
+class LiveHub:
+    """Fans event changes out to SSE subscribers.
+
+    Writers call publish() inside their transaction, so Postgres delivers the
+    NOTIFY only if the write commits. Each worker process runs one listener
+    thread on its own connection and hands every message to the subscribers
+    that care about it, however many there are. `resolve(message)` runs once
+    per message on the listener thread before fan-out (to attach the event
+    row, update local caches and so on), including the `resync` sent after a
+    reconnect.
+    """
+
+    def __init__(self, connect, resolve=None, max_queue=100, reconnect_delay=2.0):
+        self.connect = connect
+        self.resolve = resolve
+        self.max_queue = max_queue
+        self.reconnect_delay = reconnect_delay
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    @staticmethod
+    def publish(cur, message):
+        cur.execute("SELECT pg_notify(%s, %s)", (CHANNEL, json.dumps(message)))
+
+    def start(self):
+        """Start this process's listener thread if it isn't running yet."""
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, daemon=True, name="live-updates").start()
+
+    def subscribe(self, email, cells, event_ids):
+        self.start()
+        sub = Subscriber(email, cells, event_ids, self.max_queue)
+        with self._lock:
+            self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subscribers.discard(sub)
+
+    def __len__(self):
+        return len(self._subscribers)
+
+    def _broadcast(self, message):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for sub in subscribers:
+            sub.offer(message)
+
+    def _run(self):
+        while True:
+            conn = None
+            listening = False
+            try:
+                conn = self.connect()
+                conn.autocommit = True
+                with conn.cursor() as cur:
+                    cur.execute(f"LISTEN {CHANNEL}")
+                listening = True
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            message = json.loads(notify.payload)
+                            if self.resolve is not None:
+                                message = self.resolve(message)
+                        except Exception as e:
+                            print(f"❌ Live update dropped: {e}")
+                            continue
+                        self._broadcast(message)
+            except Exception as e:
+                print(f"❌ Live update listener lost its connection: {e}")
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            if listening:
+                # Anything published while we were away is lost; have clients (and resolve) catch up
+                message = {"type": "resync"}
+                if self.resolve is not None:
+                    try:
+                        message = self.resolve(message)
+                    except Exception as e:
+                        print(f"❌ Live update resync failed: {e}")
+                self._broadcast(message)
+            time.sleep(self.reconnect_delay)
@@ -0,0 +1,156 @@
+import re
+import threading
+import time
+from contextlib import nullcontext
+
+from psycopg2.extras import RealDictCursor
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_NOOP = nullcontext()
+
+
+class _Span:
+    __slots__ = ("metrics", "name", "labels", "started")
+
+    def __init__(self, metrics, name, labels):
+        self.metrics = metrics
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+
+class Metrics:
+    """Counters and latency histograms rendered in the Prometheus text format.
+
+    When disabled every hook is a no-op (span() hands back one shared
+    nullcontext), so instrumented code costs nothing in that case. Values are
+    per process; scrape each worker or aggregate upstream.
+    """
+
+    def __init__(self, enabled=True, prefix="motomeet", buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.prefix = prefix
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms = {}   # name -> {labels: [bucket counts..., sum, count]}
+        self._counters = {}     # name -> {labels: value}
+        self._gauges = {}       # name -> callable returning {labels: value} or a number
+
+    @staticmethod
+    def _key(labels):
+        return tuple(sorted(labels.items()))
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            counts = series.get(key)
+            if counts is None:
+                counts = series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + amount
+
+    def span(self, name, **labels):
+        """Time a block into histogram `name`."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, labels)
+
+    def gauge(self, name, fn):
+        """Register a callback evaluated at scrape time."""
+        self._gauges[name] = fn
+
+    @staticmethod
+    def _labels(key, extra=()):
+        pairs = list(key) + list(extra)
+        if not pairs:
+            return ""
+        body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in pairs)
+        return "{" + body + "}"
+
+    def render(self):
+        lines = []
+        with self._lock:
+            histograms = {n: {k: list(v) for k, v in s.items()} for n, s in self._histograms.items()}
+            counters = {n: dict(s) for n, s in self._counters.items()}
+
+        for name, series in sorted(histograms.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} histogram")
+            for key, counts in series.items():
+                for i, bound in enumerate(self.buckets):
+                    lines.append(f"{full}_bucket{self._labels(key, [('le', bound)])} {counts[i]}")
+                lines.append(f"{full}_bucket{self._labels(key, [('le', '+Inf')])} {counts[-1]}")
+                lines.append(f"{full}_sum{self._labels(key)} {counts[-2]}")
+                lines.append(f"{full}_count{self._labels(key)} {counts[-1]}")
+
+        for name, series in sorted(counters.items()):
+            full = f"{self.prefix}_{name}"
+            lines.append(f"# TYPE {full} counter")
+            for key, value in series.items():
+                lines.append(f"{full}{self._labels(key)} {value}")
+
+        for name, fn in sorted(self._gauges.items()):
+            full = f"{self.prefix}_{name}"
+            try:
+                values = fn()
+            except Exception as e:
+                print(f"❌ Gauge {name} failed: {e}")
+                continue
+            lines.append(f"# TYPE {full} gauge")
+            if not isinstance(values, dict):
+                values = {(): values}
+            for key, value in values.items():
+                lines.append(f"{full}{self._labels(key)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+_LEADING_WORDS = re.compile(r"\s*(\w*)\s*(\w*)")
+
+
+def statement_label(text):
+    """First SQL keyword, or the statement's name for EXECUTE of a prepared statement."""
+    verb, name = _LEADING_WORDS.match(text).groups()
+    verb = verb.upper()
+    return name if verb == "EXECUTE" and name else verb
+
+
+def timed_cursor(metrics, slow_query_ms=None):
+    """A RealDictCursor class that times every execute and logs slow statements."""
+
+    class TimedCursor(RealDictCursor):
+        def execute(self, query, vars=None):
+            started = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                elapsed = time.perf_counter() - started
+                text = query if isinstance(query, str) else str(query)
+                metrics.observe("db_query_seconds", elapsed, statement=statement_label(text))
+                if slow_query_ms is not None and elapsed * 1000 >= slow_query_ms:
+                    metrics.inc("db_slow_queries_total")
+                    print(f"🐢 Slow query ({elapsed * 1000:.1f} ms): {' '.join(text.split())[:500]}")
+
+    return TimedCursor
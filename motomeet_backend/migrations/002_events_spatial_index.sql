@@ -0,0 +1,7 @@
+-- Lets the nearby-events radius filter (ST_DWithin on geography) use an index scan
+CREATE INDEX IF NOT EXISTS events_geog_idx ON events USING GIST ((geom::geography));
+
+-- Keyset pagination of the feed: ORDER BY event_time, event_uuid
+CREATE INDEX IF NOT EXISTS events_time_uuid_idx ON events (event_time, event_uuid);
+
+ANALYZE events;
@@ -0,0 +1,7 @@
+-- Denormalized RSVP count, kept in step with rsvps by the RSVP/create/cancel paths
+ALTER TABLE events ADD COLUMN IF NOT EXISTS rsvp_count INTEGER NOT NULL DEFAULT 0;
+
+UPDATE events e
+SET rsvp_count = c.n
+FROM (SELECT event_id, COUNT(*) AS n FROM rsvps GROUP BY event_id) c
+WHERE c.event_id = e.event_uuid;
@@ -0,0 +1,7 @@
+-- Data versions that /api/home and /api/profile response caches are validated against
+CREATE SEQUENCE IF NOT EXISTS feed_version_seq;
+
+CREATE TABLE IF NOT EXISTS feed_versions (
+    scope TEXT PRIMARY KEY,
+    version BIGINT NOT NULL
+);
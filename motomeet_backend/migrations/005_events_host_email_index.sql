@@ -0,0 +1,15 @@
+-- Hosted events are looked up by host; cancel_event only touches the host's row now
+CREATE INDEX IF NOT EXISTS events_host_email_idx ON events (host_email);
+
+-- One-off cleanup of made_events left behind by the old whole-table rewrite
+UPDATE users SET made_events = '{}' WHERE made_events IS NULL;
+
+UPDATE users u
+SET made_events = ARRAY(
+    SELECT eid FROM unnest(u.made_events) AS eid
+    WHERE EXISTS (SELECT 1 FROM events e WHERE e.event_uuid = eid)
+)
+WHERE EXISTS (
+    SELECT 1 FROM unnest(u.made_events) AS eid
+    WHERE NOT EXISTS (SELECT 1 FROM events e WHERE e.event_uuid = eid)
+);
@@ -0,0 +1,24 @@
+-- Durable queue for work that doesn't need to finish before the request returns
+CREATE TABLE IF NOT EXISTS jobs (
+    id BIGSERIAL PRIMARY KEY,
+    kind TEXT NOT NULL,
+    payload JSONB NOT NULL DEFAULT '{}',
+    run_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL DEFAULT 5,
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    done_at TIMESTAMPTZ
+);
+
+-- Workers only ever scan pending jobs
+CREATE INDEX IF NOT EXISTS jobs_pending_idx ON jobs (run_at) WHERE done_at IS NULL;
+
+-- One row per email actually sent, so a retried job never mails anyone twice
+CREATE TABLE IF NOT EXISTS notification_deliveries (
+    job_id BIGINT NOT NULL REFERENCES jobs (id) ON DELETE CASCADE,
+    recipient TEXT NOT NULL,
+    sent_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (job_id, recipient)
+);
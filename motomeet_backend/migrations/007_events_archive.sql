@@ -0,0 +1,20 @@
+-- Finished events and their RSVPs are moved here by the archive task, so the
+-- hot events/rsvps tables only grow with upcoming events
+CREATE TABLE IF NOT EXISTS events_archive (
+    event_uuid UUID PRIMARY KEY,
+    event_name TEXT NOT NULL,
+    event_time TIMESTAMPTZ NOT NULL,
+    location TEXT,
+    latitude DOUBLE PRECISION NOT NULL,
+    longitude DOUBLE PRECISION NOT NULL,
+    host_email TEXT NOT NULL,
+    description TEXT,
+    rsvp_count INTEGER NOT NULL DEFAULT 0,
+    archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS rsvps_archive (
+    user_email TEXT NOT NULL,
+    event_id UUID NOT NULL REFERENCES events_archive (event_uuid),
+    PRIMARY KEY (user_email, event_id)
+);
@@ -0,0 +1,12 @@
+-- Free-text search of the feed: ILIKE on name + description can use a trigram index
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS events_text_trgm_idx
+    ON events USING GIN ((event_name || ' ' || COALESCE(description, '')) gin_trgm_ops);
+
+-- No index on rsvp_count on purpose: every RSVP updates it, and indexing it would
+-- stop those updates from being HOT. The popularity sort and min_rsvps filter run
+-- on the rows the radius filter (events_geog_idx) already found. The date window
+-- uses events_time_uuid_idx.
+
+ANALYZE events;
@@ -1,9 +1,15 @@
-from flask import Flask, render_template, request, session, make_response, redirect, url_for, abort, jsonify
+from flask import Flask, Blueprint, Response, current_app, stream_with_context, render_template, request, session, make_response, redirect, url_for, abort, jsonify, g
 import requests
 import os
-from psycopg2.extras import RealDictCursor
+import glob
+import click
+import hmac
+import time
+import math
+import queue
+import uuid
+from psycopg2.extras import RealDictCursor, UUID_adapter
 import psycopg2
-import bcrypt
 import jwt
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
@@ -11,25 +17,52 @@ from urllib.parse import unquote
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from flask_cors import CORS, cross_origin
-
-
-app = Flask(__name__)
+from db_pool import ConnectionPool, PoolTimeout
+from geocode_cache import GeocodeCache, GeocodeError
+from autocomplete_cache import AutocompleteCache
+from event_index import EventIndex, EARTH_RADIUS_M
+from feed_cache import FeedVersions, ResponseCache
+from password_hashing import PasswordHasher, HasherBusy
+from metrics import Metrics, timed_cursor
+from google_client import GoogleClient, UpstreamUnavailable
+from jobs import JobQueue
+from notifications import Mailer
+from live_updates import LiveHub
+from event_import import EventImporter, read_rows
+from json_provider import FastJSONProvider, pick_encoding, compress
+from prepared import StatementRegistry
+import limiter_storage  # registers the shm:// limiter storage
+from user_cache import TokenCache, UserState, UserStateCache
+from feed_query import FeedQuery
+
+
+# Every route and CLI command lives on this blueprint; create_app() builds the app around it
+api = Blueprint("motomeet", __name__, cli_group=None)
 load_dotenv()
-GOOGLE_GEOCODE_URL = "https://maps.googleapis.com/maps/api/geocode/json"
+# Send uuid.UUID as a uuid literal: EXECUTE won't coerce a text[] argument to a uuid[] parameter
+psycopg2.extensions.register_adapter(uuid.UUID, UUID_adapter)
+# Overridable so benchmarks can point at a local stand-in
+GOOGLE_GEOCODE_URL = os.getenv("GOOGLE_GEOCODE_URL", "https://maps.googleapis.com/maps/api/geocode/json")
+GOOGLE_AUTOCOMPLETE_URL = os.getenv("GOOGLE_AUTOCOMPLETE_URL", "https://places.googleapis.com/v1/places:autocomplete")
 SECRET_KEY = os.getenv('JWT_SECRET_KEY')
 GOOGLE_MAPS_API_KEY = os.getenv('GOOGLE_MAPS_API_KEY')
-CORS(app, supports_credentials=True, origins=[
+ALLOWED_ORIGINS = [
     "http://localhost:5173",
     "https://moto-meet.vercel.app",
     "https://motomeet.xyz",
     "https://www.motomeet.xyz"
-])
-app.config["SESSION_TYPE"] = "filesystem"  # Store sessions on the server
+]
+# Counters live in shared memory so every worker on the host enforces the same limits
 limiter = Limiter(
     get_remote_address,
-    app=app,
-    default_limits=["200 per day", "50 per hour"]
+    default_limits=["200 per day", "50 per hour"],
+    storage_uri=os.getenv("RATELIMIT_STORAGE_URI", "shm://"),
+    strategy=os.getenv("RATELIMIT_STRATEGY", "sliding-window-counter"),
 )
+# Timing hooks; with METRICS_ENABLED=0 (and no SLOW_QUERY_MS) they cost nothing
+metrics = Metrics(enabled=os.getenv("METRICS_ENABLED", "1") == "1")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS")) if os.getenv("SLOW_QUERY_MS") else None
+CURSOR_FACTORY = timed_cursor(metrics, SLOW_QUERY_MS) if metrics.enabled or SLOW_QUERY_MS is not None else RealDictCursor
 def config():
     try:
         conn = psycopg2.connect(
@@ -38,82 +71,837 @@ def config():
             user = os.getenv("DB_USER"),
             password = os.getenv("DB_PASSWORD"),
             port = int(os.getenv("DB_PORT", 5432)),
-            cursor_factory = RealDictCursor,
+            cursor_factory = CURSOR_FACTORY,
         )
         return conn
     except psycopg2.Error as e:
         print(f"Database Connection Error: {e}")
         return None
-            
+
+# Sized per worker process: with N workers, Postgres sees up to N * DB_POOL_MAX connections
+db_pool = ConnectionPool(
+    config,
+    minconn=int(os.getenv("DB_POOL_MIN", 2)),
+    maxconn=int(os.getenv("DB_POOL_MAX", 10)),
+    timeout=float(os.getenv("DB_POOL_TIMEOUT", 5)),
+    health_check_after=float(os.getenv("DB_POOL_HEALTH_CHECK_AFTER", 30)),
+    leak_after=float(os.getenv("DB_POOL_LEAK_AFTER", 60)),
+    track_stacks=os.getenv("DB_POOL_TRACK_STACKS", "0") == "1",
+    on_checkout=(lambda waited: metrics.observe("db_checkout_seconds", waited)) if metrics.enabled else None,
+)
+# The hot queries run as prepared statements on each pooled connection. Turn off
+# with PREPARED_STATEMENTS=0 behind a transaction-mode pooler (PgBouncer etc).
+statements = StatementRegistry(os.getenv("PREPARED_STATEMENTS", "1") == "1", metrics)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+
+@api.cli.command("migrate")
+def migrate():
+    """Apply any migrations/*.sql files that haven't been applied yet."""
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    name TEXT PRIMARY KEY,
+                    applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+                )
+            """)
+            cur.execute("SELECT name FROM schema_migrations")
+            applied = {row["name"] for row in cur.fetchall()}
+            conn.commit()
+            for path in sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))):
+                name = os.path.basename(path)
+                if name in applied:
+                    continue
+                with open(path) as f:
+                    cur.execute(f.read())
+                cur.execute("INSERT INTO schema_migrations (name) VALUES (%s)", (name,))
+                conn.commit()
+                print(f"✅ Applied {name}")
+
+
+def _timeout(name, connect, read):
+    return (float(os.getenv(f"{name}_CONNECT_TIMEOUT", connect)), float(os.getenv(f"{name}_READ_TIMEOUT", read)))
+
+# Every outbound Google call goes through this one keep-alive session
+google = GoogleClient(
+    metrics,
+    pool_size=int(os.getenv("GOOGLE_POOL_SIZE", 20)),
+    retries=int(os.getenv("GOOGLE_RETRIES", 2)),
+    backoff=float(os.getenv("GOOGLE_RETRY_BACKOFF", 0.1)),
+    breaker_threshold=int(os.getenv("GOOGLE_BREAKER_THRESHOLD", 5)),
+    breaker_reset=float(os.getenv("GOOGLE_BREAKER_RESET", 30)),
+    timeouts={
+        "geocode": _timeout("GOOGLE_GEOCODE", 2, 5),
+        # Someone is typing, a late suggestion is useless
+        "autocomplete": _timeout("GOOGLE_AUTOCOMPLETE", 1, 2),
+    },
+)
+
+def fetch_geocode(address):
+    """Ask Google for the coordinates of `address`; None if it has no results.
+
+    Google reports quota, key and server errors as HTTP 200 with an error
+    `status` and no results. Only ZERO_RESULTS means the address doesn't
+    exist; anything else but OK raises, so it's never cached as not found.
+    """
+    params = {
+        "address": address,
+        "key": GOOGLE_MAPS_API_KEY
+    }
+    response = google.get("geocode", GOOGLE_GEOCODE_URL, params=params)
+    if response.status_code != 200:
+        raise GeocodeError(f"Geocoding API returned {response.status_code}")
+    payload = response.json()
+    status = payload.get("status")
+    if status == "ZERO_RESULTS":
+        return None
+    if status != "OK":
+        message = payload.get("error_message")
+        raise GeocodeError(f"Geocoding API returned {status}" + (f": {message}" if message else ""))
+    results = payload.get("results")
+    if not results:
+        return None
+    location = results[0]["geometry"]["location"]
+    return (location["lat"], location["lng"])
+
+geocode_cache = GeocodeCache(
+    fetch_geocode,
+    db_pool,
+    maxsize=int(os.getenv("GEOCODE_CACHE_SIZE", 2048)),
+    ttl=float(os.getenv("GEOCODE_CACHE_TTL", 6 * 3600)),
+    db_ttl_days=int(os.getenv("GEOCODE_CACHE_DB_TTL_DAYS", 30)),
+)
+
+def fetch_autocomplete(body):
+    response = google.post(
+        "autocomplete",
+        GOOGLE_AUTOCOMPLETE_URL,
+        headers={
+            "Content-Type": "application/json",
+            "X-Goog-Api-Key": GOOGLE_MAPS_API_KEY,
+            "X-Goog-FieldMask": "suggestions.placePrediction.text"
+        },
+        json=body
+    )
+    return response.status_code, response.json()
+
+autocomplete_cache = AutocompleteCache(
+    fetch_autocomplete,
+    maxsize=int(os.getenv("AUTOCOMPLETE_CACHE_SIZE", 4096)),
+    ttl=float(os.getenv("AUTOCOMPLETE_CACHE_TTL", 3600)),
+    prefix_reuse=os.getenv("AUTOCOMPLETE_PREFIX_REUSE", "1") == "1",
+)
+
+# bcrypt runs in a process pool; BCRYPT_MAX_PENDING bounds how many logins can queue for it
+password_hasher = PasswordHasher(
+    rounds=int(os.getenv("BCRYPT_ROUNDS", 12)),
+    workers=int(os.getenv("BCRYPT_WORKERS", 0)) or None,
+    max_pending=int(os.getenv("BCRYPT_MAX_PENDING", 0)) or None,
+    queue_timeout=float(os.getenv("BCRYPT_QUEUE_TIMEOUT", 1)),
+)
 
 def authenticate(email, password):
     try:
-        connection = config()
-        if not connection:
-            print("Database Connection Error")
-            raise Exception
-        with connection.cursor() as cur:
-            cur.execute("SELECT hashed_password FROM users WHERE email = %s", (email,))
-            user = cur.fetchone()
-            cur.close()
-            connection.close()
-        stored_hash = user["hashed_password"].encode()  # convert back to bytes
-        return bcrypt.checkpw(password.encode(), stored_hash)
+        with db_pool.connection() as connection:
+            with connection.cursor() as cur:
+                statements.execute(cur, "user_password", "SELECT hashed_password FROM users WHERE email = %s", (email,))
+                user = cur.fetchone()
+        stored_hash = user["hashed_password"]
+        with metrics.span("bcrypt_seconds", op="check"):
+            ok = password_hasher.check(password, stored_hash)
+        if not ok:
+            return False
+    except HasherBusy:
+        raise
     except Exception as e:
         print(f"❌ Database Connection Error: {e}")
         return False
 
-def get_nearby_events(user_lat, user_lon, radius=80467):  # 50 miles in meters
-    """Fetch events within a given radius using PostGIS."""
-    conn = config()
-    cursor = conn.cursor()
+    if password_hasher.needs_rehash(stored_hash):
+        # Bring the stored hash up to the current work factor while we have the plaintext
+        try:
+            with metrics.span("bcrypt_seconds", op="rehash"):
+                new_hash = password_hasher.hash(password)
+            with db_pool.connection() as connection:
+                with connection.cursor() as cur:
+                    cur.execute(
+                        "UPDATE users SET hashed_password = %s WHERE email = %s AND hashed_password = %s",
+                        (new_hash, email, stored_hash),
+                    )
+                connection.commit()
+        except Exception as e:
+            print(f"❌ Password rehash failed: {e}")
+    return True
+
+def hasher_busy_response():
+    metrics.inc("bcrypt_rejected_total")
+    resp = make_response(jsonify({"error": "Server is busy, please try again shortly."}), 503)
+    resp.headers["Retry-After"] = "1"
+    return resp
+
+# RSVP toggles keep events.rsvp_count exact in the same statement. A no-op
+# (ON CONFLICT DO NOTHING, or deleting a missing RSVP) changes the count by 0.
+RSVP_ADD_SQL = """
+    WITH added AS (
+        INSERT INTO rsvps (user_email, event_id)
+        VALUES (%(email)s, %(event_id)s)
+        ON CONFLICT DO NOTHING
+        RETURNING event_id
+    )
+    UPDATE events SET rsvp_count = rsvp_count + (SELECT COUNT(*) FROM added)
+    WHERE event_uuid = %(event_id)s
+    RETURNING rsvp_count, latitude, longitude
+"""
+RSVP_REMOVE_SQL = """
+    WITH removed AS (
+        DELETE FROM rsvps
+        WHERE user_email = %(email)s AND event_id = %(event_id)s
+        RETURNING event_id
+    )
+    UPDATE events SET rsvp_count = rsvp_count - (SELECT COUNT(*) FROM removed)
+    WHERE event_uuid = %(event_id)s
+    RETURNING rsvp_count, latitude, longitude
+"""
+
+def set_rsvp(cur, email, event_id, state):
+    """RSVP or un-RSVP `email`. Returns the event's new rsvp_count and coordinates, or None if it's gone."""
+    if state:
+        statements.execute(cur, "rsvp_add", RSVP_ADD_SQL, {"email": email, "event_id": event_id})
+    else:
+        statements.execute(cur, "rsvp_remove", RSVP_REMOVE_SQL, {"email": email, "event_id": event_id})
+    return cur.fetchone()
+
+# Many toggles for one rider in a single statement. The last toggle per event wins,
+# events are locked in uuid order so concurrent batches can't deadlock each other,
+# and every event that still exists comes back with its new count.
+RSVP_BATCH_SQL = """
+    WITH wanted AS (
+        SELECT DISTINCT ON (event_id) event_id, going
+        FROM unnest(%(event_ids)s::uuid[], %(states)s::boolean[]) WITH ORDINALITY AS t (event_id, going, ord)
+        ORDER BY event_id, ord DESC
+    ),
+    targets AS (
+        SELECT e.event_uuid FROM events e
+        JOIN wanted w ON w.event_id = e.event_uuid
+        ORDER BY e.event_uuid
+        FOR UPDATE OF e
+    ),
+    added AS (
+        INSERT INTO rsvps (user_email, event_id)
+        SELECT %(email)s, w.event_id FROM wanted w
+        JOIN targets t ON t.event_uuid = w.event_id
+        WHERE w.going
+        ON CONFLICT DO NOTHING
+        RETURNING event_id
+    ),
+    removed AS (
+        DELETE FROM rsvps r
+        USING wanted w
+        WHERE r.user_email = %(email)s AND r.event_id = w.event_id AND NOT w.going
+        RETURNING r.event_id
+    ),
+    delta AS (
+        SELECT event_id, SUM(d) AS d FROM (
+            SELECT event_id, 1 AS d FROM added
+            UNION ALL
+            SELECT event_id, -1 FROM removed
+        ) changes
+        GROUP BY event_id
+    )
+    UPDATE events e SET rsvp_count = e.rsvp_count + COALESCE(delta.d, 0)
+    FROM targets t
+    JOIN wanted w ON w.event_id = t.event_uuid
+    LEFT JOIN delta ON delta.event_id = t.event_uuid
+    WHERE e.event_uuid = t.event_uuid
+    RETURNING e.event_uuid::text AS event_id, e.rsvp_count, e.latitude, e.longitude, w.going
+"""
+RSVP_BATCH_MAX = int(os.getenv("RSVP_BATCH_MAX", 50))
+
+@api.cli.command("reconcile-rsvp-counts")
+@click.option("--repair", is_flag=True, help="Fix drifted counts instead of only reporting them.")
+def reconcile_rsvp_counts(repair):
+    """Compare events.rsvp_count against the rsvps table."""
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT e.event_uuid, e.rsvp_count, COALESCE(c.n, 0) AS actual
+                FROM events e
+                LEFT JOIN (SELECT event_id, COUNT(*) AS n FROM rsvps GROUP BY event_id) c
+                    ON c.event_id = e.event_uuid
+                WHERE e.rsvp_count <> COALESCE(c.n, 0)
+            """)
+            drifted = cur.fetchall()
+            conn.commit()
+            for row in drifted:
+                print(f"{row['event_uuid']}: stored {row['rsvp_count']}, actual {row['actual']}")
+            if not repair:
+                print(f"{len(drifted)} event(s) with drifted RSVP counts")
+                return
+            for row in drifted:
+                # Holding the event row lock means no RSVP toggle can land between the count and the update
+                cur.execute("SELECT 1 FROM events WHERE event_uuid = %s FOR UPDATE", (row["event_uuid"],))
+                cur.execute("""
+                    UPDATE events
+                    SET rsvp_count = (SELECT COUNT(*) FROM rsvps WHERE event_id = %s)
+                    WHERE event_uuid = %s
+                """, (row["event_uuid"], row["event_uuid"]))
+                conn.commit()
+            print(f"✅ Repaired {len(drifted)} event(s)")
+
+# Side work that write endpoints hand off instead of doing inline; `flask run-jobs` works the queue
+job_queue = JobQueue(
+    db_pool,
+    lease_seconds=int(os.getenv("JOB_LEASE_SECONDS", 300)),
+    backoff_seconds=int(os.getenv("JOB_RETRY_BACKOFF", 30)),
+    metrics=metrics,
+)
+mailer = Mailer(
+    host=os.getenv("SMTP_HOST"),
+    port=int(os.getenv("SMTP_PORT", 587)),
+    sender=os.getenv("SMTP_SENDER", "MotoMeet <no-reply@motomeet.xyz>"),
+    username=os.getenv("SMTP_USERNAME"),
+    password=os.getenv("SMTP_PASSWORD"),
+    starttls=os.getenv("SMTP_STARTTLS", "1") == "1",
+)
+# Emails sent per SMTP connection; deliveries are recorded after each batch
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", 50))
+
+@job_queue.handler("made_events")
+def sync_made_events(payload, job):
+    """Add or remove an event in its host's made_events. Adds take `event_id`
+    or, from a bulk import, `event_ids` in the host's order."""
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            if payload["op"] == "add":
+                event_ids = payload.get("event_ids") or [payload["event_id"]]
+                # Skip events cancelled before this ran, and ones already listed
+                cur.execute("""
+                    UPDATE users
+                    SET made_events = COALESCE(made_events, '{}') || ARRAY(
+                        SELECT e.event_uuid
+                        FROM unnest(%(event_ids)s::uuid[]) WITH ORDINALITY AS a(event_uuid, n)
+                        JOIN events e ON e.event_uuid = a.event_uuid
+                        WHERE NOT (e.event_uuid = ANY(COALESCE(made_events, '{}')))
+                        ORDER BY a.n
+                    )
+                    WHERE email = %(email)s
+                    AND EXISTS (
+                        SELECT 1 FROM unnest(%(event_ids)s::uuid[]) AS a(event_uuid)
+                        JOIN events e ON e.event_uuid = a.event_uuid
+                        WHERE NOT (e.event_uuid = ANY(COALESCE(made_events, '{}')))
+                    )
+                """, {"email": payload["email"], "event_ids": event_ids})
+            else:
+                cur.execute("""
+                    UPDATE users
+                    SET made_events = array_remove(made_events, %(event_id)s::uuid)
+                    WHERE email = %(email)s
+                """, payload)
+        conn.commit()
+
+EVENT_EMAILS = {
+    "cancelled": (
+        "Ride cancelled: {event_name}",
+        "Heads up, {event_name} at {location} on {event_time} has been cancelled by the host.\n\n- MotoMeet",
+    ),
+    "updated": (
+        "Ride updated: {event_name}",
+        "The host changed the details of {event_name}. It's now at {location} on {event_time}.\n\n"
+        "Check MotoMeet for the latest.\n\n- MotoMeet",
+    ),
+}
+
+@job_queue.handler("notify_event_changed")
+def notify_event_changed(payload, job):
+    """Email everyone who RSVP'd (except the host) that an event was cancelled or edited.
+
+    Each address is recorded in notification_deliveries once its message is
+    accepted, so a retried job only mails the ones it hadn't reached yet.
+    """
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            if "recipients" in payload:
+                # Cancelled events have no RSVPs left, so the list came with the job
+                recipients = payload["recipients"]
+            else:
+                cur.execute("SELECT user_email FROM rsvps WHERE event_id = %s", (payload["event_id"],))
+                recipients = [row["user_email"] for row in cur.fetchall()]
+            cur.execute("SELECT recipient FROM notification_deliveries WHERE job_id = %s", (job["id"],))
+            delivered = {row["recipient"] for row in cur.fetchall()}
+        conn.commit()
+
+    pending = sorted(set(recipients) - delivered - {payload["host_email"]})
+    subject, body = EVENT_EMAILS[payload["change"]]
+    subject, body = subject.format(**payload), body.format(**payload)
 
-    query = """
+    for i in range(0, len(pending), NOTIFY_BATCH_SIZE):
+        sent = []
+        try:
+            mailer.send_batch(pending[i:i + NOTIFY_BATCH_SIZE], subject, body, sent.append)
+        finally:
+            if sent:
+                with db_pool.connection() as conn:
+                    with conn.cursor() as cur:
+                        cur.execute("""
+                            INSERT INTO notification_deliveries (job_id, recipient)
+                            SELECT %s, unnest(%s::text[])
+                            ON CONFLICT DO NOTHING
+                        """, (job["id"], sent))
+                    conn.commit()
+
+ARCHIVE_AFTER_HOURS = float(os.getenv("ARCHIVE_AFTER_HOURS", 24))
+ARCHIVE_BATCH = int(os.getenv("ARCHIVE_BATCH", 1000))
+
+def archive_past_events(batch=ARCHIVE_BATCH, after_hours=ARCHIVE_AFTER_HOURS):
+    """Move events that started more than `after_hours` ago, with their RSVPs,
+    into the archive tables, one batch per transaction. Returns how many moved."""
+    moved = 0
+    while True:
+        with db_pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT event_uuid FROM events
+                    WHERE event_time < NOW() - make_interval(hours => %s)
+                    ORDER BY event_time
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                """, (after_hours, batch))
+                ids = [row["event_uuid"] for row in cur.fetchall()]
+                if not ids:
+                    conn.commit()
+                    return moved
+                cur.execute("""
+                    INSERT INTO events_archive (event_uuid, event_name, event_time, location, latitude,
+                                                longitude, host_email, description, rsvp_count)
+                    SELECT event_uuid, event_name, event_time, location, latitude,
+                           longitude, host_email, description, rsvp_count
+                    FROM events WHERE event_uuid = ANY(%s::uuid[])
+                    ON CONFLICT DO NOTHING
+                """, (ids,))
+                cur.execute("""
+                    WITH moved AS (
+                        DELETE FROM rsvps WHERE event_id = ANY(%s::uuid[])
+                        RETURNING user_email, event_id
+                    )
+                    INSERT INTO rsvps_archive (user_email, event_id)
+                    SELECT user_email, event_id FROM moved
+                    ON CONFLICT DO NOTHING
+                """, (ids,))
+                cur.execute("DELETE FROM events WHERE event_uuid = ANY(%s::uuid[])", (ids,))
+            conn.commit()
+        moved += len(ids)
+        if len(ids) < batch:
+            return moved
+
+@job_queue.periodic("archive_events", float(os.getenv("ARCHIVE_INTERVAL", 3600)))
+def archive_events_task():
+    moved = archive_past_events()
+    if moved:
+        print(f"📦 Archived {moved} past event(s)")
+
+@api.cli.command("archive-events")
+@click.option("--after-hours", default=ARCHIVE_AFTER_HOURS, help="Only events that started at least this long ago.")
+@click.option("--batch", default=ARCHIVE_BATCH, help="Events moved per transaction.")
+def archive_events(after_hours, batch):
+    """Move finished events and their RSVPs out of the hot tables now."""
+    print(f"📦 Archived {archive_past_events(batch, after_hours)} past event(s)")
+
+@api.cli.command("run-jobs")
+@click.option("--batch", default=10, help="Jobs claimed per round trip.")
+@click.option("--poll-interval", default=5.0, help="Seconds between polls when nothing wakes the worker.")
+@click.option("--once", is_flag=True, help="Run whatever is due and exit.")
+def run_jobs(batch, poll_interval, once):
+    """Work the background job queue. Run as many of these as you like."""
+    if once:
+        while job_queue.run_once(batch):
+            pass
+        return
+    print("👷 Job worker started")
+    job_queue.run_forever(config, batch=batch, poll_interval=poll_interval)
+
+# Cached /api/home and /api/profile responses, revalidated against feed_versions
+feed_versions = FeedVersions(cell_degrees=float(os.getenv("FEED_VERSION_CELL_DEGREES", 1.0)))
+response_cache = ResponseCache(
+    maxsize=int(os.getenv("RESPONSE_CACHE_SIZE", 2000)),
+    max_bytes=int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+)
+
+# Riders' settings and going-to sets, so repeat page views don't re-read them
+user_state = UserStateCache(
+    maxsize=int(os.getenv("USER_CACHE_SIZE", 5000)),
+    ttl=float(os.getenv("USER_CACHE_TTL", 60)),
+)
+token_cache = TokenCache(
+    SECRET_KEY,
+    maxsize=int(os.getenv("TOKEN_CACHE_SIZE", 10000)),
+    ttl=float(os.getenv("TOKEN_CACHE_TTL", 300)),
+)
+
+USER_STATE_SQL = """
+    SELECT u.n, u.city, u.lat, u.long, COALESCE(u.radius, 80467) AS radius, u.make, u.model,
+           COALESCE((SELECT array_agg(event_id::text) FROM rsvps WHERE user_email = u.email), '{}') AS events_going,
+           COALESCE((SELECT version FROM feed_versions WHERE scope = %(scope)s), 0) AS version
+    FROM users u
+    WHERE u.email = %(email)s
+"""
+
+def get_user_state(email, cur=None, fresh=False):
+    """The rider's UserState, from memory unless `fresh`. Reads through `cur` (or a
+    pooled connection) on a miss. None if there's no such rider."""
+    state = None if fresh else user_state.get(email)
+    if state is not None:
+        return state
+    if cur is None:
+        with db_pool.connection() as conn:
+            with conn.cursor() as cur:
+                state = get_user_state(email, cur, fresh=True)
+            conn.commit()
+        return state
+    generation = user_state.generation()
+    statements.execute(cur, "user_state", USER_STATE_SQL, {"email": email, "scope": feed_versions.user(email)})
+    row = cur.fetchone()
+    if row is None:
+        return None
+    state = UserState.from_row(row)
+    user_state.put(email, state, generation)
+    return state
+
+# Emails per NOTIFY, keeping the payload well under Postgres' 8000 byte limit
+USERS_CHANGED_BATCH = 100
+
+def users_changed(cur, emails):
+    """Inside the writer's transaction: have every other worker drop these riders'
+    cached state once it commits. The writer calls user_state.invalidate() itself."""
+    emails = sorted(set(emails))
+    for i in range(0, len(emails), USERS_CHANGED_BATCH):
+        live_hub.publish(cur, {"type": "users", "emails": emails[i:i + USERS_CHANGED_BATCH]})
+
+# Bodies smaller than this aren't worth compressing
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", 4096))
+
+def cached_json_response(entry):
+    """Send a cached body with its ETag; a matching If-None-Match becomes a 304.
+
+    Large bodies go out gzip/brotli-compressed when the client accepts it. The
+    compressed copy is kept on the cache entry, so it's only made once.
+    """
+    encoding = None
+    if len(entry.body) >= COMPRESS_MIN_BYTES:
+        encoding = pick_encoding(request.accept_encodings)
+    if encoding:
+        resp = make_response(entry.encode(encoding, compress))
+        resp.headers["Content-Encoding"] = encoding
+        # Each representation needs its own strong validator
+        resp.set_etag(f"{entry.etag}-{encoding}")
+    else:
+        resp = make_response(entry.body)
+        resp.set_etag(entry.etag)
+    resp.mimetype = "application/json"
+    resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = "private, no-cache"
+    resp = resp.make_conditional(request)
+    if resp.status_code == 304:
+        response_cache.count("not_modified")
+    return resp
+
+def get_cached_response(cur, key):
+    """The cached entry for `key` if its data version is still current, else None."""
+    cached = response_cache.get(key)
+    if cached is None:
+        response_cache.count("misses")
+        return None
+    if feed_versions.current(cur, cached.scopes) != cached.version:
+        response_cache.count("stale")
+        return None
+    response_cache.count("hits")
+    return cached
+
+FEED_PAGE_SIZE = int(os.getenv("FEED_PAGE_SIZE", 100))
+FEED_MAX_PAGE_SIZE = int(os.getenv("FEED_MAX_PAGE_SIZE", 500))
+
+def get_nearby_events(user_lat, user_lon, radius=80467, conn=None, after=None, limit=None, feed_query=None):  # 50 miles in meters
+    """Fetch events within a given radius using PostGIS.
+
+    Pass `conn` to reuse a connection the caller already borrowed from the pool.
+    `feed_query` is a FeedQuery for sorting and filtering (time order if None),
+    `after` a keyset position from its decode_cursor() and `limit` caps the page.
+    """
+    if conn is None:
+        with db_pool.connection() as conn:
+            return get_nearby_events(user_lat, user_lon, radius, conn, after, limit, feed_query)
+
+    feed_query = feed_query or FeedQuery()
+    query, params = nearby_events_sql("ST_MakePoint(%(lon)s, %(lat)s)", "%(radius)s", after, limit, feed_query)
+    params.update({"lon": user_lon, "lat": user_lat, "radius": radius})
+
+    name = ("nearby_events" + ("" if feed_query.is_default else f"_{feed_query.variant}")
+            + ("_after" if after is not None else "") + ("_page" if limit is not None else ""))
+    with conn.cursor() as cursor:
+        statements.execute(cursor, name, query, params)
+        events = cursor.fetchall()
+
+    return events
+
+# What the frontend reads off each feed event
+FEED_COLUMNS = ("host_email", "event_uuid", "event_name", "event_time", "location", "latitude",
+                "longitude", "description", "host_name", "rsvp_count", "distance")
+
+def nearby_events_sql(point, radius, after=None, limit=None, feed_query=None):
+    """SQL and params for the nearby-events query.
+
+    `point` and `radius` are SQL expressions, so the same query works with bound
+    parameters or with columns of an enclosing query. Sorting, filters and the
+    keyset condition come from `feed_query` (plain time order if None).
+    """
+    feed_query = feed_query or FeedQuery()
+    # ST_DWithin on geography can use events_geog_idx, unlike comparing ST_DistanceSphere to the radius
+    params = {}
+    radius = feed_query.radius_sql(radius, params)
+    filters = feed_query.filters_sql(params)
+    keyset = ""
+    if after is not None:
+        keyset = feed_query.keyset_sql(after, params)
+    page = ""
+    if limit is not None:
+        page = "LIMIT %(limit)s"
+        params["limit"] = limit
+
+    query = f"""
         SELECT e.host_email, e.event_uuid, e.event_name, e.event_time, e.location,
                e.latitude, e.longitude, e.description,
                u.n AS host_name,
-               COUNT(r.user_email) AS rsvp_count,
-               ST_DistanceSphere(e.geom::geometry, ST_MakePoint(%s, %s)::geometry) AS distance
+               e.rsvp_count,
+               ST_Distance(e.geom::geography, p.pt, false) AS distance
         FROM events e
         JOIN users u ON e.host_email = u.email
-        LEFT JOIN rsvps r ON e.event_uuid = r.event_id
+        CROSS JOIN (SELECT ({point})::geography AS pt) p
         WHERE e.event_time >= NOW()
-        AND ST_DistanceSphere(e.geom::geometry, ST_MakePoint(%s, %s)::geometry) <= %s
-        GROUP BY e.event_uuid, u.n
-        ORDER BY e.event_time ASC;
+        AND ST_DWithin(e.geom::geography, p.pt, {radius}, false)
+        {filters}
+        {keyset}
+        {feed_query.order_sql()}
+        {page}
     """
+    return query, params
+
+def load_upcoming_events(event_id=None):
+    """Feed rows for the in-memory event index, with its helper columns."""
+    only_one = "AND e.event_uuid = %(event_id)s" if event_id is not None else ""
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT e.host_email, e.event_uuid, e.event_name, e.event_time, e.location,
+                       e.latitude, e.longitude, e.description,
+                       u.n AS host_name,
+                       e.rsvp_count,
+                       ST_Y(e.geom::geometry) AS _lat,
+                       ST_X(e.geom::geometry) AS _lon,
+                       EXTRACT(EPOCH FROM e.event_time)::float8 AS _epoch
+                FROM events e
+                JOIN users u ON e.host_email = u.email
+                WHERE e.event_time >= NOW()
+                {only_one}
+            """, {"event_id": event_id})
+            rows = [dict(row) for row in cur.fetchall()]
+        conn.commit()
+    return rows
+
+# Optional: serve the feed from memory instead of PostGIS. Falls back to SQL while
+# disabled or not built yet.
+EVENT_INDEX_ENABLED = os.getenv("EVENT_INDEX_ENABLED", "0") == "1"
+event_index = EventIndex(
+    load_upcoming_events,
+    cell_degrees=float(os.getenv("EVENT_INDEX_CELL_DEGREES", 1.0)),
+    refresh_interval=float(os.getenv("EVENT_INDEX_REFRESH", 60)),
+)
 
-    cursor.execute(query, (user_lon, user_lat, user_lon, user_lat, radius))
-    events = cursor.fetchall()
-    cursor.close()
-    conn.close()
+def event_index_changed(event_id, removed=False):
+    """Apply an event write to the in-memory index, if it's in use."""
+    if not EVENT_INDEX_ENABLED or not event_index.ready:
+        return
+    try:
+        if removed:
+            event_index.remove_event(event_id)
+        else:
+            event_index.refresh_event(event_id)
+    except Exception as e:
+        # The periodic rebuild will pick it up
+        print(f"❌ Event index update failed: {e}")
+
+@api.cli.command("check-event-index")
+@click.option("--users", default=50, help="How many users' feeds to compare.")
+def check_event_index(users):
+    """Compare the in-memory index with the PostGIS query for real user locations."""
+    event_index.build()
+    mismatches = 0
+    with db_pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT email, lat, long, COALESCE(radius, 80467) AS radius FROM users
+                WHERE lat IS NOT NULL AND long IS NOT NULL
+                LIMIT %s
+            """, (users,))
+            locations = cur.fetchall()
+        for user in locations:
+            expected = get_nearby_events(user["lat"], user["long"], user["radius"], conn)
+            actual = event_index.nearby(user["lat"], user["long"], user["radius"])
+            expected_ids = [str(e["event_uuid"]) for e in expected]
+            actual_ids = [str(e["event_uuid"]) for e in actual]
+            if expected_ids == actual_ids:
+                continue
+            # Events sitting right on the radius can land either side due to float rounding
+            edge = {str(e["event_uuid"]) for e in expected + actual
+                    if abs(e["distance"] - float(user["radius"])) < 1.0}
+            if [i for i in expected_ids if i not in edge] != [i for i in actual_ids if i not in edge]:
+                mismatches += 1
+                print(f"❌ {user['email']}: SQL {expected_ids} vs index {actual_ids}")
+        conn.commit()
+    print(f"{len(locations)} feed(s) compared, {mismatches} mismatch(es)")
+
+def paginate(events, limit, feed_query):
+    """Trim a limit+1 fetch to one page plus the cursor for the next (None on the last page)."""
+    if len(events) > limit:
+        events = events[:limit]
+        return events, feed_query.encode_cursor(events[-1])
+    return events, None
+
+def load_home_feed(conn, email, after=None, limit=FEED_PAGE_SIZE, fresh=False, feed_query=None):
+    """The rider's UserState and a page of nearby events.
+
+    With the state cached (and not `fresh`) only the nearby query runs, or
+    nothing at all with the event index. Otherwise state and events come back
+    in one statement and the state is cached. The event index only knows the
+    plain time order, so other sorts and any filters always go to SQL.
+    Returns (state, events, next_cursor, from_cache, from_index), or None if
+    the rider doesn't exist.
+    """
+    feed_query = feed_query or FeedQuery(email)
+    use_index = EVENT_INDEX_ENABLED and event_index.ready and feed_query.is_default
+    if EVENT_INDEX_ENABLED and not event_index.ready:
+        event_index.build_in_background()
+
+    state = None if fresh else user_state.get(email)
+    if state is not None:
+        if not state.lat or not state.long:
+            events = []
+        elif use_index:
+            events = event_index.nearby(state.lat, state.long, state.radius, after, limit + 1)
+        else:
+            events = get_nearby_events(state.lat, state.long, state.radius, conn, after, limit + 1, feed_query)
+        events, next_cursor = paginate(events, limit, feed_query)
+        return state, events, next_cursor, True, use_index
+
+    generation = user_state.generation()
+    if use_index:
+        nearby, params = "", {}
+    else:
+        query, params = nearby_events_sql("ST_MakePoint(me.long, me.lat)", "me.radius", after, limit + 1, feed_query)
+        nearby = f"""
+            LEFT JOIN LATERAL ({query}) ev ON true
+            {feed_query.order_sql(outer=True)}
+        """
+    params["email"] = email
+    params["scope"] = feed_versions.user(email)
+    name = "home_feed" + ("_index" if use_index else "" if feed_query.is_default else f"_{feed_query.variant}")
+    if not use_index and after is not None:
+        name += "_after"
+
+    with conn.cursor() as cur:
+        statements.execute(cur, name, f"""
+            WITH me AS (
+                SELECT n, city, lat, long, COALESCE(radius, 80467) AS radius, make, model,
+                       COALESCE((SELECT version FROM feed_versions WHERE scope = %(scope)s), 0) AS version
+                FROM users WHERE email = %(email)s
+            ),
+            going AS (
+                SELECT COALESCE(array_agg(event_id::text), '{{}}') AS events_going
+                FROM rsvps WHERE user_email = %(email)s
+            )
+            SELECT me.*, going.events_going{"" if use_index else ", ev.*"}
+            FROM me CROSS JOIN going
+            {nearby}
+        """, params)
+        rows = cur.fetchall()
 
-    return events
+    if not rows:
+        return None
+    state = UserState.from_row(rows[0])
+    user_state.put(email, state, generation)
+    if not state.lat or not state.long:
+        events = []
+    elif use_index:
+        events = event_index.nearby(state.lat, state.long, state.radius, after, limit + 1)
+    else:
+        events = [{c: row[c] for c in FEED_COLUMNS} for row in rows if row["event_uuid"] is not None]
+    events, next_cursor = paginate(events, limit, feed_query)
+    return state, events, next_cursor, False, use_index
+
+if metrics.enabled:
+    @api.before_app_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+
+    @api.after_app_request
+    def record_request_time(response):
+        started = g.get("request_started")
+        if started is not None:
+            route = request.url_rule.rule if request.url_rule else "unmatched"
+            metrics.observe("http_request_seconds", time.perf_counter() - started,
+                            route=route, method=request.method, status=response.status_code)
+        return response
+
+    metrics.gauge("db_pool", lambda: {(("stat", k),): v for k, v in db_pool.stats().items()})
+    metrics.gauge("prepared_statements", lambda: {
+        (("statement", name), ("stat", k)): v for name, s in statements.stats().items() for k, v in s.items()
+    })
+    metrics.gauge("geocode_cache", lambda: {(("stat", k),): v for k, v in geocode_cache.stats().items()})
+    metrics.gauge("autocomplete_cache", lambda: {(("stat", k),): v for k, v in autocomplete_cache.stats().items()})
+    metrics.gauge("response_cache", lambda: {(("stat", k),): v for k, v in response_cache.stats().items()})
+    metrics.gauge("user_cache", lambda: {(("stat", k),): v for k, v in user_state.stats().items()})
+    metrics.gauge("token_cache", lambda: {(("stat", k),): v for k, v in token_cache.stats().items()})
+    metrics.gauge("event_index_events", lambda: len(event_index))
+    metrics.gauge("jobs", lambda: {(("stat", k),): v for k, v in job_queue.stats().items()})
+    metrics.gauge("live_clients", lambda: len(live_hub))
+    metrics.gauge("google_breaker_open", lambda: {
+        (("api", api),): int(state != "closed") for api, state in google.breaker_states().items()
+    })
+
+@api.route('/metrics')
+@limiter.exempt
+def metrics_endpoint():
+    # Closed unless a scrape token is configured
+    token = os.getenv("METRICS_TOKEN")
+    if not token:
+        return jsonify({"error": "Metrics endpoint is disabled; set METRICS_TOKEN"}), 404
+    if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}"):
+        return jsonify({"error": "Unauthorized"}), 401
+    if not metrics.enabled:
+        return jsonify({"error": "Metrics are disabled"}), 404
+    resp = make_response(metrics.render())
+    resp.mimetype = "text/plain; version=0.0.4"
+    return resp
 
 #TODO: See if i need to remove this
-@app.route('/')
+@api.route('/')
 def main_page():
     return jsonify({"status": "MotoMeet backend is running!"})
 
-@app.route('/test_db')
+@api.route('/test_db')
 def test_db():
     try:
-        conn = config()
-        if not conn:
-            return "❌ Database connection failed"
+        with db_pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT 1")  # Simple test query
+                result = cur.fetchone()
 
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute("SELECT 1")  # Simple test query
-            result = cur.fetchone()
-        
-        conn.close()
-        return f"✅ Database connection successful: {result}"
+        return f"✅ Database connection successful: {result} (pool: {db_pool.stats()}, geocode cache: {geocode_cache.stats()})"
 
     except Exception as e:
         return f"❌ Database Connection Error: {e}"
 
 
-@app.route('/api/signup', methods=['POST'])
+@api.route('/api/signup', methods=['POST'])
 def signup():
     data = request.get_json()
     n = data.get("name")
@@ -128,32 +916,31 @@ def signup():
     if len(n) > 50 or len(make) > 50 or len(model) > 20:
         return jsonify({"error": "Fields too long"}), 400
 
-    print(email)
-    print(model)
     try:
-        conn = config()
-        if not conn:
-            print("❌ Database connection failed")
-            return jsonify({"error": "Database connection failed"}), 500
-
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # ✅ Check if the user already exists
-            cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-            email_check = cur.fetchone()
-            if email_check:
-                print("❌ User already exists")
-                return jsonify({"error": "User already exists. Please log in."}), 400
-
-            # ✅ Hash password and store as string
-            hashed_password = bcrypt.hashpw(pwd.encode(), bcrypt.gensalt()).decode()
-
-            # ✅ Insert user into database
-            cur.execute(
-                "INSERT INTO users (email, hashed_password, make, model, made_events, n) VALUES (%s, %s, %s, %s, %s, %s)",
-                (email, hashed_password, make, model, '{}', n)
-            )
+        with db_pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # ✅ Check if the user already exists
+                cur.execute("SELECT * FROM users WHERE email = %s", (email,))
+                email_check = cur.fetchone()
+                if email_check:
+                    print("❌ User already exists")
+                    return jsonify({"error": "User already exists. Please log in."}), 400
             conn.commit()
 
+        # ✅ Hash password and store as string, without holding a connection meanwhile
+        with metrics.span("bcrypt_seconds", op="hash"):
+            hashed_password = password_hasher.hash(pwd)
+
+        with db_pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                # ✅ Insert user into database
+                cur.execute(
+                    "INSERT INTO users (email, hashed_password, make, model, made_events, n) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (email, hashed_password, make, model, '{}', n)
+                )
+                conn.commit()
+        user_state.invalidate(email)
+
         # ✅ Issue JWT token
         token = jwt.encode(
             {
@@ -177,14 +964,15 @@ def signup():
         )
         return resp
 
-
+    except HasherBusy:
+        return hasher_busy_response()
     except Exception as e:
         print(f"❌ Error during signup: {e}")
         return jsonify({"error": "Internal Server Error"}), 500
 
 
 
-@app.route('/api/set_location', methods=['GET', 'POST'])
+@api.route('/api/set_location', methods=['GET', 'POST'])
 def set_location():
     data = request.get_json()
     city = data.get("city")
@@ -193,81 +981,68 @@ def set_location():
     if not city or not radius:
         return jsonify({"error": "Please enter a valid city and radius."}), 400
 
-        # Call Google Geocoding API
-    params = {
-        "address": city,
-        "key": GOOGLE_MAPS_API_KEY
-    }
-
     try:
-        response = requests.get(GOOGLE_GEOCODE_URL, params=params)
-
-        # Check if request was successful
-        if response.status_code != 200:
-            return jsonify({"error": "Geocoding API error"}), 500
-            # Parse JSON response
-        data = response.json()
+        # Cached Google Geocoding lookup
+        location = geocode_cache.lookup(city)
 
         # Ensure we got a valid result
-        if "results" not in data or not data["results"]:
+        if location is None:
             return jsonify({"error": "City not found."}), 404
 
-            # Extract latitude & longitude from response
-        location = data["results"][0]["geometry"]["location"]
-        user_lat = float(location["lat"])
-        user_lon = float(location["lng"])
+        user_lat, user_lon = location
         user_radius = int(radius) * 1609  # Convert miles to meters
         user_email = get_email_from_token()
 
 
-        conn = config()
-        if not conn:
-            return jsonify({"error": "Database Connection Error"}), 500
-        
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            # Check if the user already has a location
-            cur.execute("SELECT * FROM users WHERE email = %s", (user_email,))
-            user_exists = cur.fetchone()
-
-            if user_exists:
+        with db_pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 # Update existing location data
                 cur.execute("""
                     UPDATE users
                     SET lat = %s, long = %s, radius = %s, city = %s
                     WHERE email = %s
                 """, (user_lat, user_lon, user_radius, city, user_email))
-            else:
-                # Insert new location data
-                cur.execute("""
-                    INSERT INTO users (email, lat, long, radius, city)
-                    VALUES (%s, %s, %s, %s, %s)
-                """, (user_email, user_lat, user_lon, user_radius, city))
+                if cur.rowcount == 0:
+                    # Insert new location data
+                    cur.execute("""
+                        INSERT INTO users (email, lat, long, radius, city)
+                        VALUES (%s, %s, %s, %s, %s)
+                    """, (user_email, user_lat, user_lon, user_radius, city))
+                users_changed(cur, [user_email])
+                feed_versions.bump(cur, [feed_versions.user(user_email)])
 
-            conn.commit()
-        conn.close()
+                conn.commit()
+            user_state.invalidate(user_email)
 
             # Redirect to home page after updating location
         return jsonify({"message": "Location updated successfully!"}), 200
 
+    except GeocodeError:
+        return jsonify({"error": "Geocoding API error"}), 500
+    except UpstreamUnavailable:
+        return jsonify({"error": "Location lookup is unavailable right now, please try again shortly."}), 503
     except requests.exceptions.RequestException as e:
         return jsonify({"error": f"Request Error: {str(e)}"}), 500
+    except (psycopg2.Error, PoolTimeout) as e:
+        print(f"❌ Database Connection Error: {e}")
+        return jsonify({"error": "Database Connection Error"}), 500
 
-@app.route('/api/autocomplete', methods=['POST', 'OPTIONS'])
+@api.route('/api/autocomplete', methods=['POST', 'OPTIONS'])
 @cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://motomeet.xyz", "https://www.motomeet.xyz"], supports_credentials=True)
-@limiter.limit("30 per minute")
+# Answers served from the cache don't cost anything upstream, so they don't count against the limit
+@limiter.limit("30 per minute", deduct_when=lambda response: g.get("autocomplete_upstream", True))
 def autocomplete_proxy():
-    data = request.get_json()
-    response = requests.post(
-        "https://places.googleapis.com/v1/places:autocomplete",
-        headers={
-            "Content-Type": "application/json",
-            "X-Goog-Api-Key": GOOGLE_MAPS_API_KEY,
-            "X-Goog-FieldMask": "suggestions.placePrediction.text"
-        },
-        json=data
-    )
-    return jsonify(response.json())
-@app.route('/api/geocode', methods=['POST'])
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data, dict):
+        return jsonify({"error": "Body must be a JSON object"}), 400
+    try:
+        status, suggestions, source = autocomplete_cache.get(data)
+    except UpstreamUnavailable:
+        g.autocomplete_upstream = False
+        return jsonify({"suggestions": []}), 503
+    g.autocomplete_upstream = source == "miss"
+    return jsonify(suggestions)
+@api.route('/api/geocode', methods=['POST'])
 @cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
 def geocode():
     data = request.get_json()
@@ -275,22 +1050,17 @@ def geocode():
     if not address:
         return jsonify({"error": "No address provided"}), 400
 
-    params = {
-        "address": address,
-        "key": GOOGLE_MAPS_API_KEY
-    }
-
     try:
-        response = requests.get(GOOGLE_GEOCODE_URL, params=params)
-        results = response.json().get("results")
-        if not results:
+        location = geocode_cache.lookup(address)
+        if location is None:
             return jsonify({"error": "No results found"}), 404
 
-        location = results[0]["geometry"]["location"]
         return jsonify({
-            "lat": location["lat"],
-            "lng": location["lng"]
+            "lat": location[0],
+            "lng": location[1]
         })
+    except UpstreamUnavailable:
+        return jsonify({"error": "Geocoding is unavailable right now, please try again shortly."}), 503
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
@@ -299,25 +1069,25 @@ def get_email_from_token():
     if not token:
         return None
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return payload["email"]
+        return token_cache.email(token)
     except Exception as e:
         print("JWT error:", e)
         return None
 #Handles log ins
-@app.route('/api/login', methods=['POST'])
+@api.route('/api/login', methods=['POST'])
 def login():
-    print("WOW")
     data = request.get_json()
     email = data.get("email")
     if not email:
         return jsonify({"error": "Email is required"}), 400
     pwd = data.get("pwd")
-    print("C")
-    if authenticate(email, pwd):
+    try:
+        authenticated = authenticate(email, pwd)
+    except HasherBusy:
+        return hasher_busy_response()
+    if authenticated:
         token = jwt.encode({"email": email, "exp": datetime.utcnow() + timedelta(hours=5)  # expires in 1 day
         }, SECRET_KEY, algorithm="HS256")
-        print("WOW")
         resp = make_response(jsonify({"message":"User Authenticated!"}))
         resp.set_cookie(
             "access_token", token,
@@ -327,10 +1097,10 @@ def login():
             max_age=60*60
         )
         return resp
-@app.route('/api/home', methods=['GET', 'POST'])
+    return jsonify({"error": "Invalid email or password"}), 401
+@api.route('/api/home', methods=['GET', 'POST'])
 @cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://motomeet.xyz", "https://www.motomeet.xyz"], supports_credentials=True)
 def events():
-    print("Check 1")
     # POST = RSVP or unRSVP
     if request.method == "POST":
         data = request.get_json()
@@ -339,101 +1109,87 @@ def events():
         email = get_email_from_token()
         if not email:
             return jsonify({"error": "Email is required"}), 400
-        if email is None:
-            email = get_email_from_token()
-        if email is None:
-            print("email is none error")
-        print("PC2")
         try:
-            connection = config()
-            if not connection:
-                print("PC3")
-                raise Exception("Database Connection Error")
-            
-            with connection.cursor() as cur:
-                print(state)
-                if state:
-                    print("PC3")
-                    print("email:", email)
-                    print("rsvp_id:", rsvp_id)
-                    cur.execute("""
-                        INSERT INTO rsvps (user_email, event_id)
-                        VALUES (%s, %s)
-                        ON CONFLICT DO NOTHING;
-                    """, (email, rsvp_id))
-                    print("PC4")
-                else:
-                    cur.execute("""
-                        DELETE FROM rsvps
-                        WHERE user_email = %s AND event_id = %s;
-                    """, (email, rsvp_id))
-                print("PC5")
-                cur.execute("SELECT COUNT(*) FROM rsvps WHERE event_id = %s", (rsvp_id,))
-                print("PC6")
-                count = cur.fetchone()["count"]
-                print(count)
-                connection.commit()
-                cur.close()
-            connection.close()
+            with db_pool.connection() as connection:
+                with connection.cursor() as cur:
+                    event = set_rsvp(cur, email, rsvp_id, state)
+                    count = event["rsvp_count"] if event else 0
+                    scopes = [feed_versions.user(email)]
+                    if event:
+                        cell = feed_versions.cell(event["latitude"], event["longitude"])
+                        scopes.append(cell)
+                        live_hub.publish(cur, {
+                            "type": "rsvp", "event_id": str(rsvp_id), "rsvp_count": count,
+                            "cells": [cell], "email": email, "going": bool(state),
+                        })
+                    feed_versions.bump(cur, scopes)
+                    connection.commit()
+            # Other workers drop it when the rsvp message reaches them
+            user_state.invalidate(email)
+            if EVENT_INDEX_ENABLED:
+                event_index.set_rsvp_count(rsvp_id, count)
 
         except Exception as e:
             return jsonify({'error': f"❌ Database Error: {str(e)}"}), 500
-        print(count)
         return jsonify({'message': 'RSVP updated successfully!', 'rsvp_count': count})
-    print("C2")
     # GET = Render events page
     try:
-        print("✅ Hit /api/home")
+        # Sort and filters run in SQL, so the client only gets the slice it asked for
+        feed_query = FeedQuery.from_args(request.args)
+        after = feed_query.decode_cursor(request.args["after"]) if request.args.get("after") else None
+        limit = min(int(request.args.get("limit", FEED_PAGE_SIZE)), FEED_MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("Invalid limit")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    try:
         email = get_email_from_token()
-        print("✅ Decoded email:", email)
         if not email:
             return jsonify({"error": "Unauthorized"}), 401
-        connection = config()
-        print("C3")
-        if not connection:
-            print("misery")
-            raise Exception("Database Connection Error")
-        print("C3.5")
-        with connection.cursor() as cur:
-            # User info
-            cur.execute("SELECT * FROM users WHERE email = %s", (email,))
-            data = cur.fetchone()
-            print("c4")
-            # Events this user is going to
-            cur.execute("SELECT event_id FROM rsvps WHERE user_email = %s", (email,))
-            print("C5")
-            rsvp_rows = cur.fetchall()
-            print("C6")
-            print(rsvp_rows)
-            print([row["event_id"] for row in rsvp_rows])
-            events_going = [row["event_id"] for row in rsvp_rows]
-            print("C7")
+        feed_query.viewer = email
+        cache_key = ("home", email, request.args.get("after"), limit, feed_query.cache_key())
+        with db_pool.connection() as connection:
+            with connection.cursor() as cur:
+                cached = get_cached_response(cur, cache_key)
+                connection.commit()
+                if cached is not None:
+                    return cached_json_response(cached)
+
+                # One snapshot for the data and its version, so we never cache stale data under a new version
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+
+            fresh = False
+            while True:
+                # Rider state from memory when we have it, otherwise with the nearby events in one round trip
+                index_generation = event_index.generation
+                feed = load_home_feed(connection, email, after, limit, fresh, feed_query)
+                if feed is None:
+                    return jsonify({'error': "User not found"}), 404
+                data, nearby_events, next_cursor, from_cache, from_index = feed
+
+                name = data.n
+                city = data.city
+                user_lat = data.lat
+                user_lon = data.long
+                radius = data.radius  # default 50 miles
+
+                if not user_lat or not user_lon:
+                    return jsonify({'error': "User Location not found"}), 404
+
+                with connection.cursor() as cur:
+                    scopes = [feed_versions.user(email)] + feed_versions.cells_within(user_lat, user_lon, radius)
+                    versions = feed_versions.versions(cur, scopes)
+                # Changed on another worker and we haven't heard yet: read it again in this snapshot
+                if not from_cache or versions.get(scopes[0], 0) == data.version:
+                    break
+                fresh = True
+            version = feed_versions.stamp(versions)
             connection.commit()
-            cur.close()
-        connection.close()
 
     except Exception as e:
         return jsonify({'error': f"❌ Database Error: {str(e)}"}), 500
 
-    # Store user info in session
-    name = data.get("n")
-    made = data.get("made_events")
-    make = data.get("make")
-    model = data.get("model")
-
-    # Location
-    user_lat = data.get('lat')
-    user_lon = data.get('long')
-    radius = data.get('radius', 80467)  # default 50 miles
-    city = data.get('city')
-
-    if not user_lat or not user_lon:
-        return jsonify({'error': "User Location not found"}), 404
-
-    # Nearby events
-    nearby_events = get_nearby_events(user_lat, user_lon, radius)
-
-    return jsonify({
+    body = jsonify({
         "n": name,
         "email": email,
         "events": nearby_events,
@@ -441,51 +1197,302 @@ def events():
         "radius": int(radius / 1609),
         "lat": user_lat,
         "long": user_lon,
-        "events_going": events_going,
+        "events_going": list(data.going),
+        "next_cursor": next_cursor,
+    }).get_data()
+    # The feed also changes when its earliest event starts and drops out
+    valid_until = min(e["event_time"] for e in nearby_events).timestamp() if nearby_events else None
+    if from_index:
+        # The index catches up on writes after they commit, so its page may predate these versions:
+        # send it, but don't keep it, and tie its ETag to the index generation it was read at
+        return cached_json_response(response_cache.entry(
+            cache_key, scopes, f"{version}:{index_generation}", body, valid_until))
+    return cached_json_response(response_cache.put(cache_key, scopes, version, body, valid_until))
+
+
+
+# Rows per round trip of the streaming feed's server-side cursor
+FEED_STREAM_BATCH = int(os.getenv("FEED_STREAM_BATCH", 200))
+
+def stream_nearby_events(user_lat, user_lon, radius):
+    """Yield NDJSON chunks of nearby events in feed order, one batch at a time."""
+    if EVENT_INDEX_ENABLED and event_index.ready:
+        events = event_index.nearby(user_lat, user_lon, radius)
+        for i in range(0, len(events), FEED_STREAM_BATCH):
+            yield b"".join(current_app.json.encode(e) + b"\n" for e in events[i:i + FEED_STREAM_BATCH])
+        return
+
+    query, params = nearby_events_sql("ST_MakePoint(%(lon)s, %(lat)s)", "%(radius)s")
+    params.update({"lon": user_lon, "lat": user_lat, "radius": radius})
+    with db_pool.connection() as conn:
+        # A named cursor keeps the result set on the server, so memory stays at one batch
+        with conn.cursor(name="feed_stream") as cur:
+            cur.itersize = FEED_STREAM_BATCH
+            cur.execute(query, params)
+            while True:
+                rows = cur.fetchmany(FEED_STREAM_BATCH)
+                if not rows:
+                    break
+                yield b"".join(current_app.json.encode(row) + b"\n" for row in rows)
+        conn.commit()
+
+@api.route('/api/rsvp/batch', methods=['POST'])
+@cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://motomeet.xyz", "https://www.motomeet.xyz"], supports_credentials=True)
+@limiter.limit("10 per minute")
+def rsvp_batch():
+    """Apply many RSVP toggles at once.
+
+    Body: {"rsvps": [{"event_id": ..., "state": true|false}, ...]}. Returns the
+    new count for every event that still exists, plus the ids that don't.
+    """
+    email = get_email_from_token()
+    if not email:
+        return jsonify({"error": "Unauthorized"}), 401
+    body = request.get_json(silent=True) or {}
+    items = body.get("rsvps") if isinstance(body, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "rsvps must be a non-empty list"}), 400
+    if len(items) > RSVP_BATCH_MAX:
+        return jsonify({"error": f"At most {RSVP_BATCH_MAX} RSVPs per request"}), 400
+    try:
+        event_ids = [str(uuid.UUID(str(item["event_id"]))) for item in items]
+        states = [item["state"] for item in items]
+        # bool("false") is True, so only real JSON booleans count
+        if not all(isinstance(state, bool) for state in states):
+            raise ValueError("state must be true or false")
+    except (TypeError, KeyError, ValueError):
+        return jsonify({"error": "Each RSVP needs a valid event_id and a state of true or false"}), 400
+
+    try:
+        with db_pool.connection() as connection:
+            with connection.cursor() as cur:
+                cur.execute(RSVP_BATCH_SQL, {"email": email, "event_ids": event_ids, "states": states})
+                updated = cur.fetchall()
+                scopes = [feed_versions.user(email)]
+                for event in updated:
+                    cell = feed_versions.cell(event["latitude"], event["longitude"])
+                    scopes.append(cell)
+                    live_hub.publish(cur, {
+                        "type": "rsvp", "event_id": event["event_id"], "rsvp_count": event["rsvp_count"],
+                        "cells": [cell], "email": email, "going": event["going"],
+                    })
+                feed_versions.bump(cur, scopes)
+                connection.commit()
+    except Exception as e:
+        return jsonify({'error': f"❌ Database Error: {str(e)}"}), 500
+
+    user_state.invalidate(email)
+    if EVENT_INDEX_ENABLED:
+        for event in updated:
+            event_index.set_rsvp_count(event["event_id"], event["rsvp_count"])
+    found = {event["event_id"] for event in updated}
+    return jsonify({
+        "message": "RSVPs updated successfully!",
+        "results": [
+            {"event_id": e["event_id"], "rsvp_count": e["rsvp_count"], "going": e["going"]} for e in updated
+        ],
+        "missing": sorted(set(event_ids) - found),
     })
 
+@api.route('/api/home/stream', methods=['GET'])
+@cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
+def events_stream():
+    """Every nearby upcoming event as newline-delimited JSON, oldest first."""
+    email = get_email_from_token()
+    if not email:
+        return jsonify({"error": "Unauthorized"}), 401
+    try:
+        data = get_user_state(email)
+    except Exception as e:
+        return jsonify({'error': f"❌ Database Error: {str(e)}"}), 500
+    if data is None:
+        return jsonify({'error': "User not found"}), 404
+    if not data.lat or not data.long:
+        return jsonify({'error': "User Location not found"}), 404
+
+    resp = Response(
+        stream_with_context(stream_nearby_events(data.lat, data.long, data.radius)),
+        mimetype="application/x-ndjson",
+    )
+    resp.headers["Cache-Control"] = "private, no-store"
+    # Stop nginx-style proxies from buffering the whole stream
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
+
+def resolve_live_update(message):
+    """Runs once per change on each worker's listener thread: keeps this worker's
+    event index and rider cache current and attaches the feed row for new or
+    edited events."""
+    event_id = message.get("event_id")
+    index_live = EVENT_INDEX_ENABLED and event_index.ready
+    if message["type"] == "users":
+        user_state.invalidate(*message["emails"])
+    elif message["type"] == "resync":
+        # We may have missed invalidations while disconnected
+        user_state.clear()
+    elif message["type"] == "bulk":
+        if index_live:
+            event_index.build_in_background()
+    elif message["type"] == "rsvp":
+        user_state.invalidate(message["email"])
+        if index_live:
+            event_index.set_rsvp_count(event_id, message["rsvp_count"])
+    elif message["type"] == "cancelled":
+        if index_live:
+            event_index.remove_event(event_id)
+    else:
+        rows = load_upcoming_events(event_id)
+        if index_live:
+            event_index.refresh_event(event_id, rows)
+        message["event"] = {k: v for k, v in rows[0].items() if not k.startswith("_")} if rows else None
+    return message
+
+LIVE_UPDATES_ENABLED = os.getenv("LIVE_UPDATES_ENABLED", "1") == "1"
+# Each open stream holds a server thread, so cap them per worker (gunicorn.conf.py
+# sets this below the thread count under gthread)
+LIVE_MAX_CLIENTS = int(os.getenv("LIVE_MAX_CLIENTS", 200))
+LIVE_HEARTBEAT = float(os.getenv("LIVE_HEARTBEAT", 15))
+live_hub = LiveHub(config, resolve=resolve_live_update, max_queue=int(os.getenv("LIVE_QUEUE_SIZE", 100)))
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance on the same sphere the feed query uses."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+def sse(kind, data):
+    return f"event: {kind}\ndata: {current_app.json.encode(data).decode()}\n\n"
+
+@api.route('/api/live', methods=['GET'])
+@cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
+@limiter.limit("20 per minute")
+def live_updates():
+    """Server-sent events with RSVP counts and event changes in the rider's area.
+
+    Events: `rsvp` {event_id, rsvp_count}, `created`/`updated` {event_id, event},
+    `removed` {event_id} (cancelled or moved out of range) and `resync`, after
+    which the client should refetch the feed because updates may have been missed.
+    """
+    email = get_email_from_token()
+    if not email:
+        return jsonify({"error": "Unauthorized"}), 401
+    if not LIVE_UPDATES_ENABLED:
+        return jsonify({"error": "Live updates are disabled"}), 404
+    if len(live_hub) >= LIVE_MAX_CLIENTS:
+        resp = make_response(jsonify({"error": "Too many live connections, please try again shortly."}), 503)
+        resp.headers["Retry-After"] = "30"
+        return resp
+    try:
+        data = get_user_state(email)
+    except Exception as e:
+        return jsonify({'error': f"❌ Database Error: {str(e)}"}), 500
+    if data is None:
+        return jsonify({'error': "User not found"}), 404
+    if not data.lat or not data.long:
+        return jsonify({'error': "User Location not found"}), 404
+
+    user_lat, user_lon, radius = data.lat, data.long, data.radius
+    sub = live_hub.subscribe(email, feed_versions.cells_within(user_lat, user_lon, radius), data.going)
 
+    def stream():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                if sub.overflowed:
+                    yield sse("resync", {})
+                    return
+                try:
+                    message = sub.queue.get(timeout=LIVE_HEARTBEAT)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                kind, event_id = message["type"], message.get("event_id")
+                if kind in ("resync", "bulk"):
+                    yield sse("resync", {})
+                elif kind == "rsvp":
+                    yield sse("rsvp", {"event_id": event_id, "rsvp_count": message["rsvp_count"]})
+                elif kind == "cancelled":
+                    yield sse("removed", {"event_id": event_id})
+                else:
+                    event = message.get("event")
+                    if event is not None:
+                        event = dict(event, distance=distance_m(user_lat, user_lon, event["latitude"], event["longitude"]))
+                    # Only what the feed would show: in range, or something the rider is going to
+                    if event is None or (event["distance"] > radius and event_id not in sub.event_ids):
+                        yield sse("removed", {"event_id": event_id})
+                    else:
+                        yield sse(kind, {"event_id": event_id, "event": event})
+        finally:
+            live_hub.unsubscribe(sub)
+
+    resp = Response(stream_with_context(stream()), mimetype="text/event-stream")
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"
+    return resp
 
-@app.route('/api/profile', methods=['GET','POST'])
+@api.route('/api/profile', methods=['GET','POST'])
 @cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
 def user_profile():
-    print("C1")
     email = get_email_from_token()
-    print(email)
     try:
-        print("C2")
-        connection = config()
-        with connection.cursor() as cur:
-            print("C3")
-            cur.execute("""
-                SELECT e.*, u.n AS host_name
-                FROM events e
-                JOIN users u ON e.host_email = u.email
-                WHERE e.event_uuid = ANY (
-                    SELECT event_id FROM rsvps WHERE user_email = %s
-                )
-            """, (email,))
-            events_going = cur.fetchall()  # <-- ✅ This line is the fix
-            print("C4")
-            cur.execute("SELECT make, model, n, city, radius, made_events FROM users WHERE email = %s", (email,))
-            data = cur.fetchone()
-            print("C5")
-        cur.close()
-        connection.close()
+        cache_key = ("profile", email)
+        with db_pool.connection() as connection:
+            with connection.cursor() as cur:
+                cached = get_cached_response(cur, cache_key)
+                connection.commit()
+                if cached is not None:
+                    return cached_json_response(cached)
+
+                cur.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+                fresh = False
+                while True:
+                    data = None if fresh else user_state.get(email)
+                    from_cache = data is not None
+                    if data is None:
+                        data = get_user_state(email, cur, fresh=True)
+                    # Upcoming events from the hot tables, finished ones from the archive
+                    statements.execute(cur, "profile_events", """
+                        SELECT e.host_email, e.event_uuid, e.event_name, e.event_time, e.location,
+                               e.latitude, e.longitude, e.description, e.rsvp_count, u.n AS host_name
+                        FROM events e
+                        JOIN users u ON e.host_email = u.email
+                        WHERE e.event_uuid = ANY (%(going)s::uuid[])
+                        UNION ALL
+                        SELECT a.host_email, a.event_uuid, a.event_name, a.event_time, a.location,
+                               a.latitude, a.longitude, a.description, a.rsvp_count, u.n AS host_name
+                        FROM events_archive a
+                        JOIN users u ON a.host_email = u.email
+                        WHERE a.event_uuid = ANY (
+                            SELECT event_id FROM rsvps_archive WHERE user_email = %(email)s
+                        )
+                        ORDER BY event_time
+                    """, {"email": email, "going": [uuid.UUID(event_id) for event_id in data.going]})
+                    events_going = cur.fetchall()  # <-- ✅ This line is the fix
+                    scopes = [feed_versions.user(email)] + [
+                        feed_versions.cell(e["latitude"], e["longitude"]) for e in events_going
+                    ]
+                    versions = feed_versions.versions(cur, scopes)
+                    # Same check as the home feed: a cached rider that changed elsewhere gets re-read
+                    if not from_cache or versions.get(scopes[0], 0) == data.version:
+                        break
+                    fresh = True
+                version = feed_versions.stamp(versions)
+            connection.commit()
+
+        body = jsonify({
+            "name": data.n,
+            "email": email,
+            "events":events_going,
+            "city": data.city,
+            "radius": int(data.radius / 1609),
+            "make": data.make,
+            "model": data.model
+        }).get_data()
     except Exception as e:
         return jsonify({'error': "User Profile not found"}), 404
-    print(events_going)
-    
-    return jsonify({
-        "name": data["n"],
-        "email": email,
-        "events":events_going,
-        "city": data["city"],
-        "radius": int(data["radius"] / 1609),
-        "make": data["make"],
-        "model": data["model"]
-    })
-@app.route('/api/verify', methods=['GET'])
+
+    return cached_json_response(response_cache.put(cache_key, scopes, version, body))
+@api.route('/api/verify', methods=['GET'])
 @cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
 def verify_session():
     email = get_email_from_token()
@@ -493,7 +1500,7 @@ def verify_session():
         return jsonify({"message": "Authenticated"}), 200
     return jsonify({"error": "Unauthorized"}), 401
 
-@app.route('/api/create_event', methods=['POST'])
+@api.route('/api/create_event', methods=['POST'])
 @cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
 @limiter.limit("3 per minute")
 def create_event():
@@ -511,39 +1518,84 @@ def create_event():
         return jsonify({"error": "Invalid Coordinates"}), 400
     new_event_description = data.get("description")
     
-    print(f"PLEASE {new_event_long}")
-    print(f'{new_event_name} {new_event_time} {new_event_loc} {new_event_lat} {new_event_long}')
     email = get_email_from_token()
     if not email:
         return jsonify({"error": "Unauthorized"}), 401
     # We need to update the users and events table accordingly
-    conn = config()
-    cursor = conn.cursor()
-    cursor.execute("""
-    INSERT INTO events (event_name, event_time, location, latitude, longitude, host_email, description)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
-    RETURNING event_uuid
-    """, (new_event_name, new_event_time, new_event_loc, new_event_lat, new_event_long, email, new_event_description))
-
-    new_event_uuid = cursor.fetchone()["event_uuid"]
-    cursor.execute("""
-        UPDATE users
-        SET made_events = array_append(made_events, %s)
-        WHERE email = %s
-    """, (new_event_uuid, email))
-    cursor.execute("""
-        INSERT INTO rsvps (user_email, event_id)
-        VALUES (%s, %s)
-        ON CONFLICT DO NOTHING;
-    """, (email, new_event_uuid))
-    conn.commit()
+    with db_pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("""
+            INSERT INTO events (event_name, event_time, location, latitude, longitude, host_email, description)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            RETURNING event_uuid
+            """, (new_event_name, new_event_time, new_event_loc, new_event_lat, new_event_long, email, new_event_description))
+
+            new_event_uuid = cursor.fetchone()["event_uuid"]
+            set_rsvp(cursor, email, new_event_uuid, True)
+            job_queue.enqueue(cursor, "made_events", {"op": "add", "email": email, "event_id": str(new_event_uuid)})
+            cell = feed_versions.cell(new_event_lat, new_event_long)
+            live_hub.publish(cursor, {"type": "created", "event_id": str(new_event_uuid), "cells": [cell]})
+            users_changed(cursor, [email])
+            feed_versions.bump(cursor, [feed_versions.user(email), cell])
+        conn.commit()
+    user_state.invalidate(email)
     # Then, the events should show!
-    cursor.close()
-    conn.close()
-    print(new_event_uuid)
+    event_index_changed(new_event_uuid)
     return jsonify({"message": "Event created successfully!", "event_id": new_event_uuid}), 200
 
-@app.route("/api/news", methods=["GET"])
+event_importer = EventImporter(max_rows=int(os.getenv("IMPORT_MAX_ROWS", 1000)))
+
+@api.route('/api/events/import', methods=['POST'])
+@cross_origin(origins=["http://localhost:5173","https://moto-meet.vercel.app", "https://www.motomeet.xyz"], supports_credentials=True)
+@limiter.limit("5 per hour")
+def import_events():
+    """Bulk-create events hosted by the signed-in rider from a CSV or NDJSON body.
+
+    Columns: event_name, event_time (ISO 8601), location, lat, lng, description.
+    Good rows are imported and bad ones reported, unless ?strict=1, in which
+    case any bad row means nothing is imported.
+    """
+    email = get_email_from_token()
+    if not email:
+        return jsonify({"error": "Unauthorized"}), 401
+    fmt = request.args.get("format") or ("csv" if request.mimetype == "text/csv" else "ndjson")
+    if fmt not in ("csv", "ndjson"):
+        return jsonify({"error": "format must be csv or ndjson"}), 400
+    strict = request.args.get("strict") == "1"
+
+    imported = []
+    try:
+        # Read and validate the whole upload before taking a connection; a slow client only holds a thread
+        with event_importer.stage(read_rows(request.stream, fmt), strict) as staged:
+            report = staged.report
+            if staged.ready:
+                with db_pool.connection() as conn:
+                    with conn.cursor() as cur:
+                        imported = event_importer.merge(cur, email, staged)
+                        cells = sorted({feed_versions.cell(r["latitude"], r["longitude"]) for r in imported})
+                        if imported:
+                            # One job for the host's made_events, like create_event queues per event
+                            job_queue.enqueue(cur, "made_events", {
+                                "op": "add", "email": email, "event_ids": [r["event_id"] for r in imported],
+                            })
+                            # One message for the whole batch; streams in these cells refetch
+                            live_hub.publish(cur, {"type": "bulk", "cells": cells})
+                            users_changed(cur, [email])
+                            feed_versions.bump(cur, [feed_versions.user(email)] + cells)
+                    conn.commit()
+        if imported:
+            user_state.invalidate(email)
+    except UnicodeDecodeError:
+        return jsonify({"error": "Body must be UTF-8"}), 400
+    except Exception as e:
+        return jsonify({'error': f"❌ Database Error: {str(e)}"}), 500
+
+    if imported and EVENT_INDEX_ENABLED and event_index.ready:
+        event_index.build_in_background()
+    status = 422 if strict and report["errors"] else 200
+    return jsonify(report), status
+
+@api.route("/api/news", methods=["GET"])
 def news():
     updates = [
         {
@@ -560,7 +1612,7 @@ def news():
     ]
     return jsonify(updates), 200
 
-@app.route('/api/update_event', methods=['POST'])
+@api.route('/api/update_event', methods=['POST'])
 def update_event():
     data = request.get_json()
 
@@ -572,22 +1624,39 @@ def update_event():
     lng = float(data.get("lng"))
     description = data.get("description", "")
     
-    conn = config()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE events
-        SET event_name = %s, event_time = %s, location = %s, latitude = %s, longitude = %s, description = %s
-        WHERE event_uuid = %s
-    """, (name, time, location, lat, lng, description, event_id))
-
-    conn.commit()
-    cursor.close()
-    conn.close()
-    return jsonify(message="Event updated!")
+    with db_pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT latitude, longitude FROM events WHERE event_uuid = %s FOR UPDATE", (event_id,))
+            old = cursor.fetchone()
+            cursor.execute("""
+                UPDATE events
+                SET event_name = %s, event_time = %s, location = %s, latitude = %s, longitude = %s, description = %s
+                WHERE event_uuid = %s
+                RETURNING host_email, event_name, event_time, location
+            """, (name, time, location, lat, lng, description, event_id))
+            updated = cursor.fetchone()
+            if updated:
+                job_queue.enqueue(cursor, "notify_event_changed", {
+                    "change": "updated",
+                    "event_id": event_id,
+                    "host_email": updated["host_email"],
+                    "event_name": updated["event_name"],
+                    "event_time": updated["event_time"].isoformat(),
+                    "location": updated["location"],
+                })
+            # Both the area the event left and the one it moved to see the change
+            scopes = [feed_versions.cell(lat, lng)]
+            if old:
+                scopes.append(feed_versions.cell(old["latitude"], old["longitude"]))
+            if updated:
+                live_hub.publish(cursor, {"type": "updated", "event_id": str(event_id), "cells": scopes})
+            feed_versions.bump(cursor, scopes)
 
-#TODO: Once an event has been cancelled or edited, send an alert email to everyone rsvped
+        conn.commit()
+    event_index_changed(event_id)
+    return jsonify(message="Event updated!")
 
-@app.route('/api/logout', methods=["POST"])
+@api.route('/api/logout', methods=["POST"])
 def logout():
     resp = make_response(jsonify({"message": "Logged out"}))
     resp.set_cookie(
@@ -600,44 +1669,91 @@ def logout():
     return resp
 
 
-@app.route('/api/cancel_event', methods=["POST"])
+@api.route('/api/cancel_event', methods=["POST"])
 def cancel_event():
-    print("ow")
     data = request.get_json()
     cancelled_event_id = data.get("event_id")
-    print(cancelled_event_id)
     if not cancelled_event_id:
         return jsonify({"error": "Missing event_id"}), 400
 
-    conn = config()
-    cursor = conn.cursor()
-
     try:
-        # Remove RSVPs
-        print("cancel Event check 3")
-        cursor.execute("DELETE FROM rsvps WHERE event_id = %s", (cancelled_event_id,))
-
-        # Delete the event itself
-        cursor.execute("DELETE FROM events WHERE event_uuid = %s", (cancelled_event_id,))
-
-        # Clean up made_events array in users table
-        cursor.execute("""
-            UPDATE users
-            SET made_events = (
-                SELECT ARRAY_AGG(eid)
-                FROM unnest(made_events) AS eid
-                WHERE eid IN (SELECT event_uuid FROM events)
-            );
-        """)
+        with db_pool.connection() as conn:
+            with conn.cursor() as cursor:
+                # Remove RSVPs
+                cursor.execute("DELETE FROM rsvps WHERE event_id = %s RETURNING user_email", (cancelled_event_id,))
+                riders = [row["user_email"] for row in cursor.fetchall()]
+                scopes = [feed_versions.user(rider) for rider in riders]
+
+                # Delete the event itself
+                cursor.execute("""
+                    DELETE FROM events WHERE event_uuid = %s
+                    RETURNING host_email, latitude, longitude, event_name, event_time, location
+                """, (cancelled_event_id,))
+                cancelled = cursor.fetchone()
+                if cancelled:
+                    scopes.append(feed_versions.user(cancelled["host_email"]))
+                    scopes.append(feed_versions.cell(cancelled["latitude"], cancelled["longitude"]))
+
+                    # made_events cleanup and the emails happen after we've answered
+                    job_queue.enqueue(cursor, "made_events", {
+                        "op": "remove", "email": cancelled["host_email"], "event_id": cancelled_event_id,
+                    })
+                    job_queue.enqueue(cursor, "notify_event_changed", {
+                        "change": "cancelled",
+                        "event_id": cancelled_event_id,
+                        "host_email": cancelled["host_email"],
+                        "event_name": cancelled["event_name"],
+                        "event_time": cancelled["event_time"].isoformat(),
+                        "location": cancelled["location"],
+                        "recipients": riders,
+                    })
+                    live_hub.publish(cursor, {
+                        "type": "cancelled", "event_id": str(cancelled_event_id), "cells": [scopes[-1]],
+                    })
+                    users_changed(cursor, riders + [cancelled["host_email"]])
+                feed_versions.bump(cursor, scopes)
 
-        conn.commit()
+            conn.commit()
+        if cancelled:
+            user_state.invalidate(*riders, cancelled["host_email"])
+        event_index_changed(cancelled_event_id, removed=True)
         return jsonify({"message": "Event canceled successfully!"}), 200
     except Exception as e:
-        conn.rollback()
+        # The pool rolls back whatever was left uncommitted
         return jsonify({"error": str(e)}), 500
-    finally:
-        cursor.close()
-        conn.close()
+
+def create_app():
+    """Build the Flask app. Pools, caches and the hasher are per-process module
+    state that's created lazily, so this is safe to call before forking."""
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    CORS(app, supports_credentials=True, origins=ALLOWED_ORIGINS)
+    app.config["SESSION_TYPE"] = "filesystem"  # Store sessions on the server
+    limiter.init_app(app)
+    app.register_blueprint(api)
+    return app
+
+def warm_worker(block=False):
+    """Per-process start-up: open the pool's minimum connections and load the
+    event index. With block=False the index builds in the background and the
+    feed uses SQL until it's ready."""
+    db_pool.warm()
+    db_pool.watch_leaks(float(os.getenv("DB_POOL_LEAK_CHECK_EVERY", 30)))
+    if EVENT_INDEX_ENABLED:
+        if block:
+            event_index.build()
+        else:
+            event_index.build_in_background()
+    # Other workers' writes reach this worker's index and rider cache through the listener
+    live_hub.start()
+
+def shutdown_worker():
+    """Release this process's connections and hashing workers."""
+    password_hasher.shutdown()
+    db_pool.close_all()
 
 if __name__ == '__main__':
+    # Development server; production runs gunicorn with gunicorn.conf.py
+    app = create_app()
+    warm_worker(block=True)
     app.run()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import smtplib
+from email.message import EmailMessage
+
+
+class Mailer:
+    """Sends plain-text mail over SMTP, reusing one connection per batch.
+
+    With no `host` configured it only logs what it would send. Point it at a
+    local stand-in (for example `python -m aiosmtpd -n -l localhost:1025`)
+    with SMTP_HOST/SMTP_PORT and SMTP_STARTTLS=0 to try it out.
+    """
+
+    def __init__(self, host=None, port=587, sender="MotoMeet <no-reply@motomeet.xyz>",
+                 username=None, password=None, starttls=True, timeout=10.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+
+    def _message(self, recipient, subject, body):
+        msg = EmailMessage()
+        msg["From"] = self.sender
+        msg["To"] = recipient
+        msg["Subject"] = subject
+        msg.set_content(body)
+        return msg
+
+    def send_batch(self, recipients, subject, body, on_sent):
+        """Mail everyone in `recipients` over one connection, calling on_sent(recipient)
+        after each accepted message. Stops at the first failure by raising."""
+        if not self.host:
+            for recipient in recipients:
+                print(f"📧 (not sent, SMTP_HOST unset) {recipient}: {subject}")
+                on_sent(recipient)
+            return
+
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.username:
+                smtp.login(self.username, self.password)
+            for recipient in recipients:
+                smtp.send_message(self._message(recipient, subject, body))
+                on_sent(recipient)
@@ -0,0 +1,101 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Every hashing slot is taken; the caller should answer 503."""
+
+
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=rounds)).decode()
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode(), hashed.encode())
+
+
+class PasswordHasher:
+    """Runs bcrypt in a process pool so logins use every core and don't hold
+    request threads on CPU. At most `max_pending` hashes are queued or running;
+    beyond that callers wait up to `queue_timeout` seconds and then get HasherBusy.
+    `workers` defaults to every core, which is right for one process; with
+    several server processes on a host give each its share (gunicorn.conf.py
+    sets BCRYPT_WORKERS to cores // workers).
+    """
+
+    def __init__(self, rounds=12, workers=None, max_pending=None, queue_timeout=1.0):
+        self.rounds = rounds
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.queue_timeout = queue_timeout
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+
+    def _get_executor(self):
+        # Created lazily and per process, so a pre-forking server never shares one
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                self._pid = os.getpid()
+            return self._executor
+
+    def _reset(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _run_once(self, fn, *args):
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy("Password hashing is saturated")
+        try:
+            executor = self._get_executor()
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._slots.release()
+            self._reset(executor)
+            raise
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            self._reset(executor)
+            raise
+
+    def _run(self, fn, *args):
+        try:
+            return self._run_once(fn, *args)
+        except BrokenProcessPool:
+            # A child died (OOM, segfault) and broke the pool for good; retry once on a new one
+            return self._run_once(fn, *args)
+
+    def hash(self, password):
+        return self._run(_hash, password, self.rounds)
+
+    def check(self, password, hashed):
+        return self._run(_check, password, hashed)
+
+    def needs_rehash(self, hashed):
+        """True when `hashed` was made with a different work factor than the current one."""
+        try:
+            return int(hashed.split("$")[2]) != self.rounds
+        except (IndexError, ValueError):
+            return False
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,127 @@
+import re
+import threading
+import time
+import weakref
+
+from psycopg2 import errors
+
+from metrics import Metrics
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+_NAME = re.compile(r"[a-z_][a-z0-9_]*")
+
+
+class _Statement:
+    __slots__ = ("name", "sql", "text", "names", "positional", "execute_sql")
+
+    def __init__(self, name, sql):
+        if not _NAME.fullmatch(name):
+            raise ValueError(f"Bad statement name {name!r}")
+        self.name = name
+        self.sql = sql
+        self.names = []          # parameter names in $n order, for %(name)s queries
+        self.positional = 0      # number of %s placeholders
+        self.text = _PLACEHOLDER.sub(self._number, sql)
+        if self.names and self.positional:
+            raise ValueError(f"{name}: can't mix %s and %(name)s placeholders")
+        count = len(self.names) or self.positional
+        args = ", ".join(["%s"] * count)
+        self.execute_sql = f"EXECUTE {name} ({args})" if count else f"EXECUTE {name}"
+
+    def _number(self, match):
+        if match.group(0) == "%%":
+            return "%"
+        if match.group(1) is None:
+            self.positional += 1
+            return f"${self.positional}"
+        if match.group(1) not in self.names:
+            self.names.append(match.group(1))
+        return f"${self.names.index(match.group(1)) + 1}"
+
+    def values(self, params):
+        if self.names:
+            return [params[name] for name in self.names]
+        return list(params or ())
+
+
+class StatementRegistry:
+    """Runs hot queries as server-side prepared statements.
+
+    A query is parsed once per pooled connection (PREPARE) and then run with
+    EXECUTE, so Postgres skips parsing and, once it settles on a generic plan,
+    planning. Call sites keep their psycopg2 SQL: `execute(cur, name, sql,
+    params)` converts %s / %(name)s placeholders to $n the first time a name is
+    seen. Which connections have which statements is tracked per connection
+    object, so a reconnected or replaced connection just prepares again.
+
+    Prepared statements are per session, so this doesn't work behind a
+    transaction-mode pooler like PgBouncer; turn it off there.
+    """
+
+    def __init__(self, enabled=True, metrics=None):
+        self.enabled = enabled
+        self.metrics = metrics or Metrics(enabled=False)
+        self._statements = {}
+        self._prepared = weakref.WeakKeyDictionary()  # connection -> {name}
+        self._stats = {}   # name -> [executions, prepares, seconds]
+        self._lock = threading.Lock()
+
+    def _statement(self, name, sql):
+        stmt = self._statements.get(name)
+        if stmt is None:
+            with self._lock:
+                stmt = self._statements.setdefault(name, _Statement(name, sql))
+        if stmt.sql != sql:
+            raise ValueError(f"Statement {name!r} is already registered with different SQL")
+        return stmt
+
+    def _count(self, name, executions=0, prepares=0, seconds=0.0):
+        with self._lock:
+            stats = self._stats.get(name)
+            if stats is None:
+                stats = self._stats[name] = [0, 0, 0.0]
+            stats[0] += executions
+            stats[1] += prepares
+            stats[2] += seconds
+
+    def execute(self, cur, name, sql, params=None):
+        """Run `sql` with `params` on `cur` as prepared statement `name`."""
+        if not self.enabled:
+            cur.execute(sql, params)
+            return
+        stmt = self._statement(name, sql)
+        conn = cur.connection
+        with self._lock:
+            prepared = self._prepared.get(conn)
+            if prepared is None:
+                prepared = self._prepared[conn] = set()
+
+        if name not in prepared:
+            cur.execute(f"PREPARE {name} AS {stmt.text}")
+            prepared.add(name)
+            self._count(name, prepares=1)
+
+        started = time.perf_counter()
+        try:
+            cur.execute(stmt.execute_sql, stmt.values(params))
+        except errors.InvalidSqlStatementName:
+            # Something dropped them (DISCARD ALL, a pooler swapping sessions); prepare again next time
+            with self._lock:
+                self._prepared.pop(conn, None)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self._count(name, 1, 0, elapsed)
+            self.metrics.observe("db_statement_seconds", elapsed, statement=name)
+
+    def forget(self, conn):
+        """Drop what we know about `conn`, e.g. after running DISCARD ALL on it."""
+        with self._lock:
+            self._prepared.pop(conn, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {"executions": s[0], "prepares": s[1], "seconds_total": round(s[2], 6)}
+                for name, s in sorted(self._stats.items())
+            }
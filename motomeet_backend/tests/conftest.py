@@ -0,0 +1,10 @@
+import os
+import sys
+
+# The backend is a flat set of modules, not a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Enough config for `import motomeet` without a .env; the DB pool connects lazily
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-that-is-long-enough-for-hs256")
+os.environ.setdefault("RATELIMIT_STORAGE_URI", "memory://")
+os.environ.setdefault("PREPARED_STATEMENTS", "1")
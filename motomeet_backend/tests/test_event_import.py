@@ -0,0 +1,91 @@
+import contextlib
+import json
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+
+import motomeet
+from event_import import validate_row
+
+NOW = datetime(2030, 1, 1, 12, tzinfo=timezone.utc)
+
+
+def row(event_time):
+    return {"event_name": "Canyon run", "event_time": event_time, "location": "Alice's", "lat": "37.4", "lng": "-122.2"}
+
+
+def test_naive_time_is_written_as_utc():
+    # COPY into timestamptz would read a naive time in the session zone, not the UTC it was validated as
+    assert validate_row(row("2030-01-02T09:30:00"), NOW)[1] == "2030-01-02T09:30:00+00:00"
+
+
+def test_zoned_time_keeps_its_offset():
+    assert validate_row(row("2030-01-02T09:30:00-07:00"), NOW)[1] == "2030-01-02T09:30:00-07:00"
+
+
+@pytest.mark.parametrize("when", [NOW - timedelta(minutes=1), (NOW - timedelta(minutes=1)).replace(tzinfo=None)])
+def test_past_times_are_rejected(when):
+    with pytest.raises(ValueError, match="in the past"):
+        validate_row(row(when.isoformat()), NOW)
+
+
+def ndjson(*rows):
+    return "".join(json.dumps(r) + "\n" for r in rows).encode()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    client = motomeet.create_app().test_client()
+    token = jwt.encode({"email": "host@example.com", "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+                       motomeet.SECRET_KEY, algorithm="HS256")
+    client.set_cookie("access_token", token)
+    client.log = []
+    monkeypatch.setattr(motomeet.limiter, "enabled", False)
+
+    read_rows = motomeet.read_rows
+
+    def reading(stream, fmt):
+        yield from read_rows(stream, fmt)
+        client.log.append("read")
+
+    @contextlib.contextmanager
+    def connection(timeout=None):
+        client.log.append("connection")
+        yield FakeConnection()
+
+    def merge(cur, host_email, staged):
+        client.log.append(("merge", staged.buffer.read()))
+        return []
+
+    monkeypatch.setattr(motomeet, "read_rows", reading)
+    monkeypatch.setattr(motomeet.db_pool, "connection", connection)
+    monkeypatch.setattr(motomeet.event_importer, "merge", merge)
+    return client
+
+
+class FakeConnection:
+    def cursor(self, **kwargs):
+        return contextlib.nullcontext()
+
+    def commit(self):
+        pass
+
+
+def test_upload_is_read_before_taking_a_connection(client):
+    body = ndjson(row("2099-01-02T09:30:00"), row("2099-01-03T09:30:00"))
+    resp = client.post("/api/events/import?format=ndjson", data=body)
+    assert resp.status_code == 200, resp.get_json()
+    assert client.log[:2] == ["read", "connection"]
+    assert client.log[2][1].count("\n") == 2
+
+
+@pytest.mark.parametrize("query,body", [
+    ("", ndjson(row("not a time"))),
+    ("&strict=1", ndjson(row("2099-01-02T09:30:00"), row("not a time"))),
+])
+def test_nothing_to_import_never_takes_a_connection(client, query, body):
+    resp = client.post(f"/api/events/import?format=ndjson{query}", data=body)
+    assert resp.status_code in (200, 422)
+    assert client.log == ["read"]
+    assert resp.get_json()["errors"]
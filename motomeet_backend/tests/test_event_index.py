@@ -0,0 +1,177 @@
+"""The in-memory event index has to return what the PostGIS feed query would.
+
+`sql_feed` below is the SQL from nearby_events_sql() written out in plain
+Python: upcoming events, ST_Distance on the sphere (use_spheroid => false)
+within the radius, ORDER BY event_time, event_uuid, keyset after and LIMIT.
+The tests also pin that SQL's ORDER BY and keyset, so a change on either
+side fails here instead of in production.
+"""
+import math
+import random
+import time
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from event_index import EARTH_RADIUS_M, EventIndex
+from feed_query import FeedQuery
+
+NOW = time.time()
+
+
+def make_rows(count, seed=7):
+    rnd = random.Random(seed)
+    rows = []
+    for i in range(count):
+        # Cluster most events around a few places, some anywhere, some near the antimeridian and poles
+        kind = rnd.random()
+        if kind < 0.6:
+            lat, lon = rnd.choice([(37.5, -122.0), (51.5, -0.1), (-33.9, 151.2)])
+            lat, lon = lat + rnd.uniform(-2, 2), lon + rnd.uniform(-2, 2)
+        elif kind < 0.8:
+            lat, lon = rnd.uniform(-60, 60), rnd.uniform(-180, 180)
+        elif kind < 0.9:
+            lat, lon = rnd.uniform(-20, 20), rnd.choice([179.5, -179.5]) + rnd.uniform(-0.4, 0.4)
+        else:
+            lat, lon = rnd.uniform(85, 89.9), rnd.uniform(-180, 180)
+        # Some events share a start time so the uuid tiebreak matters; a few have already started
+        epoch = NOW + rnd.choice([-3600, 3600, 7200]) if i % 5 == 0 else NOW + rnd.uniform(-600, 86400 * 30)
+        rows.append({
+            "host_email": f"host{i % 9}@example.com",
+            "event_uuid": uuid.UUID(int=rnd.getrandbits(128)),
+            "event_name": f"Ride {i}",
+            "event_time": datetime.fromtimestamp(epoch, timezone.utc),
+            "rsvp_count": rnd.randint(0, 40),
+            "_lat": lat,
+            "_lon": lon,
+            "_epoch": epoch,
+        })
+    return rows
+
+
+def sphere_distance(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def sql_feed(rows, lat, lon, radius, after=None, limit=None):
+    found = []
+    for row in rows:
+        if row["_epoch"] < time.time():
+            continue  # e.event_time >= NOW()
+        d = sphere_distance(lat, lon, row["_lat"], row["_lon"])
+        if d > radius:
+            continue  # ST_DWithin(e.geom::geography, p.pt, radius, false)
+        if after is not None and (row["event_time"], str(row["event_uuid"])) <= after:
+            continue  # (e.event_time, e.event_uuid) > (after_time, after_id)
+        found.append((row, d))
+    found.sort(key=lambda rd: (rd[0]["event_time"], str(rd[0]["event_uuid"])))
+    return found[:limit] if limit is not None else found
+
+
+def ids(events):
+    return [str(e["event_uuid"]) for e in events]
+
+
+def edge_ids(rows, lat, lon, radius):
+    # Events right on the radius can land either side with float rounding
+    return {str(r["event_uuid"]) for r in rows
+            if abs(sphere_distance(lat, lon, r["_lat"], r["_lon"]) - radius) < 1.0}
+
+
+ROWS = make_rows(3000)
+POINTS = [
+    (37.5, -122.0, 80467), (37.9, -121.2, 40000), (51.5, -0.1, 160934), (-33.9, 151.2, 50000),
+    (0.0, 179.9, 200000), (0.0, -179.9, 500000), (88.0, 10.0, 300000), (10.0, 20.0, 2000000),
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    idx = EventIndex(lambda event_id=None: [dict(r) for r in ROWS], cell_degrees=1.0, refresh_interval=1e9)
+    idx.build()
+    return idx
+
+
+@pytest.mark.parametrize("lat,lon,radius", POINTS)
+def test_nearby_matches_sql(index, lat, lon, radius):
+    expected = sql_feed(ROWS, lat, lon, radius)
+    actual = index.nearby(lat, lon, radius)
+    edge = edge_ids(ROWS, lat, lon, radius)
+    assert [i for i in ids(actual) if i not in edge] == [i for i in ids(r for r, _ in expected) if i not in edge]
+    assert expected, "pick points that actually have events"
+
+
+@pytest.mark.parametrize("lat,lon,radius", POINTS)
+def test_distances_match_sql(index, lat, lon, radius):
+    expected = {str(r["event_uuid"]): d for r, d in sql_feed(ROWS, lat, lon, radius)}
+    for event in index.nearby(lat, lon, radius):
+        assert event["distance"] == pytest.approx(expected.get(str(event["event_uuid"]), event["distance"]), abs=1e-3)
+
+
+@pytest.mark.parametrize("lat,lon,radius", POINTS[:4])
+def test_keyset_pages_match_sql(index, lat, lon, radius):
+    feed_query = FeedQuery()
+    after, pages = None, []
+    while True:
+        page = index.nearby(lat, lon, radius, after, 7)
+        expected = [r for r, _ in sql_feed(ROWS, lat, lon, radius, after, 7)]
+        assert ids(page) == ids(expected)
+        pages.extend(page)
+        if len(page) < 7:
+            break
+        # Round-trip the cursor the API hands out
+        after = feed_query.decode_cursor(feed_query.encode_cursor(page[-1]))
+    assert ids(pages) == ids(r for r, _ in sql_feed(ROWS, lat, lon, radius))
+    assert len(pages) > 7, "pick points with more than one page"
+
+
+def test_rows_are_in_time_then_uuid_order(index):
+    events = index.nearby(10.0, 20.0, 20000000)
+    keys = [(e["event_time"], str(e["event_uuid"])) for e in events]
+    assert keys == sorted(keys)
+    assert len({e["event_time"] for e in events}) < len(events), "expected some shared start times"
+
+
+def test_sql_order_and_keyset_are_what_the_index_implements():
+    feed_query = FeedQuery()
+    assert feed_query.is_default
+    assert feed_query.order_sql() == "ORDER BY e.event_time ASC, e.event_uuid ASC"
+    params = {}
+    keyset = feed_query.keyset_sql(("t", "id"), params)
+    assert keyset == "AND (e.event_time, e.event_uuid) > (%(after_0)s::timestamptz, %(after_1)s::uuid)"
+
+
+@pytest.mark.parametrize("args", [
+    {"sort": "distance"}, {"sort": "popularity"}, {"sort": "least_popular"}, {"sort": "mine"},
+    {"from": "2030-01-01"}, {"max_distance": "10"}, {"min_rsvps": "1"}, {"q": "ride"},
+])
+def test_other_sorts_and_filters_never_use_the_index(args):
+    # The index only implements the default order; anything else has to go to SQL
+    assert not FeedQuery.from_args(args, "host1@example.com").is_default
+
+
+def test_rsvp_count_and_removal_show_up(index):
+    event = index.nearby(37.5, -122.0, 80467)[0]
+    index.set_rsvp_count(event["event_uuid"], 99)
+    assert index.nearby(37.5, -122.0, 80467)[0]["rsvp_count"] == 99
+    index.remove_event(event["event_uuid"])
+    assert str(event["event_uuid"]) not in ids(index.nearby(37.5, -122.0, 80467))
+
+
+def test_generation_moves_on_every_change():
+    # Home pages served from the index are tied to this, so a change that skips it would keep a stale ETag
+    idx = EventIndex(lambda event_id=None: [dict(r) for r in ROWS if event_id in (None, r["event_uuid"])],
+                     refresh_interval=1e9)
+    idx.build()
+    event = idx.nearby(37.5, -122.0, 80467)[0]
+    seen = [idx.generation]
+    idx.set_rsvp_count(event["event_uuid"], 99)
+    seen.append(idx.generation)
+    idx.refresh_event(event["event_uuid"])
+    seen.append(idx.generation)
+    idx.remove_event(event["event_uuid"])
+    seen.append(idx.generation)
+    assert seen == sorted(set(seen))
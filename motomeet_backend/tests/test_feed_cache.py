@@ -0,0 +1,36 @@
+from feed_cache import FeedVersions, ResponseCache
+
+
+class VersionsCursor:
+    """Answers FeedVersions.versions() from a dict, like the feed_versions table."""
+
+    def __init__(self, table):
+        self.table = table
+        self.rows = []
+
+    def execute(self, query, vars=None):
+        scopes = vars[0]
+        self.rows = [{"scope": s, "version": v} for s, v in self.table.items() if s in scopes]
+
+    def fetchall(self):
+        return self.rows
+
+
+def test_late_commit_with_a_lower_version_invalidates():
+    # Writer A took 10 on the cell, writer B took 11 on the rider and committed first
+    table = {"user:a@example.com": 11}
+    scopes = ["user:a@example.com", "cell:37:-123"]
+    cur = VersionsCursor(table)
+    cache = ResponseCache()
+    cache.put("home", scopes, FeedVersions.current(cur, scopes), b"{}")
+
+    # A commits; the max over the scopes is still 11
+    table["cell:37:-123"] = 10
+    assert max(table.values()) == 11
+    assert FeedVersions.current(cur, scopes) != cache.get("home").version
+
+
+def test_stamp_is_stable_and_order_independent():
+    assert FeedVersions.stamp({"a": 1, "b": 2}) == FeedVersions.stamp({"b": 2, "a": 1})
+    assert FeedVersions.stamp({"a": 1, "b": 2}) != FeedVersions.stamp({"a": 2, "b": 1})
+    assert FeedVersions.stamp({}) == FeedVersions.stamp({})
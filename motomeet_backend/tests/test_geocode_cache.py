@@ -0,0 +1,91 @@
+"""Google's geocoding status codes, and what GeocodeCache keeps of each.
+
+Quota, key and server errors come back as HTTP 200 with an error `status`
+and empty results. Only ZERO_RESULTS may be remembered as "not found";
+the rest must raise so the next lookup asks Google again.
+"""
+import contextlib
+
+import pytest
+
+import motomeet
+from geocode_cache import GeocodeCache, GeocodeError
+
+ADDRESS = "San Jose, CA"
+FOUND = {"status": "OK", "results": [{"geometry": {"location": {"lat": 37.33, "lng": -121.89}}}]}
+
+
+class FakeResponse:
+    def __init__(self, payload, status_code=200):
+        self.payload = payload
+        self.status_code = status_code
+
+    def json(self):
+        return self.payload
+
+
+class NoTable:
+    """A pool whose geocode_cache table is empty and ignores writes."""
+
+    @contextlib.contextmanager
+    def connection(self):
+        raise RuntimeError("no database in tests")
+        yield
+
+
+@pytest.fixture
+def google(monkeypatch):
+    calls = []
+
+    def answer(*responses):
+        queue = list(responses)
+
+        def get(api, url, params=None):
+            calls.append(params["address"])
+            return queue.pop(0)
+
+        monkeypatch.setattr(motomeet.google, "get", get)
+        return calls
+
+    return answer
+
+
+def make_cache():
+    return GeocodeCache(motomeet.fetch_geocode, NoTable())
+
+
+def test_ok_is_cached(google):
+    calls = google(FakeResponse(FOUND))
+    cache = make_cache()
+    assert cache.lookup(ADDRESS) == (37.33, -121.89)
+    assert cache.lookup(ADDRESS) == (37.33, -121.89)
+    assert len(calls) == 1
+
+
+def test_zero_results_is_cached_as_not_found(google):
+    calls = google(FakeResponse({"status": "ZERO_RESULTS", "results": []}))
+    cache = make_cache()
+    assert cache.lookup(ADDRESS) is None
+    assert cache.lookup(ADDRESS) is None
+    assert len(calls) == 1
+
+
+@pytest.mark.parametrize("status", ["OVER_QUERY_LIMIT", "REQUEST_DENIED", "UNKNOWN_ERROR", "INVALID_REQUEST"])
+def test_error_status_raises_and_is_not_cached(google, status):
+    error = FakeResponse({"status": status, "results": [], "error_message": "nope"})
+    calls = google(error, FakeResponse(FOUND))
+    cache = make_cache()
+    with pytest.raises(GeocodeError, match=status):
+        cache.lookup(ADDRESS)
+    # Google is asked again, and the answer is used once it works
+    assert cache.lookup(ADDRESS) == (37.33, -121.89)
+    assert len(calls) == 2
+
+
+def test_error_status_serves_a_stale_location(google):
+    calls = google(FakeResponse(FOUND), FakeResponse({"status": "OVER_QUERY_LIMIT", "results": []}))
+    cache = make_cache()
+    cache.memory.ttl = -1  # everything it stores has already expired
+    assert cache.lookup(ADDRESS) == (37.33, -121.89)
+    assert cache.lookup(ADDRESS) == (37.33, -121.89)
+    assert len(calls) == 2
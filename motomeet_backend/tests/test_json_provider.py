@@ -0,0 +1,41 @@
+"""FastJSONProvider has to write what Flask's own provider does, apart from
+non-finite floats, where it writes null instead of the stdlib's NaN."""
+import datetime
+import decimal
+import uuid
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import json_provider
+from json_provider import FastJSONProvider
+
+pytestmark = pytest.mark.skipif(json_provider.orjson is None, reason="orjson isn't installed")
+
+
+@pytest.fixture
+def providers():
+    app = Flask(__name__)
+    return FastJSONProvider(app), DefaultJSONProvider(app)
+
+
+@pytest.mark.parametrize("obj", [
+    {"b": 1, "a": [1.5, 2, None, True], "c": "plain"},
+    {"event_time": datetime.datetime(2030, 1, 2, 9, 30, tzinfo=datetime.timezone.utc)},
+    {"event_uuid": uuid.UUID(int=7), "price": decimal.Decimal("12.50")},
+    {"distance": 1234.5678, "tiny": 0.00001, "huge": 1e20},
+    {"name": "Café ride \U0001f3cd"},
+    {1: "non-string key"},
+])
+def test_matches_flask(providers, obj):
+    fast, default = providers
+    assert fast.encode(obj) == default.dumps(obj, separators=(",", ":")).encode()
+
+
+@pytest.mark.parametrize("value", [float("nan"), float("inf"), float("-inf")])
+def test_non_finite_floats_are_null(providers, value):
+    fast, default = providers
+    assert fast.encode({"distance": value}) == b'{"distance":null}'
+    # Where the stdlib writes something JSON.parse can't read
+    assert default.dumps({"distance": value}, separators=(",", ":")) != '{"distance":null}'
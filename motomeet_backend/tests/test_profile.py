@@ -0,0 +1,120 @@
+"""/api/profile through the prepared statement path, against a fake connection.
+
+EXECUTE only applies assignment casts to its arguments, so a uuid[] parameter
+has to be sent as uuid literals; a plain list of str goes out as text[] and
+Postgres rejects it. The fake records what EXECUTE was given and renders it
+the way psycopg2 would.
+"""
+import contextlib
+import re
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import jwt
+import pytest
+from psycopg2.extensions import adapt
+
+import motomeet
+
+EMAIL = "rider@example.com"
+GOING = [str(uuid.UUID(int=1)), str(uuid.UUID(int=2))]
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.connection = db.conn
+        self.rows = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, vars=None):
+        prepare = re.match(r"\s*PREPARE (\w+) AS (.*)", query, re.S)
+        if prepare:
+            self.db.prepared[prepare.group(1)] = prepare.group(2)
+            return
+        execute = re.match(r"\s*EXECUTE (\w+)", query)
+        if execute:
+            name = execute.group(1)
+            # What psycopg2 would put on the wire for each argument
+            self.db.executed[name] = [adapt(v).getquoted() for v in vars or []]
+            query = self.db.prepared[name]
+        self.rows = self.db.answer(query)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def cursor(self, **kwargs):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class FakeDB:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.conn.db = self
+        self.prepared = {}
+        self.executed = {}
+
+    def answer(self, query):
+        if "events_going" in query:
+            return [{"n": "Rider", "city": "Oakland", "lat": 37.8, "long": -122.2, "radius": 80467,
+                     "make": "Honda", "model": "CB500", "events_going": list(GOING), "version": 0}]
+        if "events_archive" in query:
+            return [{"host_email": EMAIL, "event_uuid": GOING[0], "event_name": "Sunday ride",
+                     "event_time": datetime(2030, 1, 1, tzinfo=timezone.utc), "location": "Oakland",
+                     "latitude": 37.8, "longitude": -122.2, "description": "", "rsvp_count": 1,
+                     "host_name": "Rider"}]
+        return []
+
+    @contextlib.contextmanager
+    def connection(self, timeout=None):
+        yield self.conn
+
+
+@pytest.fixture
+def client(monkeypatch):
+    db = FakeDB()
+    monkeypatch.setattr(motomeet.db_pool, "connection", db.connection)
+    monkeypatch.setattr(motomeet.statements, "enabled", True)
+    motomeet.user_state.clear()
+    motomeet.response_cache._data.clear()
+    client = motomeet.create_app().test_client()
+    token = jwt.encode({"email": EMAIL, "exp": datetime.now(timezone.utc) + timedelta(hours=1)},
+                       motomeet.SECRET_KEY, algorithm="HS256")
+    client.set_cookie("access_token", token)
+    client.db = db
+    return client
+
+
+def test_profile_binds_going_events_as_uuids(client):
+    resp = client.get("/api/profile")
+    assert resp.status_code == 200, resp.get_json()
+    assert [e["event_uuid"] for e in resp.get_json()["events"]] == [GOING[0]]
+
+    going = [arg for arg in client.db.executed["profile_events"] if arg.startswith(b"ARRAY")]
+    assert going, client.db.executed["profile_events"]
+    # ARRAY['…'::uuid, …] is a uuid[]; ARRAY['…', …] would be text[] and fail to coerce
+    assert going[0].count(b"::uuid") == len(GOING)
+
+
+def test_profile_with_cached_rider_state(client):
+    assert client.get("/api/profile").status_code == 200
+    motomeet.response_cache._data.clear()
+    resp = client.get("/api/profile")
+    assert resp.status_code == 200
+    assert client.db.executed["profile_events"][0].count(b"::uuid") == len(GOING)
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import jwt
+
+from geocode_cache import LRUCache
+
+
+class TokenCache:
+    """Decoded access tokens, so repeat requests with the same cookie skip the
+    signature check. Entries never outlive the token's own `exp`; tokens that
+    fail to decode aren't cached and raise every time."""
+
+    def __init__(self, secret, maxsize=10000, ttl=300):
+        self.secret = secret
+        self.ttl = ttl
+        self.memory = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0}
+
+    def _count(self, name):
+        with self._lock:
+            self._counters[name] += 1
+
+    def email(self, token):
+        email = self.memory.get(token)
+        if email is not None:
+            self._count("hits")
+            return email
+        self._count("misses")
+        payload = jwt.decode(token, self.secret, algorithms=["HS256"])
+        ttl = min(self.ttl, payload["exp"] - time.time()) if "exp" in payload else self.ttl
+        if ttl > 0:
+            self.memory.set(token, payload["email"], ttl)
+        return payload["email"]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self.memory))
+
+
+class UserState:
+    """What the app keeps looking up about a rider: settings, bike and the events they're going to."""
+
+    __slots__ = ("n", "city", "lat", "long", "radius", "make", "model", "going", "version")
+
+    def __init__(self, n, city, lat, long, radius, make, model, going, version):
+        self.n = n
+        self.city = city
+        self.lat = lat
+        self.long = long
+        self.radius = radius
+        self.make = make
+        self.model = model
+        self.going = tuple(going)
+        self.version = version  # the rider's feed version when this was read
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row["n"], row["city"], row["lat"], row["long"], row["radius"],
+                   row["make"], row["model"], row["events_going"], row["version"])
+
+
+class UserStateCache:
+    """Per-rider UserState kept in memory for `ttl` seconds.
+
+    Writers call invalidate() once they've committed, and tell the other
+    workers over NOTIFY so they do the same. Readers that already have the
+    rider's current feed version can compare it with `state.version` to catch
+    a change whose notification hasn't arrived yet.
+    """
+
+    def __init__(self, maxsize=5000, ttl=60):
+        self.memory = LRUCache(maxsize, ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, email):
+        state = self.memory.get(email)
+        with self._lock:
+            self._counters["hits" if state is not None else "misses"] += 1
+        return state
+
+    def generation(self):
+        """Take this before reading a rider from the database and pass it to put()."""
+        return self._generation
+
+    def put(self, email, state, generation):
+        # Something was invalidated while we were reading; what we read may predate it
+        with self._lock:
+            if generation == self._generation:
+                self.memory.set(email, state)
+
+    def invalidate(self, *emails):
+        with self._lock:
+            self._generation += 1
+            for email in emails:
+                self.memory.discard(email)
+            self._counters["invalidations"] += len(emails)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self.memory = LRUCache(self.memory.maxsize, self.memory.ttl)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, entries=len(self.memory))